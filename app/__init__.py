@@ -13,6 +13,26 @@ def create_app(config_class=Config):
     migrate.init_app(app, db)
     mail.init_app(app)
 
+    # Escritor assíncrono de auditoria (ativo apenas com AUDIT_ASYNC)
+    from .services.audit_writer import audit_writer
+    audit_writer.init_app(app)
+
+    # Política de auditoria de leituras: amostragem e agrupamento em janelas
+    from .services.read_audit_policy import read_audit_policy
+    read_audit_policy.init_app(app)
+
+    # Agendador de jobs periódicos (CLI: flask scheduler run)
+    from .services.scheduler import scheduler
+    scheduler.init_app(app)
+
+    # Pool de workers de geração de PDFs (WeasyPrint)
+    from .services.document_render_service import document_renderer
+    document_renderer.init_app(app)
+
+    # Comandos de manutenção da auditoria (flask audit ...)
+    from .services.audit_archive_service import audit_cli
+    app.cli.add_command(audit_cli)
+
     # Registrar Blueprints
     # Exemplo: (serão criados e importados do app.routes no passo 1.4 e controllers no 1.5)
     # from .routes.auth_routes import auth_bp
@@ -22,6 +22,85 @@ class Config:
 
     # Outras configurações da aplicação podem ser adicionadas aqui
     ITEMS_PER_PAGE = 10
+    MAX_ITEMS_PER_PAGE = 500 # Limite superior para parâmetros limit/per_page das APIs
+    PAGINATION_TOTAL_LIMIT = 10000 # Contagem máxima do total na paginação por cursor (acima disso é aproximado)
+
+    # Atribuição de treinamentos em massa: IDs processados por bloco
+    BULK_ASSIGN_CHUNK_SIZE = 1000
+
+    # Geração de documentos: workers WeasyPrint em processos separados (0 = gera na própria requisição)
+    DOCUMENT_RENDER_WORKERS = int(os.environ.get("DOCUMENT_RENDER_WORKERS") or 2)
+    DOCUMENTS_FOLDER = os.environ.get("DOCUMENTS_FOLDER") or os.path.join(basedir, "documents")
+    DOCUMENT_RENDER_JOB_TIMEOUT = int(os.environ.get("DOCUMENT_RENDER_JOB_TIMEOUT") or 900) # Jobs em "queued" há mais tempo são dados como perdidos
+    DOCUMENT_STYLESHEETS = {} # CSS por tipo de documento (padrão: "@page { margin: 1cm; }")
+    # PDFs reaproveitados por (template, conteúdo); blobs sem documento acima do limite são removidos (LRU)
+    DOCUMENT_BLOB_CACHE_MAX_BYTES = int(os.environ.get("DOCUMENT_BLOB_CACHE_MAX_BYTES") or 1024 ** 3)
+    DOCUMENT_BATCH_MAX_ROWS = int(os.environ.get("DOCUMENT_BATCH_MAX_ROWS") or 1000) # Linhas por geração em lote
+
+    # Matriz de riscos
+    RISK_MATRIX_SCALE = 5 # Escala de probabilidade e impacto (5x5)
+    RISK_HEATMAP_CACHE_TTL = 300 # Segundos
+
+    # Auditoria assíncrona: log_action enfileira os registros e uma thread os grava em lote
+    AUDIT_ASYNC = os.environ.get("AUDIT_ASYNC") is not None and os.environ.get("AUDIT_ASYNC").lower() in ["true", "1", "t"]
+    AUDIT_QUEUE_MAXSIZE = int(os.environ.get("AUDIT_QUEUE_MAXSIZE") or 10000)
+    AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE") or 500)
+    AUDIT_FLUSH_INTERVAL_MS = int(os.environ.get("AUDIT_FLUSH_INTERVAL_MS") or 200)
+    # Contrapressão com a fila cheia: "block", "drop" ou "spill" (grava em AUDIT_SPILL_PATH)
+    AUDIT_BACKPRESSURE = os.environ.get("AUDIT_BACKPRESSURE") or "block"
+    AUDIT_BLOCK_TIMEOUT = int(os.environ.get("AUDIT_BLOCK_TIMEOUT") or 5) # Segundos
+    AUDIT_SPILL_PATH = os.environ.get("AUDIT_SPILL_PATH") or os.path.join(basedir, "..", "audit_spill.ndjson")
+    AUDIT_EXPORT_CHUNK_SIZE = 1000 # Registros lidos e enviados por bloco na exportação
+    # Auditoria de leituras (@audit_read): leituras repetidas viram uma linha por janela
+    READ_AUDIT_COALESCE_SECONDS = int(os.environ.get("READ_AUDIT_COALESCE_SECONDS") or 300) # 0 desativa o agrupamento
+    READ_AUDIT_SAMPLE_RATE = float(os.environ.get("READ_AUDIT_SAMPLE_RATE") or 1.0) # Fração de usuários/entidades auditados
+    READ_AUDIT_SAMPLE_RATES = {} # Taxa por tipo de entidade (ex: {"treinamento": 0.1})
+    # Tipos de entidade sempre auditados, uma linha por leitura (ex: "avaliacao_risco,documento")
+    READ_AUDIT_SENSITIVE_ENTITIES = [
+        entity.strip() for entity in (os.environ.get("READ_AUDIT_SENSITIVE_ENTITIES") or "").split(",") if entity.strip()
+    ]
+    READ_AUDIT_MAX_PENDING = 10000 # Janelas abertas em memória antes de gravar todas
+    # Agregados por hora usados em /api/audit-logs/statistics
+    AUDIT_ROLLUP_RECOMPUTE_HOURS = 2 # Horas antes do watermark refeitas a cada compactação (registros atrasados)
+    AUDIT_ROLLUP_CHUNK_HOURS = 24 # Horas agregadas por transação
+    # Particionamento mensal (PostgreSQL, habilitado na migração com AUDIT_PARTITIONING=true) e arquivamento
+    AUDIT_PARTITION_MONTHS_AHEAD = 3 # Partições futuras mantidas pelo agendador
+    AUDIT_ARCHIVE_DIR = os.environ.get("AUDIT_ARCHIVE_DIR") or os.path.join(basedir, "..", "audit_archive")
+    AUDIT_ARCHIVE_CHUNK_SIZE = 5000
+    # Cadeia de hashes: verificação em segmentos de IDs distribuídos entre processos
+    AUDIT_CHAIN_VERIFY_WORKERS = int(os.environ.get("AUDIT_CHAIN_VERIFY_WORKERS") or os.cpu_count() or 1)
+    AUDIT_CHAIN_SEGMENT_SIZE = 100000
+    AUDIT_CHAIN_VERIFY_HTTP_MAX_LOGS = 100000 # Logs verificáveis por requisição em /api/audit-logs/verify (acima disso, use a CLI)
+
+    # Contador de notificações não lidas servido da memória (segundos até recontar no banco)
+    NOTIFICATION_COUNT_CACHE_TTL = int(os.environ.get("NOTIFICATION_COUNT_CACHE_TTL") or 60)
+
+    # Stream SSE de notificações (/api/notifications/stream)
+    NOTIFICATION_STREAM_HEARTBEAT = int(os.environ.get("NOTIFICATION_STREAM_HEARTBEAT") or 15) # Segundos
+    NOTIFICATION_STREAM_RESYNC_SECONDS = int(os.environ.get("NOTIFICATION_STREAM_RESYNC_SECONDS") or 60) # Consulta ao banco para eventos de outros processos (0 desativa)
+    NOTIFICATION_STREAM_BUFFER = 100 # Eventos pendentes por conexão
+    NOTIFICATION_STREAM_REPLAY_LIMIT = 100 # Notificações por consulta de replay
+
+    # Agendador de jobs (varreduras de prazos fora do ciclo das requisições)
+    # Com SCHEDULER_ENABLED, /api/notifications/check-deadlines não executa a varredura;
+    # os jobs rodam via "flask scheduler run" ou na própria aplicação com SCHEDULER_AUTOSTART
+    SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED") is not None and os.environ.get("SCHEDULER_ENABLED").lower() in ["true", "1", "t"]
+    SCHEDULER_AUTOSTART = os.environ.get("SCHEDULER_AUTOSTART") is not None and os.environ.get("SCHEDULER_AUTOSTART").lower() in ["true", "1", "t"]
+    SCHEDULER_TICK_SECONDS = int(os.environ.get("SCHEDULER_TICK_SECONDS") or 30)
+    SCHEDULER_LOCK_KEY = int(os.environ.get("SCHEDULER_LOCK_KEY") or 724001) # Chave do advisory lock (PostgreSQL)
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get("SCHEDULER_LEASE_SECONDS") or 300) # Lease do líder em outros bancos
+    SCHEDULER_CHECKLIST_DEADLINES_INTERVAL = int(os.environ.get("SCHEDULER_CHECKLIST_DEADLINES_INTERVAL") or 3600)
+    SCHEDULER_TRAINING_DEADLINES_INTERVAL = int(os.environ.get("SCHEDULER_TRAINING_DEADLINES_INTERVAL") or 3600)
+    SCHEDULER_NOTIFICATION_RETENTION_INTERVAL = int(os.environ.get("SCHEDULER_NOTIFICATION_RETENTION_INTERVAL") or 86400)
+    SCHEDULER_AUDIT_ROLLUP_INTERVAL = int(os.environ.get("SCHEDULER_AUDIT_ROLLUP_INTERVAL") or 900)
+    SCHEDULER_AUDIT_PARTITIONS_INTERVAL = int(os.environ.get("SCHEDULER_AUDIT_PARTITIONS_INTERVAL") or 86400)
+    SCHEDULER_AUDIT_CHECKPOINT_INTERVAL = int(os.environ.get("SCHEDULER_AUDIT_CHECKPOINT_INTERVAL") or 3600)
+    SCHEDULER_DOCUMENT_RENDER_EXPIRY_INTERVAL = int(os.environ.get("SCHEDULER_DOCUMENT_RENDER_EXPIRY_INTERVAL") or 300)
+    SCHEDULER_DOCUMENT_BLOB_EVICTION_INTERVAL = int(os.environ.get("SCHEDULER_DOCUMENT_BLOB_EVICTION_INTERVAL") or 86400)
+
+    # Retenção de notificações: arquivadas há mais de N dias são removidas em blocos
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get("NOTIFICATION_RETENTION_DAYS") or 90)
+    NOTIFICATION_PURGE_CHUNK_SIZE = 1000
 
 class DevelopmentConfig(Config):
     """Configurações para o ambiente de desenvolvimento."""
@@ -41,6 +120,10 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False 
     # Garante que os emails não sejam realmente enviados durante os testes
     MAIL_SUPPRESS_SEND = True 
+    # Logs de auditoria gravados de forma síncrona para facilitar as asserções
+    AUDIT_ASYNC = False
+    # Documentos gerados na própria requisição (sem pool de processos)
+    DOCUMENT_RENDER_WORKERS = 0
 
 class ProductionConfig(Config):
     """Configurações para o ambiente de produção."""
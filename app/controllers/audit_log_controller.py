@@ -1,11 +1,14 @@
 # app/controllers/audit_log_controller.py
-from flask import Blueprint, request, jsonify, g, current_app, send_file
+from flask import Blueprint, Response, request, jsonify, g, current_app, stream_with_context
 from ..models.audit_log import AuditLog, ActionTypeEnum, EntityTypeEnum
 from ..services.audit_service import AuditService
+from ..services.audit_rollup_service import AuditRollupService
+from ..services.audit_chain import AuditChain
 from ..extensions import db
 from sqlalchemy import desc
 import datetime
-import io
+import json
+import zlib
 
 audit_log_bp = Blueprint('audit_log', __name__, url_prefix='/api/audit-logs')
 
@@ -43,7 +46,20 @@ def get_audit_logs():
     if 'search' in request.args:
         filters['search'] = request.args.get('search')
     
-    # Paginação
+    try:
+        data_filters = _data_filters()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    if data_filters:
+        filters['data'] = data_filters
+    
+    # Paginação por cursor (padrão); page mantém a paginação por páginas para clientes antigos
+    if 'page' not in request.args:
+        return _get_audit_logs_keyset(filters)
+    
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
@@ -69,6 +85,64 @@ def get_audit_logs():
         }
     }), 200
 
+def _data_filters():
+    """
+    Filtros por chave de additional_data (?data.treinamento_id=5&data.new.status=concluido)
+    
+    O valor é interpretado como JSON quando possível (5, true, "5"); caso contrário, como texto.
+    
+    Raises:
+        ValueError: Se algum caminho for inválido
+    """
+    data_filters = {}
+    for name, raw_value in request.args.items():
+        if not name.startswith('data.'):
+            continue
+        path = name[len('data.'):]
+        AuditService.data_path_keys(path)
+        try:
+            data_filters[path] = json.loads(raw_value)
+        except ValueError:
+            data_filters[path] = raw_value
+    return data_filters
+
+def _get_audit_logs_keyset(filters):
+    """Página de logs a partir do cursor (?cursor=...&per_page=...&include_total=true)"""
+    cursor = request.args.get('cursor')
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), current_app.config.get('MAX_ITEMS_PER_PAGE', 500))
+    include_total = request.args.get('include_total', 'false').lower() in ['true', '1']
+    total_limit = current_app.config.get('PAGINATION_TOTAL_LIMIT', 10000) if include_total else None
+    
+    try:
+        result = AuditService.search_logs_keyset(filters, cursor, per_page, total_limit)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    AuditService.log_action(
+        ActionTypeEnum.READ,
+        EntityTypeEnum.SYSTEM,
+        f"Usuário {g.user.username} visualizou logs de auditoria",
+        user_id=g.user.id,
+        additional_data={"filters": filters, "cursor": cursor, "per_page": per_page}
+    )
+    
+    data = {
+        'logs': [log.to_dict() for log in result['items']],
+        'next_cursor': result['next_cursor'],
+        'has_more': result['has_more']
+    }
+    if include_total:
+        data['total'] = result['total']
+        data['total_is_estimate'] = result['total_is_estimate']
+    
+    return jsonify({
+        'success': True,
+        'data': data
+    }), 200
+
 @audit_log_bp.route('/<int:log_id>', methods=['GET'])
 def get_audit_log(log_id):
     """Retorna detalhes de um log específico"""
@@ -199,18 +273,21 @@ def export_logs():
     if 'search' in request.args:
         filters['search'] = request.args.get('search')
     
+    try:
+        data_filters = _data_filters()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    if data_filters:
+        filters['data'] = data_filters
+    
     # Formato de exportação
     format = request.args.get('format', 'csv')
-    if format not in ['csv', 'json']:
+    if format not in ['csv', 'json', 'ndjson']:
         format = 'csv'
-    
-    # Exportar logs
-    content = AuditService.export_logs(filters, format)
-    
-    # Criar arquivo em memória
-    buffer = io.BytesIO()
-    buffer.write(content.encode('utf-8'))
-    buffer.seek(0)
+    compress = request.args.get('gzip', 'false').lower() in ['true', '1']
     
     # Nome do arquivo
     timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -222,18 +299,34 @@ def export_logs():
         EntityTypeEnum.SYSTEM,
         f"Usuário {g.user.username} exportou logs de auditoria em formato {format}",
         user_id=g.user.id,
-        additional_data={"filters": filters, "format": format}
+        additional_data={"filters": filters, "format": format, "gzip": compress}
     )
     
     # Determinar o tipo MIME
-    mimetype = 'text/csv' if format == 'csv' else 'application/json'
-    
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=filename,
-        mimetype=mimetype
-    )
+    mimetypes = {'csv': 'text/csv', 'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+    mimetype = mimetypes[format]
+    
+    # O arquivo é gerado e enviado em blocos, sem ser montado em memória
+    chunks = (chunk.encode('utf-8') for chunk in AuditService.stream_export(
+        filters, format, current_app.config.get('AUDIT_EXPORT_CHUNK_SIZE', 1000)
+    ))
+    if compress:
+        chunks = _gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def _gzip_chunks(chunks):
+    """Comprime os blocos em formato gzip à medida que são gerados"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31: cabeçalho gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
 
 @audit_log_bp.route('/statistics', methods=['GET'])
 def get_statistics():
@@ -245,50 +338,22 @@ def get_statistics():
             'message': 'Acesso não autorizado'
         }), 403
     
-    # Estatísticas por tipo de ação
-    action_stats = db.session.query(
-        AuditLog.action_type, 
-        db.func.count(AuditLog.id)
-    ).group_by(AuditLog.action_type).all()
-    
-    action_counts = {action: count for action, count in action_stats}
-    
-    # Estatísticas por tipo de entidade
-    entity_stats = db.session.query(
-        AuditLog.entity_type, 
-        db.func.count(AuditLog.id)
-    ).group_by(AuditLog.entity_type).all()
-    
-    entity_counts = {entity: count for entity, count in entity_stats}
-    
-    # Estatísticas por usuário (top 10)
-    user_stats = db.session.query(
-        AuditLog.user_id, 
-        db.func.count(AuditLog.id)
-    ).filter(AuditLog.user_id.isnot(None)).group_by(AuditLog.user_id).order_by(
-        db.func.count(AuditLog.id).desc()
-    ).limit(10).all()
-    
-    user_counts = {user_id: count for user_id, count in user_stats}
-    
-    # Estatísticas por período (últimos 7 dias)
-    today = datetime.datetime.now().date()
-    period_stats = []
-    
-    for i in range(7):
-        date = today - datetime.timedelta(days=i)
-        start_datetime = datetime.datetime.combine(date, datetime.time.min)
-        end_datetime = datetime.datetime.combine(date, datetime.time.max)
-        
-        count = AuditLog.query.filter(
-            AuditLog.timestamp >= start_datetime,
-            AuditLog.timestamp <= end_datetime
-        ).count()
-        
-        period_stats.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'count': count
-        })
+    # Intervalo opcional (YYYY-MM-DD, inclusive); sem intervalo: contagens de todo o histórico e últimos 7 dias
+    try:
+        start_date = datetime.datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() if request.args.get('start_date') else None
+        end_date = datetime.datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() if request.args.get('end_date') else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Datas inválidas (use o formato YYYY-MM-DD)'
+        }), 400
+    if start_date and end_date and start_date > end_date:
+        return jsonify({
+            'success': False,
+            'message': 'start_date deve ser anterior a end_date'
+        }), 400
+    
+    statistics = AuditRollupService.get_statistics(start_date, end_date)
     
     # Registrar a ação
     AuditService.log_action(
@@ -300,10 +365,60 @@ def get_statistics():
     
     return jsonify({
         'success': True,
-        'data': {
-            'action_counts': action_counts,
-            'entity_counts': entity_counts,
-            'user_counts': user_counts,
-            'period_stats': period_stats
-        }
+        'data': statistics
+    }), 200
+
+@audit_log_bp.route('/verify', methods=['GET'])
+def verify_chain():
+    """
+    Verifica a cadeia de hashes dos logs (?start_id=...&end_id=...) a partir do checkpoint mais próximo
+
+    Por padrão verifica os logs desde o último checkpoint. A verificação roda na
+    própria requisição, sem processos paralelos, e é limitada a
+    AUDIT_CHAIN_VERIFY_HTTP_MAX_LOGS logs a partir da âncora; intervalos maiores
+    devem ser verificados com "flask audit verify".
+    """
+    # Verificar se o usuário tem permissão (admin)
+    if not hasattr(g, 'user') or not g.user.is_admin:
+        return jsonify({
+            'success': False,
+            'message': 'Acesso não autorizado'
+        }), 403
+    
+    start_id = request.args.get('start_id', type=int)
+    end_id = request.args.get('end_id', type=int)
+    if start_id and end_id and start_id > end_id:
+        return jsonify({
+            'success': False,
+            'message': 'start_id deve ser menor ou igual a end_id'
+        }), 400
+    
+    if end_id is None:
+        end_id = db.session.query(db.func.max(AuditLog.id)).scalar() or 0
+    if start_id is None:
+        last = AuditChain.anchor(end_id + 1)
+        start_id = last.last_log_id + 1 if last else (db.session.query(db.func.min(AuditLog.id)).scalar() or 1)
+    
+    anchor = AuditChain.anchor(start_id)
+    max_logs = current_app.config.get('AUDIT_CHAIN_VERIFY_HTTP_MAX_LOGS', 100000)
+    if end_id - (anchor.last_log_id if anchor else 0) > max_logs:
+        return jsonify({
+            'success': False,
+            'message': f'Intervalo maior que {max_logs} logs a partir do checkpoint mais próximo; use "flask audit verify"'
+        }), 400
+    
+    result = AuditChain.verify(start_id, end_id, workers=1)
+    
+    # Registrar a ação
+    AuditService.log_action(
+        ActionTypeEnum.READ,
+        EntityTypeEnum.SYSTEM,
+        f"Usuário {g.user.username} verificou a integridade dos logs de auditoria",
+        user_id=g.user.id,
+        additional_data={"start_id": start_id, "end_id": end_id, "valid": result['valid']}
+    )
+    
+    return jsonify({
+        'success': True,
+        'data': result
     }), 200
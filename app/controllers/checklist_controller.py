@@ -9,6 +9,7 @@ from ..models.checklist_item import ChecklistItem, RiscoEnum, PrioridadeEnum, St
 from ..models.evidencia import Evidencia
 from ..extensions import db
 from ..schemas.checklist_schema import ChecklistSchema, ChecklistItemSchema
+from ..services.checklist_service import ChecklistService
 import json
 
 checklist_bp = Blueprint('checklist', __name__, url_prefix='/api/checklists')
@@ -24,18 +25,37 @@ def allowed_file(filename):
 # Rotas para Checklists
 @checklist_bp.route('/', methods=['GET'])
 def get_checklists():
-    """Retorna todos os checklists, com opção de filtro por categoria"""
+    """Retorna os checklists, com opção de filtro por categoria.
+
+    Parâmetros opcionais:
+        depth: 0 (resumo com contagens), 1 (itens) ou 2 (itens e evidências, padrão)
+        fields: campos de primeiro nível separados por vírgula (ex: id,nome,total_items)
+        limit / after_id: paginação por cursor, ordenada por ID
+    """
     categoria = request.args.get('categoria')
+    depth = min(max(request.args.get('depth', 2, type=int), 0), 2)
+    fields = request.args.get('fields')
+    fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = min(max(limit, 1), current_app.config.get('MAX_ITEMS_PER_PAGE', 500))
+    
+    checklists, next_cursor = ChecklistService.list_checklists(
+        categoria=categoria,
+        depth=depth,
+        fields=fields,
+        after_id=after_id,
+        limit=limit
+    )
     
-    query = Checklist.query
-    if categoria:
-        query = query.filter(Checklist.categoria == categoria)
-    
-    checklists = query.all()
-    return jsonify({
+    response = {
         'success': True,
-        'data': [checklist.to_dict() for checklist in checklists]
-    }), 200
+        'data': checklists
+    }
+    if limit is not None:
+        response['next_cursor'] = next_cursor
+    return jsonify(response), 200
 
 @checklist_bp.route('/<int:checklist_id>', methods=['GET'])
 def get_checklist(checklist_id):
@@ -146,6 +166,14 @@ def create_checklist_item(checklist_id):
             'message': 'Nome do item é obrigatório'
         }), 400
     
+    try:
+        deadline = _parse_deadline(data.get('deadline'))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Prazo inválido (use o formato ISO YYYY-MM-DD)'
+        }), 400
+    
     item = ChecklistItem(
         checklist_id=checklist_id,
         nome=data.get('nome'),
@@ -153,7 +181,8 @@ def create_checklist_item(checklist_id):
         categoria=data.get('categoria'),
         risco=data.get('risco', RiscoEnum.MEDIO),
         prioridade=data.get('prioridade', PrioridadeEnum.MEDIA),
-        status=data.get('status', StatusEnum.PENDENTE)
+        status=data.get('status', StatusEnum.PENDENTE),
+        deadline=deadline
     )
     
     db.session.add(item)
@@ -183,6 +212,14 @@ def update_checklist_item(checklist_id, item_id):
         item.prioridade = data.get('prioridade')
     if 'status' in data:
         item.status = data.get('status')
+    if 'deadline' in data:
+        try:
+            item.deadline = _parse_deadline(data.get('deadline'))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Prazo inválido (use o formato ISO YYYY-MM-DD)'
+            }), 400
     
     db.session.commit()
     
@@ -205,6 +242,14 @@ def delete_checklist_item(checklist_id, item_id):
         'message': 'Item excluído com sucesso'
     }), 200
 
+def _parse_deadline(value):
+    """Converte o prazo (ISO) recebido na requisição; vazio remove o prazo"""
+    if not value:
+        return None
+    if not isinstance(value, str):
+        raise ValueError("Prazo deve ser um texto ISO")
+    return datetime.fromisoformat(value)
+
 # Rotas para Evidências
 @checklist_bp.route('/<int:checklist_id>/items/<int:item_id>/evidencias', methods=['POST'])
 def upload_evidencia(checklist_id, item_id):
@@ -316,71 +361,7 @@ def delete_evidencia(checklist_id, item_id, evidencia_id):
 @checklist_bp.route('/metricas', methods=['GET'])
 def get_metricas():
     """Retorna métricas gerais de todos os checklists para o dashboard"""
-    # Total de checklists
-    total_checklists = Checklist.query.count()
-    
-    # Itens por status
-    itens_pendentes = ChecklistItem.query.filter_by(status=StatusEnum.PENDENTE).count()
-    itens_em_andamento = ChecklistItem.query.filter_by(status=StatusEnum.EM_ANDAMENTO).count()
-    itens_concluidos = ChecklistItem.query.filter_by(status=StatusEnum.CONCLUIDO).count()
-    total_itens = itens_pendentes + itens_em_andamento + itens_concluidos
-    
-    # Itens por risco
-    itens_risco_alto = ChecklistItem.query.filter_by(risco=RiscoEnum.ALTO).count()
-    itens_risco_medio = ChecklistItem.query.filter_by(risco=RiscoEnum.MEDIO).count()
-    itens_risco_baixo = ChecklistItem.query.filter_by(risco=RiscoEnum.BAIXO).count()
-    
-    # Percentual de conformidade geral
-    percentual_conformidade = 0
-    if total_itens > 0:
-        percentual_conformidade = int((itens_concluidos / total_itens) * 100)
-    
-    # Métricas por categoria
-    categorias = db.session.query(Checklist.categoria).distinct().all()
-    metricas_por_categoria = []
-    
-    for categoria_tuple in categorias:
-        categoria = categoria_tuple[0]
-        if not categoria:
-            continue
-            
-        checklists_categoria = Checklist.query.filter_by(categoria=categoria).all()
-        total_itens_categoria = 0
-        itens_concluidos_categoria = 0
-        
-        for checklist in checklists_categoria:
-            for item in checklist.items:
-                total_itens_categoria += 1
-                if item.status == StatusEnum.CONCLUIDO:
-                    itens_concluidos_categoria += 1
-        
-        percentual_categoria = 0
-        if total_itens_categoria > 0:
-            percentual_categoria = int((itens_concluidos_categoria / total_itens_categoria) * 100)
-        
-        metricas_por_categoria.append({
-            'categoria': categoria,
-            'total_itens': total_itens_categoria,
-            'itens_concluidos': itens_concluidos_categoria,
-            'percentual_conformidade': percentual_categoria
-        })
-    
     return jsonify({
         'success': True,
-        'data': {
-            'total_checklists': total_checklists,
-            'total_itens': total_itens,
-            'itens_por_status': {
-                'pendentes': itens_pendentes,
-                'em_andamento': itens_em_andamento,
-                'concluidos': itens_concluidos
-            },
-            'itens_por_risco': {
-                'alto': itens_risco_alto,
-                'medio': itens_risco_medio,
-                'baixo': itens_risco_baixo
-            },
-            'percentual_conformidade': percentual_conformidade,
-            'metricas_por_categoria': metricas_por_categoria
-        }
+        'data': ChecklistService.get_metricas()
     }), 200
@@ -1,20 +1,18 @@
 # app/controllers/documentos_controller.py
-from flask import Blueprint, request, jsonify, current_app, send_from_directory, render_template
+from flask import Blueprint, Response, request, jsonify, g, current_app, send_from_directory, stream_with_context
+from werkzeug.utils import secure_filename
+import csv
+import datetime
+import io
+import json
 import os
-import uuid
-import hashlib
-from datetime import datetime
-from weasyprint import HTML, CSS
+import zipfile
 from ..models.documento import Documento
+from ..services.document_render_service import document_renderer
 from ..extensions import db
-import json
 
 documentos_bp = Blueprint('documentos', __name__, url_prefix='/api/documentos')
 
-# Configuração para armazenamento de documentos
-DOCUMENTS_FOLDER = os.path.join(current_app.root_path, 'documents')
-os.makedirs(DOCUMENTS_FOLDER, exist_ok=True)
-
 @documentos_bp.route('/', methods=['GET'])
 def get_documentos():
     """Retorna todos os documentos, com opção de filtro por tipo"""
@@ -41,7 +39,7 @@ def get_documento(documento_id):
 
 @documentos_bp.route('/gerar', methods=['POST'])
 def gerar_documento():
-    """Gera um novo documento legal com base nos dados fornecidos"""
+    """Agenda a geração de um novo documento legal; acompanhe em /api/documentos/jobs/<job_id>"""
     data = request.json
     
     if not data or not data.get('document_type') or not data.get('title'):
@@ -50,77 +48,168 @@ def gerar_documento():
             'message': 'Tipo de documento e título são obrigatórios'
         }), 400
     
-    # Verificar se já existe um documento com o mesmo título e tipo
-    existing_doc = Documento.query.filter_by(
-        title=data.get('title'),
-        document_type=data.get('document_type')
-    ).order_by(Documento.version.desc()).first()
-    
-    # Se existir, incrementar a versão
-    version = 1
-    if existing_doc:
-        version = existing_doc.version + 1
+    # A renderização do PDF acontece no pool de workers, fora da requisição
+    user_id = g.user.id if hasattr(g, 'user') else data.get('user_id')
+    try:
+        job = document_renderer.submit(data, user_id)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
-    # Gerar hash do conteúdo para versionamento/integridade
-    content_hash = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    if job.status == 'error':
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao gerar documento: {job.error}'
+        }), 500
     
-    # Criar diretório para o tipo de documento se não existir
-    doc_type_dir = os.path.join(DOCUMENTS_FOLDER, data.get('document_type'))
-    os.makedirs(doc_type_dir, exist_ok=True)
+    status_code = 201 if job.status == 'done' else 202
+    return jsonify({
+        'success': True,
+        'message': 'Documento gerado com sucesso' if job.status == 'done' else 'Geração do documento agendada',
+        'data': _job_dict(job)
+    }), status_code
+
+@documentos_bp.route('/gerar-lote', methods=['POST'])
+def gerar_documentos_lote():
+    """
+    Gera documentos em lote: um template e várias linhas de contexto
+
+    Aceita JSON ({"document_type", "title", "context", "rows": [...]}) ou
+    multipart com os campos document_type e title e um arquivo CSV em "arquivo"
+    (uma linha por documento, colunas = variáveis do template). O título aceita
+    campos da linha, ex: "Política de Privacidade - {empresa_nome}".
+
+    Retorna um ZIP, enviado à medida que os PDFs ficam prontos, com os
+    documentos gerados e manifest.csv com o status de cada linha.
+    """
+    try:
+        document_type, title, context, rows = _batch_request()
+        max_rows = current_app.config.get('DOCUMENT_BATCH_MAX_ROWS', 1000)
+        if not rows:
+            raise ValueError('Nenhuma linha informada')
+        if len(rows) > max_rows:
+            raise ValueError(f'Máximo de {max_rows} linhas por lote')
+        user_id = g.user.id if hasattr(g, 'user') else None
+        results = document_renderer.render_batch(document_type, rows, title, context, user_id)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
-    # Gerar nome de arquivo único
-    filename = f"{data.get('title').replace(' ', '_')}_{version}_{uuid.uuid4().hex[:8]}.pdf"
-    file_path = os.path.join(doc_type_dir, filename)
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    response = Response(stream_with_context(_zip_chunks(results)), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="documentos_{document_type}_{timestamp}.zip"'
+    return response
+
+def _batch_request():
+    """Extrai tipo, título, contexto comum e linhas da requisição (JSON ou CSV enviado)"""
+    if request.files:
+        arquivo = request.files.get('arquivo')
+        if not arquivo or arquivo.filename == '':
+            raise ValueError('Nenhum arquivo CSV enviado')
+        try:
+            rows = _csv_rows(arquivo.stream)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ValueError(f'CSV inválido: {str(e)}')
+        context = {}
+        if request.form.get('context'):
+            try:
+                context = json.loads(request.form['context'])
+            except ValueError:
+                raise ValueError('context deve ser um objeto JSON')
+        return request.form.get('document_type'), request.form.get('title'), context, rows
     
-    # Gerar o documento PDF
+    data = request.get_json(silent=True) or {}
+    rows = data.get('rows')
+    context = data.get('context') or {}
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError('rows deve ser uma lista de objetos')
+    if not isinstance(context, dict):
+        raise ValueError('context deve ser um objeto JSON')
+    return data.get('document_type'), data.get('title'), context, rows
+
+def _csv_rows(stream):
+    """Lê o CSV (separado por vírgula ou ponto e vírgula); células vazias são ignoradas"""
+    content = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='').read()
     try:
-        # Selecionar o template HTML com base no tipo de documento
-        template_name = f"documentos/{data.get('document_type')}.html"
-        
-        # Renderizar o template com os dados fornecidos
-        html_content = render_template(template_name, **data)
-        
-        # Converter HTML para PDF
-        HTML(string=html_content).write_pdf(
-            file_path,
-            stylesheets=[
-                CSS(string='@page { margin: 1cm; }')
-            ]
-        )
-        
-        # Criar registro do documento no banco de dados
-        documento = Documento(
-            title=data.get('title'),
-            document_type=data.get('document_type'),
-            user_id=data.get('user_id'),
-            content_hash=content_hash,
-            storage_path=file_path,
-            version=version,
-            empresa_nome=data.get('empresa_nome'),
-            tipo_dados=data.get('tipo_dados'),
-            base_legal=data.get('base_legal'),
-            finalidade=data.get('finalidade'),
-            compartilhamento=data.get('compartilhamento')
-        )
-        
-        db.session.add(documento)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': 'Documento gerado com sucesso',
-            'data': documento.to_dict()
-        }), 201
-        
-    except Exception as e:
-        # Em caso de erro, remover o arquivo se foi criado
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        dialect = csv.Sniffer().sniff(content[:4096], delimiters=',;')
+    except csv.Error:
+        dialect = csv.excel
+    return [
+        {key.strip(): value for key, value in row.items() if key and value not in (None, '')}
+        for row in csv.DictReader(io.StringIO(content), dialect=dialect)
+    ]
+
+class _ZipBuffer:
+    """Destino de escrita do ZipFile que entrega os bytes à medida que são gravados"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def _zip_chunks(results):
+    """Monta o ZIP (PDFs + manifest.csv) em blocos, um por documento concluído"""
+    buffer = _ZipBuffer()
+    manifest = []
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for result in results:
+            result['file'] = None
+            if result['status'] == 'done':
+                name = secure_filename(result['title']) or 'documento'
+                result['file'] = f"{result['row']:05d}_{name}_v{result['version']}.pdf"
+                try:
+                    # PDFs já são comprimidos internamente
+                    archive.write(result['path'], result['file'], compress_type=zipfile.ZIP_STORED)
+                except OSError as e:
+                    result.update({'status': 'error', 'file': None, 'error': f'Arquivo indisponível: {str(e)}'})
+            manifest.append(result)
+            yield buffer.pop()
         
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=[
+            'row', 'title', 'status', 'version', 'documento_id', 'cached', 'render_ms', 'file', 'error'
+        ], extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(sorted(manifest, key=lambda result: result['row']))
+        archive.writestr('manifest.csv', output.getvalue())
+    yield buffer.pop()
+
+@documentos_bp.route('/jobs/<string:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Retorna o status de um job de geração (queued, done ou error)"""
+    job = document_renderer.get_job(job_id)
+    if not job:
         return jsonify({
             'success': False,
-            'message': f'Erro ao gerar documento: {str(e)}'
-        }), 500
+            'message': 'Job não encontrado'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': _job_dict(job)
+    }), 200
+
+def _job_dict(job):
+    """Job com o documento gerado (quando concluído)"""
+    data = job.to_dict()
+    if job.documento_id:
+        documento = db.session.get(Documento, job.documento_id)
+        data['documento'] = documento.to_dict() if documento else None
+    return data
 
 @documentos_bp.route('/<int:documento_id>/download', methods=['GET'])
 def download_documento(documento_id):
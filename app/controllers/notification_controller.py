@@ -1,7 +1,8 @@
 # app/controllers/notification_controller.py
-from flask import Blueprint, request, jsonify, g, current_app
+from flask import Blueprint, Response, request, jsonify, g, current_app, stream_with_context
 from ..models.notification import Notification, NotificationStatusEnum, NotificationTypeEnum, NotificationPriorityEnum
-from ..models.checklist_item import ChecklistItem, StatusEnum, RiscoEnum
+from ..services.notification_service import NotificationService, BULK_FILTER_KEYS
+from ..utils.pagination import keyset_paginate
 from ..extensions import db
 from sqlalchemy import desc
 import datetime
@@ -24,6 +25,35 @@ def get_notifications():
     if status:
         query = query.filter_by(status=status)
     
+    # Paginação por cursor (padrão); page mantém a paginação por páginas para clientes antigos
+    if 'page' not in request.args:
+        cursor = request.args.get('cursor')
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), current_app.config.get('MAX_ITEMS_PER_PAGE', 500))
+        include_total = request.args.get('include_total', 'false').lower() in ['true', '1']
+        total_limit = current_app.config.get('PAGINATION_TOTAL_LIMIT', 10000) if include_total else None
+        
+        try:
+            result = keyset_paginate(query, Notification.created_at, Notification.id, cursor, per_page, total_limit)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        data = {
+            'notifications': [notification.to_dict() for notification in result['items']],
+            'next_cursor': result['next_cursor'],
+            'has_more': result['has_more']
+        }
+        if include_total:
+            data['total'] = result['total']
+            data['total_is_estimate'] = result['total_is_estimate']
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+    
     # Ordenar por data de criação (mais recentes primeiro)
     query = query.order_by(desc(Notification.created_at))
     
@@ -47,17 +77,36 @@ def get_notifications():
 @notification_bp.route('/count', methods=['GET'])
 def get_notification_count():
     """Retorna a contagem de notificações não lidas do usuário atual"""
-    count = Notification.query.filter_by(
-        user_id=g.user.id, 
-        status=NotificationStatusEnum.NAO_LIDA
-    ).count()
+    # Servida do cache em memória; If-None-Match com o mesmo valor responde 304 sem corpo
+    count = NotificationService.get_unread_count(g.user.id)
     
-    return jsonify({
+    response = jsonify({
         'success': True,
         'data': {
             'count': count
         }
-    }), 200
+    })
+    response.set_etag(f'unread-{g.user.id}-{count}')
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@notification_bp.route('/stream', methods=['GET'])
+def stream_notifications():
+    """Stream (Server-Sent Events) das novas notificações do usuário atual"""
+    # EventSource reenvia o último ID recebido no cabeçalho Last-Event-ID ao reconectar
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    response = Response(
+        stream_with_context(NotificationService.event_stream(g.user.id, last_event_id)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Desativa o buffer de proxies (nginx)
+    return response
 
 @notification_bp.route('/<int:notification_id>/read', methods=['PUT'])
 def mark_as_read(notification_id):
@@ -67,8 +116,10 @@ def mark_as_read(notification_id):
         user_id=g.user.id
     ).first_or_404()
     
+    old_status = notification.status
     notification.mark_as_read()
     db.session.commit()
+    NotificationService.on_status_changed(g.user.id, old_status, notification.status)
     
     return jsonify({
         'success': True,
@@ -84,9 +135,11 @@ def mark_as_unread(notification_id):
         user_id=g.user.id
     ).first_or_404()
     
+    old_status = notification.status
     notification.status = NotificationStatusEnum.NAO_LIDA
     notification.read_at = None
     db.session.commit()
+    NotificationService.on_status_changed(g.user.id, old_status, notification.status)
     
     return jsonify({
         'success': True,
@@ -102,8 +155,10 @@ def archive_notification(notification_id):
         user_id=g.user.id
     ).first_or_404()
     
+    old_status = notification.status
     notification.archive()
     db.session.commit()
+    NotificationService.on_status_changed(g.user.id, old_status, notification.status)
     
     return jsonify({
         'success': True,
@@ -114,110 +169,75 @@ def archive_notification(notification_id):
 @notification_bp.route('/read-all', methods=['POST'])
 def mark_all_as_read():
     """Marca todas as notificações não lidas do usuário como lidas"""
-    notifications = Notification.query.filter_by(
-        user_id=g.user.id,
-        status=NotificationStatusEnum.NAO_LIDA
-    ).all()
-    
-    now = datetime.datetime.utcnow()
-    for notification in notifications:
-        notification.status = NotificationStatusEnum.LIDA
-        notification.read_at = now
+    affected = NotificationService.mark_all_as_read(g.user.id)
     
-    db.session.commit()
+    return jsonify({
+        'success': True,
+        'message': f'{affected} notificações marcadas como lidas'
+    }), 200
+
+@notification_bp.route('/bulk', methods=['POST'])
+def bulk_update_notifications():
+    """Marca como lidas, arquiva ou exclui em lote as notificações do usuário que atendem aos filtros"""
+    data = request.json or {}
+    action = data.get('action')
+    unknown = set(data) - set(BULK_FILTER_KEYS) - {'action', 'all'}
+    if unknown:
+        return jsonify({
+            'success': False,
+            'message': f'Filtros desconhecidos: {", ".join(sorted(unknown))} (use {", ".join(BULK_FILTER_KEYS)})'
+        }), 400
+    filters = {key: data.get(key) for key in BULK_FILTER_KEYS + ('all',)}
+    
+    operations = {
+        'read': NotificationService.bulk_mark_as_read,
+        'archive': NotificationService.bulk_archive,
+        'delete': NotificationService.bulk_delete
+    }
+    if action not in operations:
+        return jsonify({
+            'success': False,
+            'message': 'Ação inválida (use read, archive ou delete)'
+        }), 400
+    
+    try:
+        affected = operations[action](g.user.id, filters)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
     return jsonify({
         'success': True,
-        'message': f'{len(notifications)} notificações marcadas como lidas'
+        'message': f'{affected} notificações afetadas',
+        'data': {
+            'affected': affected
+        }
     }), 200
 
 @notification_bp.route('/check-deadlines', methods=['GET'])
 def check_deadlines():
     """Verifica itens próximos do vencimento e gera notificações se necessário"""
     # Esta função será chamada sob demanda quando o usuário acessar o dashboard ou a página de checklists
-    
-    # Obter todos os itens de checklist pendentes ou em andamento que têm prazo definido
-    items_with_deadline = ChecklistItem.query.filter(
-        ChecklistItem.status.in_([StatusEnum.PENDENTE, StatusEnum.EM_ANDAMENTO]),
-        ChecklistItem.deadline.isnot(None)
-    ).all()
-    
-    today = datetime.datetime.now().date()
-    notifications_created = 0
-    
-    for item in items_with_deadline:
-        # Verificar se o item tem um prazo e se está próximo do vencimento
-        if not item.deadline:
-            continue
-            
-        deadline_date = item.deadline.date() if isinstance(item.deadline, datetime.datetime) else item.deadline
-        days_remaining = (deadline_date - today).days
-        
-        # Definir prioridade com base no risco do item
-        priority = NotificationPriorityEnum.MEDIA
-        if item.risco == RiscoEnum.ALTO:
-            priority = NotificationPriorityEnum.ALTA
-        elif item.risco == RiscoEnum.BAIXO:
-            priority = NotificationPriorityEnum.BAIXA
-        
-        # Verificar se já existe uma notificação recente para este item
-        existing_notification = Notification.query.filter_by(
-            reference_type="checklist_item",
-            reference_id=item.id,
-            notification_type=NotificationTypeEnum.VENCIMENTO_PROXIMO
-        ).filter(
-            Notification.created_at > datetime.datetime.utcnow() - datetime.timedelta(days=1)
-        ).first()
-        
-        if existing_notification:
-            continue
-        
-        # Gerar notificações com base na proximidade do prazo
-        if days_remaining <= 1:
-            # Prazo vence hoje ou amanhã
-            notification = Notification(
-                user_id=item.checklist.user_id,
-                title=f"URGENTE: Item vence em {days_remaining+1} dia(s)",
-                message=f"O item '{item.nome}' do checklist '{item.checklist.nome}' vence em {days_remaining+1} dia(s).",
-                notification_type=NotificationTypeEnum.VENCIMENTO_PROXIMO,
-                priority=NotificationPriorityEnum.ALTA,  # Sempre alta quando falta 1 dia ou menos
-                reference_type="checklist_item",
-                reference_id=item.id
-            )
-            db.session.add(notification)
-            notifications_created += 1
-            
-        elif days_remaining <= 3:
-            # Prazo vence em 2-3 dias
-            notification = Notification(
-                user_id=item.checklist.user_id,
-                title=f"Item vence em {days_remaining} dias",
-                message=f"O item '{item.nome}' do checklist '{item.checklist.nome}' vence em {days_remaining} dias.",
-                notification_type=NotificationTypeEnum.VENCIMENTO_PROXIMO,
-                priority=priority,
-                reference_type="checklist_item",
-                reference_id=item.id
-            )
-            db.session.add(notification)
-            notifications_created += 1
-            
-        elif days_remaining <= 7:
-            # Prazo vence em 4-7 dias
-            notification = Notification(
-                user_id=item.checklist.user_id,
-                title=f"Item vence em {days_remaining} dias",
-                message=f"O item '{item.nome}' do checklist '{item.checklist.nome}' vence em {days_remaining} dias.",
-                notification_type=NotificationTypeEnum.VENCIMENTO_PROXIMO,
-                priority=NotificationPriorityEnum.BAIXA,  # Baixa prioridade para prazos mais distantes
-                reference_type="checklist_item",
-                reference_id=item.id
-            )
-            db.session.add(notification)
-            notifications_created += 1
-    
-    db.session.commit()
+    if current_app.config.get('SCHEDULER_ENABLED'):
+        # A varredura roda no agendador; nada é executado no caminho da requisição
+        return jsonify({
+            'success': True,
+            'message': 'Verificação de prazos executada pelo agendador',
+            'data': {
+                'scheduled': True
+            }
+        }), 200
+    
+    counts = NotificationService.scan_deadlines()
+    notifications_created = sum(counts.values())
     
     return jsonify({
         'success': True,
-        'message': f'{notifications_created} notificações criadas'
+        'message': f'{notifications_created} notificações criadas',
+        'data': {
+            'buckets': counts,
+            'total': notifications_created
+        }
     }), 200
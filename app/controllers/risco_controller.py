@@ -1,5 +1,5 @@
 # app/controllers/risco_controller.py
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, request, jsonify, g, current_app
 from ..services.risco_service import RiscoService
 from ..extensions import db
 from ..utils.audit_decorators import audit_read, audit_create, audit_update, audit_delete
@@ -189,3 +189,18 @@ def get_dashboard_data():
     dashboard_data = RiscoService.get_dashboard_data()
     return jsonify({"success": True, "data": dashboard_data}), 200
 
+@risco_bp.route("/dashboard/heatmap", methods=["GET"])
+@audit_read(EntityTypeEnum.RISCO, "Usuário {g.user.username} acessou o mapa de calor de riscos")
+def get_heatmap():
+    """Retorna os mapas de calor inerente e residual pré-agregados por célula"""
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({"success": False, "message": "Usuário não autenticado"}), 401
+        
+    escala = request.args.get("escala", current_app.config.get("RISK_MATRIX_SCALE", 5), type=int)
+    top_k = request.args.get("top_k", 5, type=int)
+    if not 1 <= escala <= 10 or not 1 <= top_k <= 50:
+        return jsonify({"success": False, "message": "Parâmetros inválidos: escala deve estar entre 1 e 10 e top_k entre 1 e 50"}), 400
+        
+    heatmap = RiscoService.get_heatmap_data(escala, top_k)
+    return jsonify({"success": True, "data": heatmap}), 200
@@ -0,0 +1,19 @@
+# app/controllers/scheduler_controller.py
+from flask import Blueprint, jsonify, g, current_app
+
+scheduler_bp = Blueprint('scheduler', __name__, url_prefix='/api/scheduler')
+
+@scheduler_bp.route('/jobs', methods=['GET'])
+def get_scheduler_jobs():
+    """Retorna watermarks e métricas de duração dos jobs agendados (admin)"""
+    if not hasattr(g, 'user') or not g.user.is_admin:
+        return jsonify({
+            'success': False,
+            'message': 'Acesso não autorizado'
+        }), 403
+    
+    scheduler = current_app.extensions['scheduler']
+    return jsonify({
+        'success': True,
+        'data': scheduler.metrics()
+    }), 200
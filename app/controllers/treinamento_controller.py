@@ -134,16 +134,28 @@ def get_treinamento_user_progress(treinamento_id):
 @treinamento_bp.route("/<int:treinamento_id>/atribuir", methods=["POST"])
 # @audit_update(EntityTypeEnum.TREINAMENTO, "Admin {g.user.username} atribuiu o treinamento #{treinamento_id} a usuários") # Log feito no service
 def assign_treinamento_to_users(treinamento_id):
-    """Atribui um treinamento a uma lista de usuários (Admin)"""
+    """Atribui um treinamento a uma lista de usuários ou a um seletor de usuários (Admin)"""
     admin_required = require_admin()
     if admin_required: return admin_required
     
     data = request.json
     user_ids = data.get("user_ids")
+    selector = data.get("selector") # Ex: {"company_name": "ACME"}, {"is_admin": false}, {"all": true}
     prazo_conclusao = data.get("prazo_conclusao") # Espera formato ISO (YYYY-MM-DDTHH:MM:SS)
     
+    if selector is not None:
+        try:
+            result = TreinamentoService.assign_treinamento_by_selector(treinamento_id, selector, g.user.id, prazo_conclusao)
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        return jsonify({"success": True, "message": "Atribuição processada", "data": result}), 200
+    
     if not user_ids or not isinstance(user_ids, list):
-        return jsonify({"success": False, "message": "Lista de user_ids é obrigatória"}), 400
+        return jsonify({"success": False, "message": "Lista de user_ids ou selector é obrigatório"}), 400
+    try:
+        user_ids = TreinamentoService.normalize_user_ids(user_ids)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
         
     result = TreinamentoService.assign_treinamento(treinamento_id, user_ids, g.user.id, prazo_conclusao)
     return jsonify({"success": True, "message": "Atribuição processada", "data": result}), 200
@@ -2,7 +2,6 @@
 from flask import request, g
 from ..services.audit_service import AuditService
 from ..models.audit_log import ActionTypeEnum, EntityTypeEnum
-import json
 import re
 
 # Lista de rotas que devem ser monitoradas automaticamente
@@ -37,6 +36,68 @@ MONITORED_ROUTES = [
     {'method': 'GET', 'pattern': r'/api/evidencias/download/\d+', 'action': ActionTypeEnum.DOWNLOAD, 'entity': EntityTypeEnum.EVIDENCIA},
 ]
 
+# Primeiro segmento numérico da URL (ex: /api/users/42 -> 42)
+ENTITY_ID_PATTERN = re.compile(r'/(\d+)')
+
+class RouteMatcher:
+    """
+    Tabela de rotas monitoradas compilada uma única vez.
+
+    Para cada método HTTP é gerada uma única regex com todas as rotas como
+    alternativas nomeadas. Os padrões casam por prefixo (como o re.match
+    original), então as alternativas são ordenadas do padrão mais longo para
+    o mais curto: POST /api/documentos/gerar é registrado como geração, e não
+    também como criação. O ID da entidade é capturado na mesma passada quando
+    o padrão contém um segmento numérico.
+    """
+
+    def __init__(self, routes):
+        self._routes = {}
+        self._patterns = {}
+        alternatives = {}
+        for index, route in enumerate(routes):
+            group = f"r{index}"
+            id_group = None
+            pattern = route['pattern']
+            if r'\d+' in pattern:
+                # Captura o primeiro \d+ do padrão como ID da entidade
+                id_group = f"id{index}"
+                pattern = pattern.replace(r'\d+', f"(?P<{id_group}>\\d+)", 1)
+            alternatives.setdefault(route['method'], []).append((f"(?P<{group}>{pattern})", route['pattern']))
+            self._routes[group] = (route, id_group)
+        for method, method_alternatives in alternatives.items():
+            method_alternatives.sort(key=lambda item: len(item[1]), reverse=True)
+            self._patterns[method] = re.compile("|".join(alternative for alternative, _ in method_alternatives))
+
+    def match(self, method, path):
+        """
+        Retorna (rota, entity_id) para a primeira rota monitorada que casa
+        com o método e o caminho, ou None se a requisição não é monitorada
+        """
+        pattern = self._patterns.get(method)
+        if pattern is None:
+            return None
+        match = pattern.match(path)
+        if match is None:
+            return None
+        route, id_group = self._routes[match.lastgroup]
+        if id_group is not None:
+            entity_id = match.group(id_group)
+        else:
+            # Rotas sem ID no padrão casam por prefixo; mantém a extração original pelo caminho
+            id_match = ENTITY_ID_PATTERN.search(path)
+            entity_id = id_match.group(1) if id_match else None
+        return route, int(entity_id) if entity_id is not None else None
+
+# Compilado em setup_audit_middleware()
+_route_matcher = None
+
+def get_route_matcher():
+    global _route_matcher
+    if _route_matcher is None:
+        _route_matcher = RouteMatcher(MONITORED_ROUTES)
+    return _route_matcher
+
 def log_request():
     """
     Middleware executado antes de cada requisição para registrar ações automaticamente
@@ -46,69 +107,64 @@ def log_request():
         return
     
     # Verificar se a rota atual deve ser monitorada
-    for route in MONITORED_ROUTES:
-        if request.method == route['method'] and re.match(route['pattern'], request.path):
-            try:
-                # Extrair ID da entidade da URL, se disponível
-                entity_id = None
-                match = re.search(r'/(\d+)', request.path)
-                if match:
-                    entity_id = int(match.group(1))
-                
-                # Preparar descrição da ação
-                action_type = route['action']
-                entity_type = route['entity']
-                
-                # Descrição padrão baseada no tipo de ação e entidade
-                description = f"Requisição {action_type} para {entity_type}"
-                
-                # Descrições específicas para ações comuns
-                if action_type == ActionTypeEnum.LOGIN:
-                    description = "Tentativa de login"
-                elif action_type == ActionTypeEnum.LOGOUT:
-                    description = "Logout do sistema"
-                elif action_type == ActionTypeEnum.CREATE:
-                    description = f"Criação de {entity_type}"
-                elif action_type == ActionTypeEnum.UPDATE:
-                    description = f"Atualização de {entity_type} #{entity_id}"
-                elif action_type == ActionTypeEnum.DELETE:
-                    description = f"Exclusão de {entity_type} #{entity_id}"
-                elif action_type == ActionTypeEnum.DOWNLOAD:
-                    description = f"Download de {entity_type} #{entity_id}"
-                elif action_type == ActionTypeEnum.UPLOAD:
-                    description = f"Upload para {entity_type}"
-                elif action_type == ActionTypeEnum.GENERATE:
-                    description = f"Geração de {entity_type}"
-                
-                # Obter dados adicionais do corpo da requisição (para POST/PUT)
-                additional_data = None
-                if request.is_json and (request.method == 'POST' or request.method == 'PUT'):
-                    # Copiar dados para não modificar a requisição original
-                    data = request.get_json(silent=True)
-                    if data:
-                        # Remover campos sensíveis
-                        if isinstance(data, dict):
-                            data_copy = data.copy()
-                            for field in ['password', 'senha', 'token', 'secret']:
-                                if field in data_copy:
-                                    data_copy[field] = '******'
-                            additional_data = json.dumps(data_copy)
-                
-                # Registrar a ação
-                user_id = g.user.id if hasattr(g, 'user') else None
-                
-                AuditService.log_action(
-                    action_type=action_type,
-                    entity_type=entity_type,
-                    entity_id=entity_id,
-                    description=description,
-                    user_id=user_id,
-                    additional_data=additional_data
-                )
-            except Exception as e:
-                # Não deve interromper a execução normal se o logging falhar
-                print(f"Erro ao registrar log de auditoria no middleware: {str(e)}")
-                
+    result = get_route_matcher().match(request.method, request.path)
+    if result is not None:
+        route, entity_id = result
+        try:
+            # Preparar descrição da ação
+            action_type = route['action']
+            entity_type = route['entity']
+            
+            # Descrição padrão baseada no tipo de ação e entidade
+            description = f"Requisição {action_type} para {entity_type}"
+            
+            # Descrições específicas para ações comuns
+            if action_type == ActionTypeEnum.LOGIN:
+                description = "Tentativa de login"
+            elif action_type == ActionTypeEnum.LOGOUT:
+                description = "Logout do sistema"
+            elif action_type == ActionTypeEnum.CREATE:
+                description = f"Criação de {entity_type}"
+            elif action_type == ActionTypeEnum.UPDATE:
+                description = f"Atualização de {entity_type} #{entity_id}"
+            elif action_type == ActionTypeEnum.DELETE:
+                description = f"Exclusão de {entity_type} #{entity_id}"
+            elif action_type == ActionTypeEnum.DOWNLOAD:
+                description = f"Download de {entity_type} #{entity_id}"
+            elif action_type == ActionTypeEnum.UPLOAD:
+                description = f"Upload para {entity_type}"
+            elif action_type == ActionTypeEnum.GENERATE:
+                description = f"Geração de {entity_type}"
+            
+            # Obter dados adicionais do corpo da requisição (para POST/PUT)
+            additional_data = None
+            if request.is_json and (request.method == 'POST' or request.method == 'PUT'):
+                # Copiar dados para não modificar a requisição original
+                data = request.get_json(silent=True)
+                if data:
+                    # Remover campos sensíveis
+                    if isinstance(data, dict):
+                        data_copy = data.copy()
+                        for field in ['password', 'senha', 'token', 'secret']:
+                            if field in data_copy:
+                                data_copy[field] = '******'
+                        additional_data = data_copy
+            
+            # Registrar a ação
+            user_id = g.user.id if hasattr(g, 'user') else None
+            
+            AuditService.log_action(
+                action_type=action_type,
+                entity_type=entity_type,
+                entity_id=entity_id,
+                description=description,
+                user_id=user_id,
+                additional_data=additional_data
+            )
+        except Exception as e:
+            # Não deve interromper a execução normal se o logging falhar
+            print(f"Erro ao registrar log de auditoria no middleware: {str(e)}")
+            
     # Continuar com a requisição normalmente
     return None
 
@@ -125,5 +181,7 @@ def setup_audit_middleware(app):
     """
     Configura o middleware de auditoria na aplicação Flask
     """
+    global _route_matcher
+    _route_matcher = RouteMatcher(MONITORED_ROUTES)
     app.before_request(log_request)
     app.after_request(log_response)
@@ -0,0 +1,33 @@
+# app/models/audit_checkpoint.py
+from ..extensions import db
+import datetime
+
+class AuditCheckpoint(db.Model):
+    """Ponto verificado da cadeia de hashes de audit_logs (âncora para verificações incrementais)"""
+    __tablename__ = "audit_checkpoints"
+
+    id = db.Column(db.Integer, primary_key=True)
+    last_log_id = db.Column(db.Integer, nullable=False, unique=True)  # Último log coberto pelo checkpoint
+    row_hash = db.Column(db.String(64), nullable=False)  # row_hash do log last_log_id
+    log_count = db.Column(db.Integer, nullable=False, default=0)  # Logs verificados desde o checkpoint anterior
+    reason = db.Column(db.String(20), nullable=False, default="periodic")  # "periodic" ou "archive"
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __init__(self, last_log_id, row_hash, log_count=0, reason="periodic"):
+        self.last_log_id = last_log_id
+        self.row_hash = row_hash
+        self.log_count = log_count
+        self.reason = reason
+
+    def __repr__(self):
+        return f"<AuditCheckpoint {self.last_log_id}: {self.row_hash[:12]}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "last_log_id": self.last_log_id,
+            "row_hash": self.row_hash,
+            "log_count": self.log_count,
+            "reason": self.reason,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
@@ -1,8 +1,16 @@
 # app/models/audit_log.py
 from ..extensions import db
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.postgresql import JSONB
 import datetime
+import json
 from enum import Enum
 
+# Configuração de idioma da busca textual no PostgreSQL (o índice GIN usa a mesma expressão)
+FTS_CONFIG = "portuguese"
+# Tabela FTS5 (external content) que indexa audit_logs.description no SQLite
+SQLITE_FTS_TABLE = "audit_logs_fts"
+
 class ActionTypeEnum(str, Enum):
     CREATE = "create"
     READ = "read"
@@ -22,6 +30,11 @@ class EntityTypeEnum(str, Enum):
     EVIDENCIA = "evidencia"
     DOCUMENTO = "documento"
     NOTIFICATION = "notification"
+    RISCO = "risco"
+    AVALIACAO_RISCO = "avaliacao_risco"
+    PLANO_TRATAMENTO = "plano_tratamento"
+    TREINAMENTO = "treinamento"
+    STATUS_TREINAMENTO = "status_treinamento"
     SYSTEM = "system"
 
 class AuditLog(db.Model):
@@ -36,8 +49,42 @@ class AuditLog(db.Model):
     ip_address = db.Column(db.String(50), nullable=True)
     user_agent = db.Column(db.String(255), nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    additional_data = db.Column(db.Text, nullable=True)  # JSON com dados adicionais
+    # JSON nativo: JSONB no PostgreSQL, texto JSON (JSON1) no SQLite
+    additional_data = db.Column(
+        db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=True
+    )
+    # Cadeia de hashes (SHA-256) em ordem de id, preenchida por AuditChain.seal
+    previous_hash = db.Column(db.String(64), nullable=True)
+    row_hash = db.Column(db.String(64), nullable=True)
     
+    # Índices: paginação por cursor em (timestamp, id) e filtros por entidade, usuário e ação ordenados por data
+    __table_args__ = (
+        db.Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        db.Index("ix_audit_logs_entity_timestamp", "entity_type", "entity_id", "timestamp"),
+        db.Index("ix_audit_logs_user_timestamp", "user_id", "timestamp"),
+        db.Index("ix_audit_logs_action_timestamp", "action_type", "timestamp"),
+        # Busca textual em description (PostgreSQL); no SQLite é usada a tabela FTS5
+        db.Index(
+            "ix_audit_logs_description_fts",
+            db.func.to_tsvector(db.literal_column(f"'{FTS_CONFIG}'::regconfig"), description),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+        # Consultas por chave em additional_data: GIN (jsonb_path_ops) para @> no PostgreSQL
+        # e índice de expressão na chave mais consultada no SQLite
+        db.Index(
+            "ix_audit_logs_additional_data",
+            additional_data,
+            postgresql_using="gin",
+            postgresql_ops={"additional_data": "jsonb_path_ops"}
+        ).ddl_if(dialect="postgresql"),
+        db.Index(
+            "ix_audit_logs_data_treinamento_id",
+            db.func.json_extract(additional_data, db.literal_column("'$.treinamento_id'"))
+        ).ddl_if(dialect="sqlite"),
+        # No SQLite, ids nunca são reutilizados após o arquivamento (a cadeia de hashes segue a ordem dos ids)
+        {"sqlite_autoincrement": True},
+    )
+
     # Relacionamentos
     user = db.relationship("User", backref=db.backref("audit_logs", lazy=True))
     
@@ -51,7 +98,7 @@ class AuditLog(db.Model):
         self.description = description
         self.ip_address = ip_address
         self.user_agent = user_agent
-        self.additional_data = additional_data
+        self.additional_data = normalize_additional_data(additional_data)
     
     def to_dict(self):
         return {
@@ -67,3 +114,41 @@ class AuditLog(db.Model):
             "additional_data": self.additional_data,
             "user": self.user.username if self.user else None
         }
+
+def normalize_additional_data(value):
+    """
+    Converte additional_data para o valor JSON armazenado
+
+    Strings com JSON (inclusive codificado mais de uma vez, como o middleware
+    gravava) são decodificadas; texto que não é JSON é mantido como string.
+    """
+    while isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            break
+    return value
+
+def search_vector():
+    """Expressão tsvector de description, idêntica à do índice ix_audit_logs_description_fts"""
+    return db.func.to_tsvector(db.literal_column(f"'{FTS_CONFIG}'::regconfig"), AuditLog.description)
+
+# SQLite: tabela FTS5 sincronizada por triggers a cada INSERT/UPDATE/DELETE em audit_logs
+SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+    "description, content='audit_logs', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS audit_logs_fts_insert AFTER INSERT ON audit_logs BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS audit_logs_fts_delete AFTER DELETE ON audit_logs BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS audit_logs_fts_update AFTER UPDATE OF description ON audit_logs BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+)
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(AuditLog.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    AuditLog.__table__, "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}").execute_if(dialect="sqlite")
+)
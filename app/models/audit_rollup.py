@@ -0,0 +1,39 @@
+# app/models/audit_rollup.py
+from ..extensions import db
+
+# user_id usado nos agregados para ações sem usuário (sistema)
+SYSTEM_USER_ID = 0
+
+class AuditRollup(db.Model):
+    """Contagem de logs de auditoria por hora, tipo de ação, tipo de entidade e usuário"""
+    __tablename__ = "audit_rollups"
+
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_start = db.Column(db.DateTime, nullable=False)  # Início da hora (UTC)
+    action_type = db.Column(db.String(50), nullable=False)
+    entity_type = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False, default=SYSTEM_USER_ID)  # SYSTEM_USER_ID para ações do sistema
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Índices
+    __table_args__ = (
+        db.UniqueConstraint("bucket_start", "action_type", "entity_type", "user_id", name="uq_audit_rollup_bucket"),
+    )
+
+    def __repr__(self):
+        return f"<AuditRollup {self.bucket_start} {self.action_type}/{self.entity_type} user={self.user_id}: {self.count}>"
+
+class AuditRollupState(db.Model):
+    """Watermark da compactação: horas anteriores a rolled_up_until estão em audit_rollups"""
+    __tablename__ = "audit_rollup_state"
+
+    name = db.Column(db.String(50), primary_key=True)
+    rolled_up_until = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+    def __init__(self, name, rolled_up_until=None):
+        self.name = name
+        self.rolled_up_until = rolled_up_until
+
+    def __repr__(self):
+        return f"<AuditRollupState {self.name}: {self.rolled_up_until}>"
@@ -31,7 +31,7 @@ class AvaliacaoRisco(db.Model):
     observacoes = db.Column(db.Text, nullable=True)
 
     # Relacionamentos
-    risco = db.relationship("Risco", back_populates="avaliacoes")
+    risco = db.relationship("Risco", back_populates="avaliacoes", foreign_keys=[risco_id])
     avaliado_por = db.relationship("User")
 
     def __init__(self, risco_id, probabilidade, impacto, avaliado_por_id=None, 
@@ -25,17 +25,20 @@ class Checklist(db.Model):
     def __repr__(self):
         return f"<Checklist {self.nome}>"
 
-    def to_dict(self):
-        return {
+    def to_dict(self, depth=2):
+        """depth: 0 = sem itens, 1 = itens sem evidências, 2 = itens com evidências"""
+        data = {
             "id": self.id,
             "nome": self.nome,
             "categoria": self.categoria,
             "descricao": self.descricao,
             "user_id": self.user_id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "items": [item.to_dict() for item in self.items]
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
         }
+        if depth >= 1:
+            data["items"] = [item.to_dict(include_evidencias=depth >= 2) for item in self.items]
+        return data
     
     @property
     def total_items(self):
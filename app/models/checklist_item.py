@@ -29,15 +29,19 @@ class ChecklistItem(db.Model):
     risco = db.Column(db.String(20), nullable=False, default=RiscoEnum.MEDIO)
     prioridade = db.Column(db.String(20), nullable=False, default=PrioridadeEnum.MEDIA)
     status = db.Column(db.String(20), nullable=False, default=StatusEnum.PENDENTE)
+    deadline = db.Column(db.DateTime, nullable=True)  # Prazo para conclusão do item
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
+    # Índices (varredura de prazos: itens em aberto com vencimento próximo)
+    __table_args__ = (db.Index("ix_checklist_items_status_deadline", "status", "deadline"),)
+
     # Relacionamentos
     evidencias = db.relationship("Evidencia", backref="item", lazy=True, cascade="all, delete-orphan")
     
     def __init__(self, checklist_id, nome, descricao=None, categoria=None, 
                  risco=RiscoEnum.MEDIO, prioridade=PrioridadeEnum.MEDIA, 
-                 status=StatusEnum.PENDENTE):
+                 status=StatusEnum.PENDENTE, deadline=None):
         self.checklist_id = checklist_id
         self.nome = nome
         self.descricao = descricao
@@ -45,12 +49,13 @@ class ChecklistItem(db.Model):
         self.risco = risco
         self.prioridade = prioridade
         self.status = status
+        self.deadline = deadline
 
     def __repr__(self):
         return f"<ChecklistItem {self.nome} (Risco: {self.risco}, Status: {self.status})>"
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include_evidencias=True):
+        data = {
             "id": self.id,
             "checklist_id": self.checklist_id,
             "nome": self.nome,
@@ -59,7 +64,10 @@ class ChecklistItem(db.Model):
             "risco": self.risco,
             "prioridade": self.prioridade,
             "status": self.status,
+            "deadline": self.deadline.isoformat() if self.deadline else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "evidencias": [evidencia.to_dict() for evidencia in self.evidencias]
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
         }
+        if include_evidencias:
+            data["evidencias"] = [evidencia.to_dict() for evidencia in self.evidencias]
+        return data
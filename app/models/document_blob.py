@@ -0,0 +1,25 @@
+# app/models/document_blob.py
+from ..extensions import db
+import datetime
+
+class DocumentBlob(db.Model):
+    """PDF gerado, endereçado por (versão do template, hash do conteúdo) e compartilhado entre versões de Documento"""
+    __tablename__ = "document_blobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    template_version = db.Column(db.String(64), nullable=False)  # SHA-256 do template e da folha de estilo
+    content_hash = db.Column(db.String(64), nullable=False)  # SHA-256 dos dados do documento
+    storage_path = db.Column(db.String(512), nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False, default=0)
+    hit_count = db.Column(db.Integer, nullable=False, default=0)  # Gerações atendidas sem renderizar
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)  # Ordem de remoção (LRU)
+
+    # Índices
+    __table_args__ = (
+        db.UniqueConstraint("template_version", "content_hash", name="uq_document_blobs_key"),
+        db.Index("ix_document_blobs_last_used_at", "last_used_at"),
+    )
+
+    def __repr__(self):
+        return f"<DocumentBlob {self.content_hash[:12]} ({self.size_bytes} bytes)>"
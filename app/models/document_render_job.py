@@ -0,0 +1,45 @@
+# app/models/document_render_job.py
+from ..extensions import db
+import datetime
+
+class DocumentRenderJob(db.Model):
+    """Job de geração de PDF executado pelo pool de renderização"""
+    __tablename__ = "document_render_jobs"
+
+    id = db.Column(db.String(32), primary_key=True)  # UUID (hex)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, done, error
+    document_type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    documento_id = db.Column(db.Integer, db.ForeignKey("documentos.id"), nullable=True)  # Documento criado ao concluir
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    render_ms = db.Column(db.Float, nullable=True)  # Tempo de renderização no worker
+    cached = db.Column(db.Boolean, nullable=False, default=False)  # PDF reutilizado de um DocumentBlob existente
+
+    def __init__(self, id, document_type, title, user_id=None):
+        self.id = id
+        self.document_type = document_type
+        self.title = title
+        self.user_id = user_id
+        self.status = "queued"
+        self.cached = False
+
+    def __repr__(self):
+        return f"<DocumentRenderJob {self.id} ({self.status})>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "document_type": self.document_type,
+            "title": self.title,
+            "user_id": self.user_id,
+            "documento_id": self.documento_id,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "render_ms": self.render_ms,
+            "cached": self.cached
+        }
@@ -11,6 +11,7 @@ class Documento(db.Model):
     content_hash = db.Column(db.String(256), nullable=True) # Hash do conteúdo para versionamento/integridade
     version = db.Column(db.Integer, default=1)
     storage_path = db.Column(db.String(512), nullable=True) # Caminho para o arquivo no sistema de arquivos ou S3
+    blob_id = db.Column(db.Integer, db.ForeignKey("document_blobs.id"), nullable=True, index=True) # PDF compartilhado (DocumentBlob)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True) # Quem criou/possui o documento
@@ -27,12 +28,14 @@ class Documento(db.Model):
     assinatura_url = db.Column(db.String(512), nullable=True) # URL para documento assinado ou página de assinatura
 
     def __init__(self, title, document_type, user_id=None, content_hash=None, storage_path=None,
-                empresa_nome=None, tipo_dados=None, base_legal=None, finalidade=None, compartilhamento=None):
+                empresa_nome=None, tipo_dados=None, base_legal=None, finalidade=None, compartilhamento=None,
+                version=1):
         self.title = title
         self.document_type = document_type
         self.user_id = user_id
         self.content_hash = content_hash
         self.storage_path = storage_path
+        self.version = version
         self.empresa_nome = empresa_nome
         self.tipo_dados = tipo_dados
         self.base_legal = base_legal
@@ -36,6 +36,14 @@ class Notification(db.Model):
     reference_type = db.Column(db.String(50), nullable=True)  # "checklist_item", "documento", etc.
     reference_id = db.Column(db.Integer, nullable=True)
     
+    # Índices (notificações recentes por objeto referenciado, replay do stream e paginação por usuário, retenção)
+    __table_args__ = (
+        db.Index("ix_notifications_reference", "reference_type", "reference_id", "notification_type", "created_at"),
+        db.Index("ix_notifications_user_id_id", "user_id", "id"),
+        db.Index("ix_notifications_user_created_at_id", "user_id", "created_at", "id"),
+        db.Index("ix_notifications_status_created_at", "status", "created_at"),
+    )
+
     # Relacionamentos
     user = db.relationship("User", backref=db.backref("notifications", lazy=True))
     
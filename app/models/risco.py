@@ -26,10 +26,17 @@ class Risco(db.Model):
     status = db.Column(db.String(50), nullable=False, default=StatusRiscoEnum.IDENTIFICADO)
     data_atualizacao = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     checklist_item_id = db.Column(db.Integer, db.ForeignKey("checklist_items.id"), nullable=True)
+    # Ponteiro para a avaliação mais recente, mantido por RiscoService.create_avaliacao
+    ultima_avaliacao_id = db.Column(
+        db.Integer,
+        db.ForeignKey("avaliacoes_risco.id", use_alter=True, name="fk_riscos_ultima_avaliacao_id", ondelete="SET NULL"),
+        nullable=True
+    )
 
     # Relacionamentos
     identificado_por = db.relationship("User")
-    avaliacoes = db.relationship("AvaliacaoRisco", back_populates="risco", lazy="dynamic", cascade="all, delete-orphan")
+    avaliacoes = db.relationship("AvaliacaoRisco", back_populates="risco", lazy="dynamic", cascade="all, delete-orphan", foreign_keys="AvaliacaoRisco.risco_id")
+    ultima_avaliacao_registro = db.relationship("AvaliacaoRisco", foreign_keys=[ultima_avaliacao_id], post_update=True)
     planos_tratamento = db.relationship("PlanoTratamento", back_populates="risco", lazy="dynamic", cascade="all, delete-orphan")
     # checklist_item será definido no ChecklistItem
 
@@ -47,6 +54,10 @@ class Risco(db.Model):
 
     @property
     def ultima_avaliacao(self):
+        if self.ultima_avaliacao_id is not None:
+            return self.ultima_avaliacao_registro
+        # Riscos ainda sem o ponteiro preenchido: busca a avaliação mais recente
+        from .avaliacao_risco import AvaliacaoRisco
         return self.avaliacoes.order_by(AvaliacaoRisco.data_avaliacao.desc()).first()
 
     def to_dict(self, include_details=False):
@@ -0,0 +1,47 @@
+# app/models/scheduled_job.py
+from ..extensions import db
+
+class ScheduledJob(db.Model):
+    """Estado persistido de um job agendado (watermark, métricas e lease do líder)"""
+    __tablename__ = "scheduled_jobs"
+
+    name = db.Column(db.String(100), primary_key=True)
+    last_started_at = db.Column(db.DateTime, nullable=True)
+    last_finished_at = db.Column(db.DateTime, nullable=True)
+    last_success_at = db.Column(db.DateTime, nullable=True)  # Watermark: início da última execução bem-sucedida
+    last_status = db.Column(db.String(20), nullable=True)  # "success" ou "error"
+    last_error = db.Column(db.Text, nullable=True)
+    last_result = db.Column(db.Text, nullable=True)  # JSON retornado pelo job
+    last_duration_ms = db.Column(db.Float, nullable=True)
+    max_duration_ms = db.Column(db.Float, nullable=True)
+    total_duration_ms = db.Column(db.Float, nullable=False, default=0)
+    run_count = db.Column(db.Integer, nullable=False, default=0)
+    failure_count = db.Column(db.Integer, nullable=False, default=0)
+    # Lease usado na eleição de líder quando o banco não tem advisory locks
+    lease_owner = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+
+    def __init__(self, name):
+        self.name = name
+        self.total_duration_ms = 0
+        self.run_count = 0
+        self.failure_count = 0
+
+    def __repr__(self):
+        return f"<ScheduledJob {self.name} ({self.last_status})>"
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_success_at": self.last_success_at.isoformat() if self.last_success_at else None,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "last_result": self.last_result,
+            "last_duration_ms": self.last_duration_ms,
+            "max_duration_ms": self.max_duration_ms,
+            "avg_duration_ms": self.total_duration_ms / self.run_count if self.run_count else None,
+            "run_count": self.run_count,
+            "failure_count": self.failure_count
+        }
@@ -15,6 +15,10 @@ class Treinamento(db.Model):
     duracao_estimada = db.Column(db.Integer, nullable=True) # Em minutos
     ativo = db.Column(db.Boolean, default=True)
 
+    # Índices
+    # Catálogo: filtra por ativo (e opcionalmente categoria) e ordena por data de criação
+    __table_args__ = (db.Index("ix_treinamentos_ativo_categoria", "ativo", "categoria", "data_criacao"),)
+
     # Relacionamentos
     criado_por = db.relationship("User")
     # O relacionamento com StatusUsuarioTreinamento será definido no modelo StatusUsuarioTreinamento
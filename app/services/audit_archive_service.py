@@ -0,0 +1,248 @@
+# app/services/audit_archive_service.py
+from ..extensions import db
+from ..models.audit_log import AuditLog
+from ..utils.db_utils import dialect_name
+from .audit_chain import AuditChain
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+import click
+import datetime
+import gzip
+import json
+import sys
+import os
+import re
+
+# Partições mensais de audit_logs no PostgreSQL: audit_logs_y2026m01, audit_logs_y2026m02, ...
+PARTITION_NAME_PATTERN = re.compile(r"^audit_logs_y(\d{4})m(\d{2})$")
+
+class AuditArchiveService:
+    @staticmethod
+    def is_partitioned():
+        """Indica se audit_logs é uma tabela particionada (apenas PostgreSQL)"""
+        if dialect_name() != "postgresql":
+            return False
+        return db.session.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'audit_logs'::regclass)"
+        )).scalar()
+
+    @staticmethod
+    def ensure_partitions(months_ahead=None):
+        """
+        Cria as partições mensais do mês corrente e dos próximos meses (se ainda não existirem)
+
+        Returns:
+            list: Nomes das partições criadas
+        """
+        if not AuditArchiveService.is_partitioned():
+            return []
+        months_ahead = months_ahead if months_ahead is not None else current_app.config.get("AUDIT_PARTITION_MONTHS_AHEAD", 3)
+
+        existing = set(AuditArchiveService._partition_months())
+        month = _month_start(datetime.datetime.utcnow())
+        created = []
+        for _ in range(months_ahead + 1):
+            if month not in existing:
+                name = partition_name(month)
+                db.session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_logs "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+                ))
+                created.append(name)
+            month = _next_month(month)
+        db.session.commit()
+        return created
+
+    @staticmethod
+    def archive(before, output_dir=None, chunk_size=None):
+        """
+        Move para arquivos NDJSON comprimidos (gzip) os logs anteriores a `before`
+
+        O arquivamento é feito por ID, para manter a cadeia de hashes contínua: o
+        corte é o maior ID anterior a `before`, e todos os logs até ele são
+        arquivados (inclusive os poucos gravados fora de ordem de data, como
+        leituras agrupadas). A cadeia até o corte é verificada antes e um
+        checkpoint é registrado nele.
+
+        Com particionamento, cada partição mensal totalmente anterior ao corte é
+        exportada (com os logs de outras partições de ID menor) e removida. Sem
+        particionamento (SQLite ou PostgreSQL sem partições), os registros são
+        exportados e removidos em blocos de IDs.
+
+        Args:
+            before (datetime): Data de corte (exclusiva)
+            output_dir (str, optional): Diretório dos arquivos (AUDIT_ARCHIVE_DIR)
+            chunk_size (int, optional): Registros por bloco de leitura/remoção
+
+        Returns:
+            list: Dicts com arquivo gerado e quantidade de registros
+
+        Raises:
+            RuntimeError: Se a cadeia de hashes estiver quebrada até o corte (nada é arquivado)
+        """
+        output_dir = output_dir or current_app.config.get("AUDIT_ARCHIVE_DIR")
+        chunk_size = chunk_size or current_app.config.get("AUDIT_ARCHIVE_CHUNK_SIZE", 5000)
+        os.makedirs(output_dir, exist_ok=True)
+
+        if AuditArchiveService.is_partitioned():
+            return AuditArchiveService._archive_partitions(before, output_dir, chunk_size)
+        return AuditArchiveService._archive_rows(before, output_dir, chunk_size)
+
+    @staticmethod
+    def _archive_partitions(before, output_dir, chunk_size):
+        archived = []
+        for month in sorted(AuditArchiveService._partition_months()):
+            if _next_month(month) > before:
+                continue
+            name = partition_name(month)
+
+            # A exportação é feita com a partição ainda anexada e bloqueada para escrita (leituras
+            # continuam); ela só é removida, na mesma transação, depois que o arquivo foi gravado
+            # por completo. Se a exportação falhar, a partição continua em audit_logs.
+            path = os.path.join(output_dir, f"{name}.ndjson.gz")
+            try:
+                db.session.execute(text(f"LOCK TABLE {name} IN EXCLUSIVE MODE"))
+                last_id = db.session.execute(text(f"SELECT max(id) FROM {name}")).scalar()
+                if last_id is None:
+                    count = 0
+                else:
+                    # Checkpoint verificado no último log da partição: a cadeia restante continua verificável
+                    AuditChain.verified_checkpoint(last_id, reason="archive", commit=False)
+                    # Logs de outras partições com ID menor (gravados fora de ordem de data) vão junto
+                    count = AuditArchiveService._export(
+                        text("SELECT * FROM audit_logs WHERE id <= :last_id ORDER BY id").bindparams(last_id=last_id),
+                        path, chunk_size
+                    )
+                db.session.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+                db.session.execute(text(f"DROP TABLE {name}"))
+                if last_id is not None:
+                    db.session.execute(text("DELETE FROM audit_logs WHERE id <= :last_id"), {"last_id": last_id})
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                if os.path.exists(path):
+                    os.remove(path)
+                raise
+            archived.append({"file": path, "records": count, "partition": name})
+        return archived
+
+    @staticmethod
+    def _archive_rows(before, output_dir, chunk_size):
+        last_id = db.session.query(db.func.max(AuditLog.id)).filter(AuditLog.timestamp < before).scalar()
+        if last_id is None:
+            return []
+
+        # Checkpoint verificado no último log arquivado: a cadeia restante continua verificável,
+        # e adulterações anteriores ao corte não são arquivadas como válidas
+        AuditChain.verified_checkpoint(last_id, reason="archive")
+
+        path = os.path.join(output_dir, f"audit_logs_before_{before.strftime('%Y%m%d')}.ndjson.gz")
+        statement = db.select(AuditLog.__table__).where(AuditLog.id <= last_id).order_by(AuditLog.id)
+        count = AuditArchiveService._export(statement, path, chunk_size)
+
+        # Remoção em blocos para não manter uma transação longa sobre a tabela
+        while True:
+            ids = [log_id for (log_id,) in db.session.query(AuditLog.id).filter(
+                AuditLog.id <= last_id
+            ).order_by(AuditLog.id).limit(chunk_size)]
+            if not ids:
+                break
+            AuditLog.query.filter(AuditLog.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+        return [{"file": path, "records": count}]
+
+    @staticmethod
+    def _export(statement, path, chunk_size):
+        """Grava o resultado da consulta em NDJSON comprimido, lendo em blocos"""
+        temporary_path = path + ".partial"
+        count = 0
+        try:
+            with gzip.open(temporary_path, "wt", encoding="utf-8") as archive_file:
+                result = db.session.execute(statement.execution_options(stream_results=True, yield_per=chunk_size))
+                for row in result.mappings():
+                    archive_file.write(json.dumps(dict(row), default=_json_default) + "\n")
+                    count += 1
+        except Exception:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        os.replace(temporary_path, path)
+        return count
+
+    @staticmethod
+    def _partition_months():
+        rows = db.session.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = 'audit_logs'"
+        ))
+        months = []
+        for (name,) in rows:
+            match = PARTITION_NAME_PATTERN.match(name)
+            if match:
+                months.append(datetime.datetime(int(match.group(1)), int(match.group(2)), 1))
+        return months
+
+def partition_name(month):
+    return f"audit_logs_y{month.year:04d}m{month.month:02d}"
+
+def _month_start(value):
+    return datetime.datetime(value.year, value.month, 1)
+
+def _next_month(month):
+    return datetime.datetime(month.year + (month.month // 12), month.month % 12 + 1, 1)
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+# Comandos de CLI: flask audit archive | ensure-partitions | verify | checkpoint
+audit_cli = AppGroup("audit", help="Manutenção da tabela de auditoria")
+
+@audit_cli.command("archive")
+@click.option("--before", required=True, help="Data de corte (YYYY-MM-DD, exclusiva)")
+@click.option("--output-dir", default=None, help="Diretório dos arquivos .ndjson.gz")
+def archive_command(before, output_dir):
+    """Arquiva em arquivos comprimidos e remove os logs anteriores à data de corte"""
+    try:
+        cutoff = datetime.datetime.strptime(before, "%Y-%m-%d")
+    except ValueError:
+        raise click.BadParameter("Use o formato YYYY-MM-DD", param_hint="--before")
+    try:
+        archived = AuditArchiveService.archive(cutoff, output_dir)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    for entry in archived:
+        click.echo(f"{entry['file']}: {entry['records']} registros")
+
+@audit_cli.command("ensure-partitions")
+@click.option("--months-ahead", type=int, default=None, help="Meses futuros a criar")
+def ensure_partitions_command(months_ahead):
+    """Cria as partições mensais futuras de audit_logs (PostgreSQL particionado)"""
+    if not AuditArchiveService.is_partitioned():
+        click.echo("audit_logs não é particionada; nada a fazer")
+        return
+    created = AuditArchiveService.ensure_partitions(months_ahead)
+    click.echo(f"Partições criadas: {', '.join(created) if created else 'nenhuma'}")
+
+@audit_cli.command("verify")
+@click.option("--start-id", type=int, default=None, help="Primeiro log a verificar")
+@click.option("--end-id", type=int, default=None, help="Último log a verificar")
+@click.option("--workers", type=int, default=None, help="Processos paralelos")
+def verify_command(start_id, end_id, workers):
+    """Verifica a cadeia de hashes dos logs a partir do checkpoint mais próximo"""
+    result = AuditChain.verify(start_id, end_id, workers)
+    click.echo(json.dumps(result, default=str, indent=2))
+    if not result["valid"]:
+        sys.exit(1)
+
+@audit_cli.command("checkpoint")
+def checkpoint_command():
+    """Verifica os logs desde o último checkpoint e registra um novo"""
+    result = AuditChain.create_checkpoint()
+    click.echo(json.dumps(result, default=str, indent=2))
+    if not result["valid"]:
+        sys.exit(1)
@@ -0,0 +1,268 @@
+# app/services/audit_chain.py
+from ..extensions import db
+from ..models.audit_log import AuditLog
+from ..models.audit_checkpoint import AuditCheckpoint
+from flask import current_app
+from sqlalchemy import create_engine, select, text
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import threading
+
+# previous_hash do primeiro log da cadeia
+GENESIS_HASH = "0" * 64
+# Campos que entram no hash de cada log (o id não entra: a ordem da cadeia é a ordem dos ids)
+CHAIN_FIELDS = (
+    "user_id", "action_type", "entity_type", "entity_id", "description",
+    "ip_address", "user_agent", "timestamp", "additional_data"
+)
+# Chave do advisory lock (PostgreSQL) que serializa a gravação entre processos
+CHAIN_LOCK_KEY = 724002
+# Limite de erros detalhados retornados pela verificação
+MAX_REPORTED_ERRORS = 100
+
+# Serializa a gravação dentro do processo; deve envolver seal, INSERT e commit
+audit_chain_lock = threading.Lock()
+
+def compute_row_hash(record, previous_hash):
+    """SHA-256 do conteúdo canônico do log (JSON com chaves ordenadas) encadeado ao hash anterior"""
+    content = {field: record.get(field) for field in CHAIN_FIELDS}
+    timestamp = content["timestamp"]
+    content["timestamp"] = timestamp.isoformat() if timestamp else None
+    content["previous_hash"] = previous_hash
+    payload = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class AuditChain:
+    """
+    Cadeia de hashes à prova de adulteração sobre audit_logs.
+
+    Cada log guarda previous_hash (row_hash do log anterior, em ordem de id) e
+    row_hash = SHA-256(conteúdo canônico + previous_hash). Alterar, remover ou
+    inserir um log no meio quebra a cadeia a partir dele. Checkpoints
+    (audit_checkpoints) registram hashes já verificados e servem de âncora: a
+    verificação de um intervalo começa no checkpoint mais próximo, e intervalos
+    longos são divididos em segmentos verificados em paralelo por processos.
+    """
+
+    @staticmethod
+    def seal(connection, records):
+        """
+        Preenche previous_hash e row_hash dos registros (dicts), na ordem de inserção
+
+        Deve ser chamado com audit_chain_lock adquirido e na mesma transação do
+        INSERT; no PostgreSQL também adquire um advisory lock de transação, que
+        serializa a gravação entre processos até o commit.
+        """
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHAIN_LOCK_KEY})
+        # Com a tabela vazia (tudo arquivado), a cadeia continua a partir do último checkpoint
+        previous_hash = connection.execute(
+            select(AuditLog.row_hash).order_by(AuditLog.id.desc()).limit(1)
+        ).scalar() or connection.execute(
+            select(AuditCheckpoint.row_hash).order_by(AuditCheckpoint.last_log_id.desc()).limit(1)
+        ).scalar() or GENESIS_HASH
+        for record in records:
+            record["previous_hash"] = previous_hash
+            record["row_hash"] = previous_hash = compute_row_hash(record, previous_hash)
+        return records
+
+    @staticmethod
+    def verify(start_id=None, end_id=None, workers=None, segment_size=None):
+        """
+        Verifica a cadeia de start_id a end_id a partir do checkpoint mais próximo
+
+        Args:
+            start_id (int, optional): Primeiro log a verificar (padrão: o mais antigo)
+            end_id (int, optional): Último log a verificar (padrão: o mais recente)
+            workers (int, optional): Processos paralelos (AUDIT_CHAIN_VERIFY_WORKERS)
+            segment_size (int, optional): IDs por segmento (AUDIT_CHAIN_SEGMENT_SIZE)
+
+        Returns:
+            dict: valid, checked, from_id, to_id, anchor (checkpoint usado), checkpoints e errors
+        """
+        workers = workers or current_app.config.get("AUDIT_CHAIN_VERIFY_WORKERS", 1)
+        segment_size = segment_size or current_app.config.get("AUDIT_CHAIN_SEGMENT_SIZE", 100000)
+
+        max_id = db.session.query(db.func.max(AuditLog.id)).scalar()
+        if end_id is None:
+            end_id = max_id or 0
+        if start_id is None:
+            start_id = db.session.query(db.func.min(AuditLog.id)).scalar() or 1
+
+        anchor = AuditChain.anchor(start_id)
+        from_id = anchor.last_log_id if anchor else 0
+        expected_hash = anchor.row_hash if anchor else GENESIS_HASH
+
+        ranges = [
+            (segment_start, min(segment_start + segment_size, end_id))
+            for segment_start in range(from_id, end_id, segment_size)
+        ]
+        segments = AuditChain._verify_segments(ranges, workers)
+
+        # Liga os segmentos: o primeiro log de cada um deve apontar para o último do anterior
+        errors = []
+        checked = 0
+        last_hash = expected_hash
+        for segment in segments:
+            errors.extend(segment["errors"])
+            if not segment["count"]:
+                continue
+            if segment["first_previous_hash"] != last_hash:
+                errors.append({"id": segment["first_id"], "error": "previous_hash não confere com o log anterior"})
+            last_hash = segment["last_hash"]
+            checked += segment["count"]
+
+        # Checkpoints dentro do intervalo devem coincidir com o hash gravado no log
+        checkpoints = AuditCheckpoint.query.filter(
+            AuditCheckpoint.last_log_id > from_id,
+            AuditCheckpoint.last_log_id <= end_id
+        ).all()
+        if checkpoints:
+            stored = dict(db.session.query(AuditLog.id, AuditLog.row_hash).filter(
+                AuditLog.id.in_([checkpoint.last_log_id for checkpoint in checkpoints])
+            ))
+            for checkpoint in checkpoints:
+                if stored.get(checkpoint.last_log_id) != checkpoint.row_hash:
+                    errors.append({
+                        "id": checkpoint.last_log_id,
+                        "error": f"hash diverge do checkpoint #{checkpoint.id}"
+                    })
+
+        # Logs existentes abaixo do último checkpoint: ids reutilizados (ex: SQLite sem AUTOINCREMENT
+        # após arquivar tudo) ou logs removidos; o intervalo "vazio" depois do checkpoint não é válido
+        latest = AuditCheckpoint.query.order_by(AuditCheckpoint.last_log_id.desc()).first()
+        if max_id is not None and latest and latest.last_log_id > max_id:
+            errors.append({
+                "id": max_id,
+                "error": f"último log anterior ao checkpoint #{latest.id} (log #{latest.last_log_id}): ids reutilizados ou logs removidos"
+            })
+
+        errors.sort(key=lambda error: error["id"] or 0)
+        return {
+            "valid": not errors,
+            "checked": checked,
+            "from_id": from_id + 1,
+            "to_id": end_id,
+            "last_hash": last_hash,
+            "anchor": anchor.to_dict() if anchor else None,
+            "checkpoints": len(checkpoints),
+            "errors": errors[:MAX_REPORTED_ERRORS],
+            "error_count": len(errors)
+        }
+
+    @staticmethod
+    def anchor(start_id):
+        """Âncora da verificação: último checkpoint antes de start_id (None = início da cadeia)"""
+        return AuditCheckpoint.query.filter(
+            AuditCheckpoint.last_log_id < start_id
+        ).order_by(AuditCheckpoint.last_log_id.desc()).first()
+
+    @staticmethod
+    def create_checkpoint():
+        """
+        Verifica os logs desde o último checkpoint e registra um novo no log mais recente
+
+        Returns:
+            dict: Resultado da verificação e checkpoint criado (se a cadeia estiver íntegra)
+        """
+        last = AuditCheckpoint.query.order_by(AuditCheckpoint.last_log_id.desc()).first()
+        start_id = last.last_log_id + 1 if last else None
+        result = AuditChain.verify(start_id=start_id)
+        result["checkpoint"] = None
+
+        if not result["valid"]:
+            print(f"Erro na cadeia de auditoria: {result['error_count']} divergências desde o log #{result['from_id']}")
+            return result
+        if not result["checked"] or (last and result["to_id"] <= last.last_log_id):
+            return result
+
+        checkpoint = AuditChain.checkpoint_at(result["to_id"], result["checked"])
+        result["checkpoint"] = checkpoint.to_dict() if checkpoint else None
+        return result
+
+    @staticmethod
+    def checkpoint_at(log_id, log_count=0, reason="periodic", commit=True):
+        """Registra um checkpoint com o hash gravado do log informado"""
+        row_hash = db.session.query(AuditLog.row_hash).filter(AuditLog.id == log_id).scalar()
+        if row_hash is None:
+            return None
+        checkpoint = AuditCheckpoint.query.filter_by(last_log_id=log_id).first()
+        if checkpoint is None:
+            checkpoint = AuditCheckpoint(log_id, row_hash, log_count, reason)
+            db.session.add(checkpoint)
+            if commit:
+                db.session.commit()
+        return checkpoint
+
+    @staticmethod
+    def verified_checkpoint(log_id, reason="archive", commit=True):
+        """
+        Verifica a cadeia do último checkpoint até log_id e registra um checkpoint nele (ex: antes de arquivar)
+
+        Raises:
+            RuntimeError: Se a cadeia estiver quebrada no intervalo (o checkpoint não é criado)
+        """
+        last = AuditChain.anchor(log_id)
+        result = AuditChain.verify(start_id=last.last_log_id + 1 if last else None, end_id=log_id)
+        if not result["valid"]:
+            raise RuntimeError(
+                f"Cadeia de auditoria quebrada antes do log #{log_id}: {result['error_count']} divergências, "
+                f"primeira no log #{result['errors'][0]['id']}"
+            )
+        return AuditChain.checkpoint_at(log_id, result["checked"], reason, commit=commit)
+
+    @staticmethod
+    def _verify_segments(ranges, workers):
+        if workers <= 1 or len(ranges) <= 1 or db.engine.url.database in (None, "", ":memory:"):
+            return [_verify_segment(db.engine, start, end) for start, end in ranges]
+
+        database_url = db.engine.url.render_as_string(hide_password=False)
+        # spawn: os processos não herdam threads (escritor de auditoria, agendador) nem conexões
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            return list(executor.map(
+                _verify_segment_worker,
+                [database_url] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges]
+            ))
+
+def _verify_segment(engine, start_id, end_id):
+    """Recalcula os hashes dos logs com start_id < id <= end_id"""
+    columns = [AuditLog.__table__.c[field] for field in ("id", "previous_hash", "row_hash") + CHAIN_FIELDS]
+    statement = select(*columns).where(
+        AuditLog.__table__.c.id > start_id,
+        AuditLog.__table__.c.id <= end_id
+    ).order_by(AuditLog.__table__.c.id)
+
+    segment = {"count": 0, "first_id": None, "first_previous_hash": None, "last_hash": None, "errors": []}
+    expected_previous = None
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=5000).execute(statement)
+        for row in result.mappings():
+            if segment["first_id"] is None:
+                segment["first_id"] = row["id"]
+                segment["first_previous_hash"] = expected_previous = row["previous_hash"]
+            elif row["previous_hash"] != expected_previous:
+                segment["errors"].append({"id": row["id"], "error": "previous_hash não confere com o log anterior"})
+
+            if row["row_hash"] is None or compute_row_hash(row, row["previous_hash"]) != row["row_hash"]:
+                segment["errors"].append({"id": row["id"], "error": "conteúdo não confere com row_hash"})
+
+            expected_previous = row["row_hash"]
+            segment["count"] += 1
+            if len(segment["errors"]) > MAX_REPORTED_ERRORS:
+                break
+    segment["last_hash"] = expected_previous
+    return segment
+
+# Engine por processo de verificação (criada no primeiro segmento)
+_worker_engine = None
+
+def _verify_segment_worker(database_url, start_id, end_id):
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = create_engine(database_url)
+    return _verify_segment(_worker_engine, start_id, end_id)
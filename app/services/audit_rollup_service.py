@@ -0,0 +1,212 @@
+# app/services/audit_rollup_service.py
+from ..extensions import db
+from ..models.audit_log import AuditLog
+from ..models.audit_rollup import AuditRollup, AuditRollupState, SYSTEM_USER_ID
+from ..utils.db_utils import hour_bucket
+from flask import current_app
+import datetime
+
+ROLLUP_STATE_NAME = "hourly"
+
+class AuditRollupService:
+    @staticmethod
+    def compact(now=None):
+        """
+        Agrega em audit_rollups as horas fechadas desde o último watermark
+        
+        Cada hora é recalculada por completo (DELETE + INSERT ... SELECT ... GROUP BY),
+        então a operação é idempotente. As últimas AUDIT_ROLLUP_RECOMPUTE_HOURS antes
+        do watermark são refeitas a cada execução para incluir registros gravados com
+        atraso (ex: fila assíncrona de auditoria ou reprocessamento do spill).
+        
+        Returns:
+            dict: Intervalo compactado e quantidade de linhas de agregado gravadas
+        """
+        config = current_app.config
+        now = now or datetime.datetime.utcnow()
+        until = _floor_hour(now)  # A hora corrente ainda está aberta
+        
+        state = db.session.get(AuditRollupState, ROLLUP_STATE_NAME)
+        if state is None or state.rolled_up_until is None:
+            first_timestamp = db.session.query(db.func.min(AuditLog.timestamp)).scalar()
+            start = _floor_hour(first_timestamp) if first_timestamp else until
+        else:
+            start = state.rolled_up_until - datetime.timedelta(hours=config.get("AUDIT_ROLLUP_RECOMPUTE_HOURS", 2))
+        
+        rows_written = 0
+        chunk = datetime.timedelta(hours=config.get("AUDIT_ROLLUP_CHUNK_HOURS", 24))
+        chunk_start = start
+        while chunk_start < until:
+            chunk_end = min(chunk_start + chunk, until)
+            rows_written += AuditRollupService._rollup_range(chunk_start, chunk_end)
+            
+            if state is None:
+                state = AuditRollupState(ROLLUP_STATE_NAME)
+                db.session.add(state)
+            state.rolled_up_until = max(state.rolled_up_until or chunk_end, chunk_end)
+            state.updated_at = datetime.datetime.utcnow()
+            db.session.commit()
+            chunk_start = chunk_end
+        
+        if state is None:
+            # Tabela de logs vazia: o watermark começa na hora corrente
+            state = AuditRollupState(ROLLUP_STATE_NAME, until)
+            state.updated_at = datetime.datetime.utcnow()
+            db.session.add(state)
+            db.session.commit()
+        
+        return {
+            "from": start.isoformat(),
+            "until": until.isoformat(),
+            "rows": rows_written
+        }
+    
+    @staticmethod
+    def _rollup_range(start, end):
+        """Recalcula os agregados das horas em [start, end)"""
+        AuditRollup.query.filter(
+            AuditRollup.bucket_start >= start,
+            AuditRollup.bucket_start < end
+        ).delete(synchronize_session=False)
+        
+        bucket = hour_bucket(AuditLog.timestamp)
+        user_id = db.func.coalesce(AuditLog.user_id, SYSTEM_USER_ID)
+        source = db.select(
+            bucket,
+            AuditLog.action_type,
+            AuditLog.entity_type,
+            user_id,
+            db.func.count(AuditLog.id)
+        ).where(
+            AuditLog.timestamp >= start,
+            AuditLog.timestamp < end
+        ).group_by(bucket, AuditLog.action_type, AuditLog.entity_type, user_id)
+        
+        result = db.session.execute(AuditRollup.__table__.insert().from_select(
+            ["bucket_start", "action_type", "entity_type", "user_id", "count"], source
+        ))
+        return max(result.rowcount or 0, 0)
+    
+    @staticmethod
+    def get_statistics(start_date=None, end_date=None):
+        """
+        Estatísticas de atividades a partir dos agregados por hora
+        
+        As horas já compactadas vêm de audit_rollups; apenas o trecho após o
+        watermark (em geral a hora corrente) é agregado a partir de audit_logs.
+        
+        Args:
+            start_date (date, optional): Primeiro dia (inclusive)
+            end_date (date, optional): Último dia (inclusive)
+        
+        Sem intervalo, as contagens por ação, entidade e usuário consideram todo o
+        histórico e a série diária cobre os últimos 7 dias.
+        
+        Returns:
+            dict: action_counts, entity_counts, user_counts (top 10) e period_stats
+        """
+        today = datetime.datetime.now().date()
+        has_range = start_date is not None or end_date is not None
+        period_end = end_date or today
+        period_start = start_date or (period_end - datetime.timedelta(days=6))
+        
+        range_start = datetime.datetime.combine(period_start, datetime.time.min) if has_range else None
+        range_end = datetime.datetime.combine(period_end + datetime.timedelta(days=1), datetime.time.min) if has_range else None
+        
+        state = db.session.get(AuditRollupState, ROLLUP_STATE_NAME)
+        watermark = state.rolled_up_until if state else None
+        
+        action_counts = {}
+        entity_counts = {}
+        user_counts = {}
+        for action_type, entity_type, user_id, count in AuditRollupService._grouped_counts(range_start, range_end, watermark):
+            action_counts[action_type] = action_counts.get(action_type, 0) + count
+            entity_counts[entity_type] = entity_counts.get(entity_type, 0) + count
+            if user_id != SYSTEM_USER_ID:
+                user_counts[user_id] = user_counts.get(user_id, 0) + count
+        
+        top_users = sorted(user_counts.items(), key=lambda item: item[1], reverse=True)[:10]
+        
+        daily_counts = AuditRollupService._daily_counts(
+            datetime.datetime.combine(period_start, datetime.time.min),
+            datetime.datetime.combine(period_end + datetime.timedelta(days=1), datetime.time.min),
+            watermark
+        )
+        days = (period_end - period_start).days + 1
+        period_stats = [{
+            'date': date.strftime('%Y-%m-%d'),
+            'count': daily_counts.get(date, 0)
+        } for date in (period_end - datetime.timedelta(days=i) for i in range(days))]
+        
+        return {
+            'action_counts': action_counts,
+            'entity_counts': entity_counts,
+            'user_counts': dict(top_users),
+            'period_stats': period_stats,
+            'rolled_up_until': watermark.isoformat() if watermark else None
+        }
+    
+    @staticmethod
+    def _grouped_counts(range_start, range_end, watermark):
+        """(action_type, entity_type, user_id, count) do agregado + trecho ao vivo após o watermark"""
+        rows = []
+        if watermark is not None:
+            query = db.session.query(
+                AuditRollup.action_type,
+                AuditRollup.entity_type,
+                AuditRollup.user_id,
+                db.func.sum(AuditRollup.count)
+            ).filter(AuditRollup.bucket_start < watermark)
+            if range_start is not None:
+                query = query.filter(AuditRollup.bucket_start >= range_start)
+            if range_end is not None:
+                query = query.filter(AuditRollup.bucket_start < range_end)
+            rows.extend(query.group_by(AuditRollup.action_type, AuditRollup.entity_type, AuditRollup.user_id))
+        
+        user_id = db.func.coalesce(AuditLog.user_id, SYSTEM_USER_ID)
+        live = db.session.query(
+            AuditLog.action_type,
+            AuditLog.entity_type,
+            user_id,
+            db.func.count(AuditLog.id)
+        )
+        if watermark is not None:
+            live = live.filter(AuditLog.timestamp >= watermark)
+        if range_start is not None:
+            live = live.filter(AuditLog.timestamp >= range_start)
+        if range_end is not None:
+            live = live.filter(AuditLog.timestamp < range_end)
+        rows.extend(live.group_by(AuditLog.action_type, AuditLog.entity_type, user_id))
+        return [(action_type, entity_type, user_id, int(count)) for action_type, entity_type, user_id, count in rows]
+    
+    @staticmethod
+    def _daily_counts(range_start, range_end, watermark):
+        """Contagem por dia em [range_start, range_end) somando as horas do agregado e o trecho ao vivo"""
+        daily = {}
+        if watermark is not None:
+            hourly = db.session.query(
+                AuditRollup.bucket_start,
+                db.func.sum(AuditRollup.count)
+            ).filter(
+                AuditRollup.bucket_start >= range_start,
+                AuditRollup.bucket_start < range_end,
+                AuditRollup.bucket_start < watermark
+            ).group_by(AuditRollup.bucket_start)
+            for bucket_start, count in hourly:
+                daily[bucket_start.date()] = daily.get(bucket_start.date(), 0) + int(count)
+        
+        live_start = max(range_start, watermark) if watermark is not None else range_start
+        if live_start < range_end:
+            bucket = hour_bucket(AuditLog.timestamp)
+            live = db.session.query(bucket, db.func.count(AuditLog.id)).filter(
+                AuditLog.timestamp >= live_start,
+                AuditLog.timestamp < range_end
+            ).group_by(bucket)
+            for bucket_start, count in live:
+                if isinstance(bucket_start, str):
+                    bucket_start = datetime.datetime.fromisoformat(bucket_start)
+                daily[bucket_start.date()] = daily.get(bucket_start.date(), 0) + int(count)
+        return daily
+
+def _floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
@@ -1,9 +1,29 @@
 # app/services/audit_service.py
-from ..models.audit_log import AuditLog, ActionTypeEnum, EntityTypeEnum
+from ..models.audit_log import (
+    AuditLog, ActionTypeEnum, EntityTypeEnum, FTS_CONFIG, SQLITE_FTS_TABLE,
+    normalize_additional_data, search_vector
+)
+from ..models.user import User
 from ..extensions import db
+from .audit_writer import audit_writer
+from .audit_chain import AuditChain, CHAIN_FIELDS, audit_chain_lock
+from ..utils.db_utils import dialect_name
+from ..utils.pagination import keyset_paginate
 from flask import g, request
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import joinedload
+import sqlalchemy as sa
 import json
 import datetime
+import re
+
+# Tabela FTS5 do SQLite (fora dos metadados: é criada pela migração ou pelo DDL de AuditLog)
+_sqlite_fts = sa.table(SQLITE_FTS_TABLE, sa.column("rowid"), sa.column("rank"))
+# Engines SQLite em que a tabela FTS5 existe (verificado uma vez por engine)
+_sqlite_fts_available = {}
+# Chave de additional_data em caminhos como "treinamento_id" ou "new.status"
+DATA_PATH_KEY = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
 
 class AuditService:
     @staticmethod
@@ -18,10 +38,11 @@ class AuditService:
             description (str): Descrição da ação
             entity_id (int, optional): ID da entidade afetada
             user_id (int, optional): ID do usuário que realizou a ação
-            additional_data (dict, optional): Dados adicionais em formato JSON
+            additional_data (dict, optional): Dados adicionais, gravados como JSON nativo
         
         Returns:
-            AuditLog: O registro de log criado
+            AuditLog: O registro de log criado, ou None quando o modo assíncrono
+                (AUDIT_ASYNC) está ativo e o registro foi apenas enfileirado
         """
         # Se user_id não for fornecido, tenta obter do contexto global
         if user_id is None and hasattr(g, 'user'):
@@ -31,9 +52,23 @@ class AuditService:
         ip_address = request.remote_addr if request else None
         user_agent = request.user_agent.string if request and request.user_agent else None
         
-        # Converter additional_data para JSON string se for um dicionário
-        if additional_data and isinstance(additional_data, dict):
-            additional_data = json.dumps(additional_data)
+        # Gravado como JSON nativo; strings já serializadas são decodificadas
+        additional_data = normalize_additional_data(additional_data)
+        
+        # Modo assíncrono: enfileira um registro leve para o escritor em lote
+        if audit_writer.is_async():
+            audit_writer.enqueue({
+                "action_type": getattr(action_type, "value", action_type),
+                "entity_type": getattr(entity_type, "value", entity_type),
+                "entity_id": entity_id,
+                "description": description,
+                "user_id": user_id,
+                "ip_address": ip_address,
+                "user_agent": user_agent,
+                "timestamp": datetime.datetime.utcnow(),
+                "additional_data": additional_data
+            })
+            return None
         
         # Criar o log
         log = AuditLog(
@@ -46,12 +81,38 @@ class AuditService:
             user_agent=user_agent,
             additional_data=additional_data
         )
+        log.timestamp = datetime.datetime.utcnow()
         
-        db.session.add(log)
-        db.session.commit()
+        # Encadeia o log (previous_hash/row_hash) e grava sob o lock da cadeia
+        with audit_chain_lock:
+            record = {field: getattr(log, field) for field in CHAIN_FIELDS}
+            AuditChain.seal(db.session.connection(), [record])
+            log.previous_hash = record["previous_hash"]
+            log.row_hash = record["row_hash"]
+            db.session.add(log)
+            db.session.commit()
         
         return log
     
+    @staticmethod
+    def log_records(records):
+        """
+        Grava registros de auditoria já montados (dicts com as colunas de AuditLog)
+        
+        No modo assíncrono os registros são enfileirados; caso contrário, são
+        encadeados e gravados com um único INSERT de múltiplas linhas.
+        """
+        if not records:
+            return
+        if audit_writer.is_async():
+            for record in records:
+                audit_writer.enqueue(record)
+            return
+        with audit_chain_lock:
+            AuditChain.seal(db.session.connection(), records)
+            db.session.execute(AuditLog.__table__.insert(), records)
+            db.session.commit()
+    
     @staticmethod
     def get_entity_history(entity_type, entity_id, limit=100):
         """
@@ -94,11 +155,36 @@ class AuditService:
         
         return logs
     
+    @staticmethod
+    def find_by_data(path, value, limit=100):
+        """
+        Obtém os logs cujo additional_data tem o valor informado no caminho
+        
+        Args:
+            path (str): Caminho da chave, com pontos para níveis (ex: "treinamento_id", "new.status")
+            value: Valor JSON esperado (tipo incluso: 5 e "5" são diferentes)
+            limit (int, optional): Limite de registros a retornar
+        
+        Returns:
+            list: Lista de logs de auditoria, mais recentes primeiro
+        
+        Raises:
+            ValueError: Se o caminho for inválido
+        """
+        return AuditLog.query.filter(
+            AuditService._data_condition(path, value)
+        ).order_by(
+            AuditLog.timestamp.desc()
+        ).limit(limit).all()
+    
     @staticmethod
     def search_logs(filters=None, page=1, per_page=20):
         """
         Pesquisa logs de auditoria com filtros
         
+        Com o filtro 'search', os resultados vêm ordenados por relevância e depois
+        por data.
+        
         Args:
             filters (dict, optional): Filtros a serem aplicados
             page (int, optional): Página a ser retornada
@@ -107,20 +193,60 @@ class AuditService:
         Returns:
             tuple: (logs, total, pages)
         """
-        query = AuditLog.query
+        query = AuditService._apply_filters(AuditLog.query, filters, ranked=True)
+        
+        # Ordenar por timestamp (mais recentes primeiro)
+        query = query.order_by(AuditLog.timestamp.desc())
+        
+        # Paginação
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        
+        return pagination.items, pagination.total, pagination.pages
+    
+    @staticmethod
+    def search_logs_keyset(filters=None, cursor=None, limit=20, total_limit=None):
+        """
+        Pesquisa logs de auditoria com paginação por cursor em (timestamp, id)
+        
+        Args:
+            filters (dict, optional): Filtros a serem aplicados (os mesmos de search_logs)
+            cursor (str, optional): Cursor retornado na página anterior
+            limit (int, optional): Registros por página
+            total_limit (int, optional): Conta o total até esse limite (None = não conta)
+        
+        Returns:
+            dict: items, next_cursor, has_more e, se solicitado, total e total_is_estimate
+        
+        Raises:
+            ValueError: Se o cursor for inválido
+        """
+        query = AuditService._apply_filters(AuditLog.query, filters)
+        return keyset_paginate(
+            query, AuditLog.timestamp, AuditLog.id, cursor, limit, total_limit,
+            options=(joinedload(AuditLog.user),)
+        )
+    
+    @staticmethod
+    def _apply_filters(query, filters=None, ranked=False):
+        """
+        Aplica os filtros de pesquisa de logs (usuário, ação, entidade, período e texto)
         
+        Com ranked=True, a busca textual também ordena por relevância (antes de
+        qualquer order_by aplicado depois).
+        """
         if filters:
+            # Condições explícitas em AuditLog: a consulta pode ter outras entidades (ex: JOIN com User)
             if 'user_id' in filters and filters['user_id']:
-                query = query.filter_by(user_id=filters['user_id'])
+                query = query.filter(AuditLog.user_id == filters['user_id'])
             
             if 'action_type' in filters and filters['action_type']:
-                query = query.filter_by(action_type=filters['action_type'])
+                query = query.filter(AuditLog.action_type == filters['action_type'])
             
             if 'entity_type' in filters and filters['entity_type']:
-                query = query.filter_by(entity_type=filters['entity_type'])
+                query = query.filter(AuditLog.entity_type == filters['entity_type'])
             
             if 'entity_id' in filters and filters['entity_id']:
-                query = query.filter_by(entity_id=filters['entity_id'])
+                query = query.filter(AuditLog.entity_id == filters['entity_id'])
             
             if 'start_date' in filters and filters['start_date']:
                 start_date = datetime.datetime.strptime(filters['start_date'], '%Y-%m-%d')
@@ -131,69 +257,235 @@ class AuditService:
                 end_date = end_date.replace(hour=23, minute=59, second=59)
                 query = query.filter(AuditLog.timestamp <= end_date)
             
+            if 'data' in filters and filters['data']:
+                for path, value in filters['data'].items():
+                    query = query.filter(AuditService._data_condition(path, value))
+            
             if 'search' in filters and filters['search']:
-                search = f"%{filters['search']}%"
-                query = query.filter(AuditLog.description.ilike(search))
+                query = AuditService._apply_search(query, filters['search'], ranked)
         
-        # Ordenar por timestamp (mais recentes primeiro)
-        query = query.order_by(AuditLog.timestamp.desc())
+        return query
+    
+    @staticmethod
+    def data_path_keys(path):
+        """
+        Valida um caminho de additional_data e retorna suas chaves
         
-        # Paginação
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        Raises:
+            ValueError: Se o caminho for inválido
+        """
+        keys = path.split(".") if isinstance(path, str) else []
+        if not keys or not all(DATA_PATH_KEY.match(key) for key in keys):
+            raise ValueError(f"Caminho inválido em additional_data: {path}")
+        return keys
+    
+    @staticmethod
+    def _data_condition(path, value):
+        """
+        Condição sobre uma chave de additional_data
         
-        return pagination.items, pagination.total, pagination.pages
+        No PostgreSQL usa contenção (@>), atendida pelo índice GIN; nos demais
+        bancos usa json_extract com o caminho literal, para que índices de
+        expressão (ex: ix_audit_logs_data_treinamento_id) possam ser usados.
+        
+        Raises:
+            ValueError: Se o caminho for inválido
+        """
+        keys = AuditService.data_path_keys(path)
+        
+        if dialect_name() == "postgresql":
+            document = value
+            for key in reversed(keys):
+                document = {key: document}
+            return sa.type_coerce(AuditLog.additional_data, JSONB).contains(document)
+        
+        extracted = db.func.json_extract(AuditLog.additional_data, sa.literal_column(f"'$.{path}'"))
+        if value is None:
+            return extracted.is_(None)
+        if isinstance(value, (dict, list)):
+            # json_extract devolve objetos e listas como texto JSON compacto
+            return extracted == db.func.json(json.dumps(value))
+        return extracted == value
+    
+    @staticmethod
+    def _apply_search(query, search, ranked=False):
+        """
+        Busca textual em description pelo índice de texto completo do banco
+        
+        Cada palavra do termo é buscada por prefixo e todas precisam estar presentes
+        ("treina usu" encontra "Treinamento atribuído ao usuário"). Usa tsvector e
+        o índice GIN no PostgreSQL e a tabela FTS5 no SQLite; nos demais bancos (ou
+        sem o índice) cai no ILIKE por substring.
+        """
+        terms = re.findall(r"\w+", search)
+        backend = AuditService._search_backend() if terms else None
+        
+        if backend == "postgresql":
+            ts_query = db.func.to_tsquery(
+                sa.literal_column(f"'{FTS_CONFIG}'::regconfig"),
+                " & ".join(f"{term}:*" for term in terms)
+            )
+            vector = search_vector()
+            query = query.filter(vector.op("@@")(ts_query))
+            if ranked:
+                query = query.order_by(db.func.ts_rank_cd(vector, ts_query).desc())
+            return query
+        
+        if backend == "sqlite":
+            match = " ".join(f'"{term}"*' for term in terms)
+            query = query.join(_sqlite_fts, _sqlite_fts.c.rowid == AuditLog.id).filter(
+                text(f"{SQLITE_FTS_TABLE} MATCH :audit_search").bindparams(audit_search=match)
+            )
+            if ranked:
+                # rank do FTS5 (bm25): menor é mais relevante
+                query = query.order_by(_sqlite_fts.c.rank)
+            return query
+        
+        return query.filter(AuditLog.description.ilike(f"%{search}%"))
+    
+    @staticmethod
+    def _search_backend():
+        """Retorna "postgresql" ou "sqlite" se houver índice de texto completo disponível"""
+        name = dialect_name()
+        if name == "postgresql":
+            return name
+        if name == "sqlite":
+            engine = db.session.get_bind()
+            if engine not in _sqlite_fts_available:
+                _sqlite_fts_available[engine] = db.session.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": SQLITE_FTS_TABLE}
+                ).scalar() is not None
+            return name if _sqlite_fts_available[engine] else None
+        return None
     
     @staticmethod
     def export_logs(filters=None, format='csv'):
         """
-        Exporta logs de auditoria para CSV ou JSON
+        Exporta logs de auditoria para CSV, JSON ou NDJSON
+        
+        Monta o arquivo inteiro em memória; para exportações grandes use stream_export.
         
         Args:
-            filters (dict, optional): Filtros a serem aplicados
-            format (str, optional): Formato de exportação ('csv' ou 'json')
+            filters (dict, optional): Filtros a serem aplicados (os mesmos de search_logs)
+            format (str, optional): Formato de exportação ('csv', 'json' ou 'ndjson')
         
         Returns:
             str: Conteúdo do arquivo exportado
         """
-        query = AuditLog.query
+        return "".join(AuditService.stream_export(filters, format))
+    
+    @staticmethod
+    def stream_export(filters=None, format='csv', chunk_size=1000):
+        """
+        Gera a exportação de logs de auditoria em blocos de texto, com memória constante
         
-        if filters:
-            # Aplicar os mesmos filtros da função search_logs
-            # ...
-            pass
+        Os registros são lidos com yield_per (cursor no servidor quando o driver
+        suporta) e o nome do usuário vem de um único LEFT JOIN.
         
-        # Ordenar por timestamp (mais recentes primeiro)
-        logs = query.order_by(AuditLog.timestamp.desc()).all()
+        Args:
+            filters (dict, optional): Filtros a serem aplicados (os mesmos de search_logs)
+            format (str, optional): 'csv', 'json' ou 'ndjson'
+            chunk_size (int, optional): Registros lidos do banco e emitidos por bloco
         
-        if format == 'json':
-            # Exportar para JSON
-            return json.dumps([log.to_dict() for log in logs], indent=2)
+        Yields:
+            str: Blocos do arquivo exportado
+        """
+        query = db.session.query(
+            AuditLog.id,
+            User.username,
+            AuditLog.user_id,
+            AuditLog.action_type,
+            AuditLog.entity_type,
+            AuditLog.entity_id,
+            AuditLog.description,
+            AuditLog.ip_address,
+            AuditLog.user_agent,
+            AuditLog.timestamp,
+            AuditLog.additional_data
+        ).outerjoin(User, AuditLog.user_id == User.id)
+        query = AuditService._apply_filters(query, filters)
+        rows = query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).execution_options(
+            stream_results=True
+        ).yield_per(chunk_size)
+        
+        if format == 'csv':
+            yield from AuditService._stream_csv(rows, chunk_size)
+        elif format == 'ndjson':
+            yield from AuditService._stream_json_lines(rows, chunk_size)
         else:
-            # Exportar para CSV
-            import csv
-            import io
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Cabeçalho
+            yield from AuditService._stream_json_array(rows, chunk_size)
+    
+    @staticmethod
+    def _stream_csv(rows, chunk_size):
+        import csv
+        import io
+        
+        output = io.StringIO()
+        writer = csv.writer(output)
+        
+        # Cabeçalho
+        writer.writerow([
+            'ID', 'Usuário', 'Ação', 'Entidade', 'ID Entidade', 
+            'Descrição', 'IP', 'Data/Hora', 'Dados Adicionais'
+        ])
+        
+        # Dados
+        for index, row in enumerate(rows, 1):
             writer.writerow([
-                'ID', 'Usuário', 'Ação', 'Entidade', 'ID Entidade', 
-                'Descrição', 'IP', 'Data/Hora', 'Dados Adicionais'
+                row.id,
+                row.username or 'Sistema',
+                row.action_type,
+                row.entity_type,
+                row.entity_id or '',
+                row.description,
+                row.ip_address or '',
+                row.timestamp.strftime('%d/%m/%Y %H:%M:%S') if row.timestamp else '',
+                json.dumps(row.additional_data) if row.additional_data is not None else ''
             ])
-            
-            # Dados
-            for log in logs:
-                writer.writerow([
-                    log.id,
-                    log.user.username if log.user else 'Sistema',
-                    log.action_type,
-                    log.entity_type,
-                    log.entity_id or '',
-                    log.description,
-                    log.ip_address or '',
-                    log.timestamp.strftime('%d/%m/%Y %H:%M:%S'),
-                    log.additional_data or ''
-                ])
-            
-            return output.getvalue()
+            if index % chunk_size == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+        
+        yield output.getvalue()
+    
+    @staticmethod
+    def _stream_json_array(rows, chunk_size):
+        yield "["
+        buffer = []
+        for index, row in enumerate(rows):
+            buffer.append(("\n" if index == 0 else ",\n") + json.dumps(AuditService._export_dict(row)))
+            if len(buffer) >= chunk_size:
+                yield "".join(buffer)
+                buffer = []
+        buffer.append("\n]\n")
+        yield "".join(buffer)
+    
+    @staticmethod
+    def _stream_json_lines(rows, chunk_size):
+        buffer = []
+        for row in rows:
+            buffer.append(json.dumps(AuditService._export_dict(row)) + "\n")
+            if len(buffer) >= chunk_size:
+                yield "".join(buffer)
+                buffer = []
+        if buffer:
+            yield "".join(buffer)
+    
+    @staticmethod
+    def _export_dict(row):
+        """Mesmo formato de AuditLog.to_dict, a partir da linha projetada"""
+        return {
+            "id": row.id,
+            "user_id": row.user_id,
+            "action_type": row.action_type,
+            "entity_type": row.entity_type,
+            "entity_id": row.entity_id,
+            "description": row.description,
+            "ip_address": row.ip_address,
+            "user_agent": row.user_agent,
+            "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+            "additional_data": row.additional_data,
+            "user": row.username
+        }
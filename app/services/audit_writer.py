@@ -0,0 +1,247 @@
+# app/services/audit_writer.py
+from ..extensions import db
+from ..models.audit_log import AuditLog
+from .audit_chain import AuditChain, audit_chain_lock
+import atexit
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+# Políticas de contrapressão quando a fila de auditoria está cheia
+BACKPRESSURE_BLOCK = "block"  # Bloqueia a requisição até haver espaço (com timeout)
+BACKPRESSURE_DROP = "drop"    # Descarta o registro e incrementa o contador
+BACKPRESSURE_SPILL = "spill"  # Grava o registro em disco para ser reprocessado depois
+
+class AuditWriter:
+    """
+    Escritor assíncrono de logs de auditoria.
+
+    Os registros são enfileirados em uma fila limitada em memória e gravados por
+    uma thread em segundo plano usando INSERTs de múltiplas linhas, a cada
+    AUDIT_BATCH_SIZE registros ou AUDIT_FLUSH_INTERVAL_MS milissegundos.
+    Na finalização do processo a fila é descarregada de forma síncrona.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.dropped_count = 0
+        self.spilled_count = 0
+        self.written_count = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configura o escritor a partir das configurações da aplicação"""
+        self.app = app
+        self.enabled = app.config.get("AUDIT_ASYNC", False)
+        self.batch_size = app.config.get("AUDIT_BATCH_SIZE", 500)
+        self.flush_interval = app.config.get("AUDIT_FLUSH_INTERVAL_MS", 200) / 1000.0
+        self.backpressure = app.config.get("AUDIT_BACKPRESSURE", BACKPRESSURE_BLOCK)
+        self.block_timeout = app.config.get("AUDIT_BLOCK_TIMEOUT", 5)
+        self.spill_path = app.config.get("AUDIT_SPILL_PATH")
+        self._queue = queue.Queue(maxsize=app.config.get("AUDIT_QUEUE_MAXSIZE", 10000))
+        app.extensions["audit_writer"] = self
+
+        if self.enabled:
+            # Garante que nada fique na fila quando o processo terminar
+            atexit.register(self.stop)
+
+    def is_async(self):
+        return self.enabled and self.app is not None
+
+    def enqueue(self, record):
+        """
+        Enfileira um registro de auditoria (dict com as colunas de AuditLog)
+
+        Returns:
+            bool: False se o registro foi descartado pela política de contrapressão
+        """
+        self._ensure_started()
+
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            pass
+
+        if self.backpressure == BACKPRESSURE_DROP:
+            self._increment("dropped_count")
+            return False
+
+        if self.backpressure == BACKPRESSURE_SPILL and self.spill_path:
+            self._spill([record])
+            return True
+
+        # Política padrão: bloquear até haver espaço na fila
+        try:
+            self._queue.put(record, timeout=self.block_timeout)
+            return True
+        except queue.Full:
+            self._increment("dropped_count")
+            return False
+
+    def flush(self):
+        """Grava de forma síncrona tudo o que estiver na fila e no arquivo de spill"""
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            self._write(batch)
+        self._replay_spill()
+
+    def stop(self, timeout=10):
+        """Interrompe a thread de escrita e descarrega a fila"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        if self._queue is not None:
+            self.flush()
+
+    def stats(self):
+        """Retorna contadores do pipeline de auditoria"""
+        return {
+            "enabled": self.is_async(),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written_count,
+            "dropped": self.dropped_count,
+            "spilled": self.spilled_count
+        }
+
+    # --- Internos ---
+
+    def _ensure_started(self):
+        # A verificação de PID cobre servidores que fazem fork após o create_app (ex: Gunicorn)
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stop_event.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+            elif self._queue.empty():
+                # Aproveita períodos ociosos para reprocessar registros gravados em disco
+                self._replay_spill()
+
+    def _collect_batch(self):
+        """Aguarda até batch_size registros ou até o intervalo de flush expirar"""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch, spill_on_error=True):
+        """Grava um lote encadeado (hashes) com um único INSERT de múltiplas linhas"""
+        try:
+            with self._write_lock, self.app.app_context():
+                # O lock da cadeia cobre o cálculo dos hashes, o INSERT e o commit
+                with audit_chain_lock, db.engine.begin() as connection:
+                    AuditChain.seal(connection, batch)
+                    connection.execute(AuditLog.__table__.insert(), batch)
+            self._increment("written_count", len(batch))
+            return True
+        except Exception as e:
+            print(f"Erro ao gravar lote de auditoria ({len(batch)} registros): {str(e)}")
+            if not spill_on_error:
+                return False
+            if self.spill_path:
+                self._spill(batch)
+            else:
+                self._increment("dropped_count", len(batch))
+            return False
+
+    def _spill(self, records):
+        """Grava registros em disco (NDJSON) para reprocessamento posterior"""
+        try:
+            with self._spill_lock:
+                with open(self.spill_path, "a", encoding="utf-8") as spill_file:
+                    for record in records:
+                        spill_file.write(json.dumps(record, default=_json_default) + "\n")
+            self._increment("spilled_count", len(records))
+        except OSError as e:
+            print(f"Erro ao gravar registros de auditoria em disco: {str(e)}")
+            self._increment("dropped_count", len(records))
+
+    def _replay_spill(self):
+        if not self.spill_path:
+            return
+        replay_path = self.spill_path + ".replay"
+        with self._spill_lock:
+            # Um arquivo .replay remanescente indica uma falha anterior; ele é reprocessado primeiro
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replay_path)
+
+        try:
+            with open(replay_path, "r", encoding="utf-8") as replay_file:
+                records = [_record_from_json(line) for line in replay_file if line.strip()]
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler registros de auditoria em disco: {str(e)}")
+            return
+
+        for start in range(0, len(records), self.batch_size):
+            if not self._write(records[start:start + self.batch_size], spill_on_error=False):
+                # Mantém apenas os registros ainda não gravados para a próxima tentativa
+                with open(replay_path, "w", encoding="utf-8") as replay_file:
+                    for record in records[start:]:
+                        replay_file.write(json.dumps(record, default=_json_default) + "\n")
+                return
+        os.remove(replay_path)
+
+    def _increment(self, counter, amount=1):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
+
+def _record_from_json(line):
+    record = json.loads(line)
+    if record.get("timestamp"):
+        record["timestamp"] = datetime.datetime.fromisoformat(record["timestamp"])
+    return record
+
+# Instância única, inicializada em create_app()
+audit_writer = AuditWriter()
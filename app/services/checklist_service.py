@@ -1,6 +1,8 @@
 # app/services/checklist_service.py
 from ..models.checklist import Checklist # , ChecklistItem (se for usar)
+from ..models.checklist_item import ChecklistItem, RiscoEnum, StatusEnum
 from ..extensions import db
+from sqlalchemy.orm import selectinload
 
 class ChecklistService:
 
@@ -30,6 +32,79 @@ class ChecklistService:
         #     query = query.filter_by(user_id=user_id)
         return query.all()
 
+    @staticmethod
+    def list_checklists(categoria=None, depth=2, fields=None, after_id=None, limit=None):
+        """Lista checklists para a API com carregamento antecipado e projeção.
+
+        Args:
+            categoria (str, optional): Filtra pela categoria
+            depth (int): 0 = resumo com contagens calculadas no SQL,
+                1 = itens sem evidências, 2 = itens com evidências
+            fields (list, optional): Campos de primeiro nível a retornar
+            after_id (int, optional): Cursor (ID do último checklist da página anterior)
+            limit (int, optional): Tamanho da página; sem limite retorna todos
+
+        Returns:
+            tuple: (lista de dicionários, próximo cursor ou None)
+        """
+        if depth <= 0:
+            # Contagens por checklist agregadas no banco, sem carregar os itens
+            counts = db.session.query(
+                ChecklistItem.checklist_id.label("checklist_id"),
+                db.func.count(ChecklistItem.id).label("total_items"),
+                db.func.sum(
+                    db.case((ChecklistItem.status == StatusEnum.CONCLUIDO, 1), else_=0)
+                ).label("items_concluidos")
+            ).group_by(ChecklistItem.checklist_id).subquery()
+
+            query = db.session.query(
+                Checklist,
+                db.func.coalesce(counts.c.total_items, 0),
+                db.func.coalesce(counts.c.items_concluidos, 0)
+            ).outerjoin(counts, counts.c.checklist_id == Checklist.id)
+        else:
+            # selectinload: uma consulta por nível de relacionamento, em vez de 1 + N + N·M
+            loader = selectinload(Checklist.items)
+            if depth >= 2:
+                loader = loader.selectinload(ChecklistItem.evidencias)
+            query = Checklist.query.options(loader)
+
+        if categoria:
+            query = query.filter(Checklist.categoria == categoria)
+        if after_id:
+            query = query.filter(Checklist.id > after_id)
+
+        # Paginação por chave (keyset): busca um registro a mais para saber se há próxima página
+        query = query.order_by(Checklist.id)
+        if limit:
+            query = query.limit(limit + 1)
+        results = query.all()
+
+        next_cursor = None
+        if limit and len(results) > limit:
+            results = results[:limit]
+            last = results[-1][0] if depth <= 0 else results[-1]
+            next_cursor = last.id
+
+        data = []
+        for result in results:
+            if depth <= 0:
+                checklist, total_items, items_concluidos = result
+                checklist_dict = checklist.to_dict(depth=0)
+                checklist_dict.update({
+                    "total_items": total_items,
+                    "items_concluidos": items_concluidos,
+                    "percentual_conclusao": int((items_concluidos / total_items) * 100) if total_items else 0
+                })
+            else:
+                checklist_dict = result.to_dict(depth=depth)
+
+            if fields:
+                checklist_dict = {key: value for key, value in checklist_dict.items() if key in fields}
+            data.append(checklist_dict)
+
+        return data, next_cursor
+
     @staticmethod
     def get_checklist_by_id(checklist_id, user_id=None):
         """Retorna um checklist específico pelo ID, opcionalmente verificando o proprietário."""
@@ -64,6 +139,82 @@ class ChecklistService:
         db.session.commit()
         return True
 
+    @staticmethod
+    def get_metricas():
+        """Calcula as métricas do dashboard de checklists.
+
+        Usa apenas duas consultas: a contagem de checklists e uma agregação
+        GROUP BY categoria, status, risco sobre os itens. As quebras por status,
+        risco e categoria são montadas a partir das linhas agregadas.
+        """
+        total_checklists = db.session.query(db.func.count(Checklist.id)).scalar()
+
+        # LEFT JOIN para que categorias com checklists sem itens também apareçam
+        rows = db.session.query(
+            Checklist.categoria,
+            ChecklistItem.status,
+            ChecklistItem.risco,
+            db.func.count(ChecklistItem.id)
+        ).outerjoin(
+            ChecklistItem, ChecklistItem.checklist_id == Checklist.id
+        ).group_by(
+            Checklist.categoria, ChecklistItem.status, ChecklistItem.risco
+        ).all()
+
+        itens_por_status = {StatusEnum.PENDENTE: 0, StatusEnum.EM_ANDAMENTO: 0, StatusEnum.CONCLUIDO: 0}
+        itens_por_risco = {RiscoEnum.ALTO: 0, RiscoEnum.MEDIO: 0, RiscoEnum.BAIXO: 0}
+        categorias = {}
+
+        for categoria, status, risco, count in rows:
+            if status in itens_por_status:
+                itens_por_status[status] += count
+            if risco in itens_por_risco:
+                itens_por_risco[risco] += count
+
+            if not categoria:
+                continue
+            totais = categorias.setdefault(categoria, {"total_itens": 0, "itens_concluidos": 0})
+            totais["total_itens"] += count
+            if status == StatusEnum.CONCLUIDO:
+                totais["itens_concluidos"] += count
+
+        total_itens = sum(itens_por_status.values())
+
+        # Percentual de conformidade geral
+        percentual_conformidade = 0
+        if total_itens > 0:
+            percentual_conformidade = int((itens_por_status[StatusEnum.CONCLUIDO] / total_itens) * 100)
+
+        metricas_por_categoria = []
+        for categoria in sorted(categorias):
+            totais = categorias[categoria]
+            percentual_categoria = 0
+            if totais["total_itens"] > 0:
+                percentual_categoria = int((totais["itens_concluidos"] / totais["total_itens"]) * 100)
+            metricas_por_categoria.append({
+                "categoria": categoria,
+                "total_itens": totais["total_itens"],
+                "itens_concluidos": totais["itens_concluidos"],
+                "percentual_conformidade": percentual_categoria
+            })
+
+        return {
+            "total_checklists": total_checklists,
+            "total_itens": total_itens,
+            "itens_por_status": {
+                "pendentes": itens_por_status[StatusEnum.PENDENTE],
+                "em_andamento": itens_por_status[StatusEnum.EM_ANDAMENTO],
+                "concluidos": itens_por_status[StatusEnum.CONCLUIDO]
+            },
+            "itens_por_risco": {
+                "alto": itens_por_risco[RiscoEnum.ALTO],
+                "medio": itens_por_risco[RiscoEnum.MEDIO],
+                "baixo": itens_por_risco[RiscoEnum.BAIXO]
+            },
+            "percentual_conformidade": percentual_conformidade,
+            "metricas_por_categoria": metricas_por_categoria
+        }
+
     # Métodos para ChecklistItem podem ser adicionados aqui
     # Ex: add_item_to_checklist, update_checklist_item, delete_checklist_item
 
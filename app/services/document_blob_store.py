@@ -0,0 +1,169 @@
+# app/services/document_blob_store.py
+from ..extensions import db
+from ..models.document_blob import DocumentBlob
+from ..models.documento import Documento
+from ..utils.db_utils import chunked, upsert_statement
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+import datetime
+import hashlib
+import json
+import os
+
+# Blobs usados há menos tempo que isso não são removidos (podem estar sendo referenciados agora)
+EVICTION_GRACE = datetime.timedelta(hours=1)
+
+def content_hash_for(data):
+    """Hash do conteúdo de um documento: SHA-256 dos dados em JSON com chaves ordenadas (datas em ISO)"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+class DocumentBlobStore:
+    """
+    Armazenamento endereçado por conteúdo dos PDFs gerados.
+
+    Cada PDF é identificado por (versão do template, hash do conteúdo); gerações
+    idênticas reutilizam o mesmo arquivo e criam apenas uma nova versão de
+    Documento apontando para ele. Blobs sem Documento que os referencie são
+    removidos em ordem de último uso (LRU) quando o total passa de
+    DOCUMENT_BLOB_CACHE_MAX_BYTES.
+    """
+
+    @staticmethod
+    def blob_path(documents_folder, template_version, content_hash):
+        """Caminho do arquivo do blob (subdiretórios pelo prefixo do hash)"""
+        directory = os.path.join(documents_folder, "blobs", content_hash[:2])
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{content_hash}_{template_version[:16]}.pdf")
+
+    @staticmethod
+    def find(template_version, content_hash):
+        """
+        Retorna o blob existente para a chave e registra o uso, ou None
+
+        Blobs cujo arquivo não existe mais são descartados.
+        """
+        blob = DocumentBlob.query.filter_by(template_version=template_version, content_hash=content_hash).first()
+        if blob is None:
+            return None
+        if not os.path.exists(blob.storage_path):
+            DocumentBlobStore._discard([blob])
+            return None
+
+        DocumentBlobStore._touch([blob.id])
+        return blob
+
+    @staticmethod
+    def find_many(keys):
+        """
+        Versão em lote de find(): busca os blobs de várias chaves de uma vez
+
+        Args:
+            keys (iterable): Tuplas (versão do template, hash do conteúdo)
+
+        Returns:
+            dict: Chave -> DocumentBlob, apenas para as chaves encontradas
+        """
+        keys = set(keys)
+        found = {}
+        missing = []
+        for chunk in chunked({content_hash for _, content_hash in keys}, 500):
+            for blob in DocumentBlob.query.filter(DocumentBlob.content_hash.in_(chunk)):
+                key = (blob.template_version, blob.content_hash)
+                if key not in keys:
+                    continue
+                if os.path.exists(blob.storage_path):
+                    found[key] = blob
+                else:
+                    missing.append(blob)
+
+        if missing:
+            DocumentBlobStore._discard(missing)
+        if found:
+            DocumentBlobStore._touch([blob.id for blob in found.values()])
+        return found
+
+    @staticmethod
+    def register(template_version, content_hash, storage_path):
+        """Registra um blob recém-renderizado (se outro processo já o registrou, retorna o existente)"""
+        values = {
+            "template_version": template_version,
+            "content_hash": content_hash,
+            "storage_path": storage_path,
+            "size_bytes": os.path.getsize(storage_path),
+            "hit_count": 0,
+            "created_at": datetime.datetime.utcnow(),
+            "last_used_at": datetime.datetime.utcnow()
+        }
+        statement = upsert_statement(DocumentBlob.__table__, ["template_version", "content_hash"])
+        if statement is not None:
+            db.session.execute(statement, values)
+            db.session.commit()
+        else:
+            try:
+                db.session.add(DocumentBlob(**values))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+        return DocumentBlob.query.filter_by(template_version=template_version, content_hash=content_hash).first()
+
+    @staticmethod
+    def _touch(blob_ids):
+        """Registra o uso dos blobs (contador de reaproveitamento e ordem LRU)"""
+        for chunk in chunked(blob_ids, 500):
+            DocumentBlob.query.filter(DocumentBlob.id.in_(chunk)).update({
+                "hit_count": DocumentBlob.hit_count + 1,
+                "last_used_at": datetime.datetime.utcnow()
+            }, synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def _discard(blobs):
+        """Remove os registros de blobs cujo arquivo não existe mais"""
+        for blob in blobs:
+            Documento.query.filter_by(blob_id=blob.id).update({"blob_id": None}, synchronize_session=False)
+            db.session.delete(blob)
+        db.session.commit()
+
+    @staticmethod
+    def evict(max_bytes=None):
+        """
+        Remove blobs não referenciados, do uso mais antigo ao mais recente, até o
+        total armazenado ficar abaixo de max_bytes
+
+        Returns:
+            dict: Blobs removidos, bytes liberados e total restante
+        """
+        max_bytes = max_bytes if max_bytes is not None else current_app.config.get(
+            "DOCUMENT_BLOB_CACHE_MAX_BYTES", 1024 ** 3
+        )
+        total = db.session.query(db.func.coalesce(db.func.sum(DocumentBlob.size_bytes), 0)).scalar()
+        result = {"evicted": 0, "freed_bytes": 0, "total_bytes": total}
+        if total <= max_bytes:
+            return result
+
+        unreferenced = ~db.exists().where(Documento.blob_id == DocumentBlob.id)
+        candidates = db.session.query(DocumentBlob.id, DocumentBlob.storage_path, DocumentBlob.size_bytes).filter(
+            unreferenced,
+            DocumentBlob.last_used_at < datetime.datetime.utcnow() - EVICTION_GRACE
+        ).order_by(DocumentBlob.last_used_at.asc()).all()
+
+        for blob_id, storage_path, size_bytes in candidates:
+            if total <= max_bytes:
+                break
+            # A condição é repetida no DELETE: um Documento pode ter passado a referenciar o blob
+            deleted = DocumentBlob.query.filter(DocumentBlob.id == blob_id, unreferenced).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+            if not deleted:
+                continue
+            try:
+                os.remove(storage_path)
+            except OSError as e:
+                print(f"Erro ao remover arquivo de documento {storage_path}: {str(e)}")
+            total -= size_bytes
+            result["evicted"] += 1
+            result["freed_bytes"] += size_bytes
+
+        result["total_bytes"] = total
+        return result
@@ -0,0 +1,496 @@
+# app/services/document_render_service.py
+from ..extensions import db
+from ..models.document_render_job import DocumentRenderJob
+from .documento_service import DocumentoService
+from .document_blob_store import DocumentBlobStore, content_hash_for
+import atexit
+import concurrent.futures
+import datetime
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+
+# Folha de estilo padrão dos documentos (antes recriada a cada geração)
+DEFAULT_STYLESHEET = "@page { margin: 1cm; }"
+
+class DocumentRenderService:
+    """
+    Geração de PDFs (WeasyPrint) em um pool de processos.
+
+    Cada worker é iniciado uma única vez com os templates de documentos já
+    compilados (Jinja), a configuração de fontes carregada e as folhas de estilo
+    (CSS) interpretadas e mantidas em cache por template. A requisição apenas
+    registra o job (document_render_jobs) e retorna; ao concluir, o Documento é
+    criado e o usuário recebe a notificação de documento gerado.
+
+    Os PDFs são gravados no DocumentBlobStore, endereçados pela versão do
+    template (hash do arquivo e da folha de estilo) e pelo hash dos dados: uma
+    geração idêntica a outra já renderizada não passa pelo pool e apenas cria a
+    nova versão do Documento apontando para o mesmo arquivo.
+
+    Com DOCUMENT_RENDER_WORKERS = 0 a renderização acontece na própria
+    requisição (útil em desenvolvimento).
+
+    Se um worker morrer (ex: falta de memória no WeasyPrint), o pool é recriado
+    na próxima geração; jobs que ficaram em "queued" (ex: reinício do processo)
+    são marcados como erro após DOCUMENT_RENDER_JOB_TIMEOUT.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._template_versions = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configura o pool a partir das configurações da aplicação"""
+        self.app = app
+        self.workers = app.config.get("DOCUMENT_RENDER_WORKERS", 2)
+        self.documents_folder = app.config.get("DOCUMENTS_FOLDER") or os.path.join(app.root_path, "documents")
+        self.template_folder = os.path.join(app.root_path, app.template_folder)
+        self.stylesheets = dict(app.config.get("DOCUMENT_STYLESHEETS") or {})
+        self.job_timeout = app.config.get("DOCUMENT_RENDER_JOB_TIMEOUT", 900)
+        app.extensions["document_renderer"] = self
+        atexit.register(self.shutdown)
+
+    def submit(self, data, user_id=None):
+        """
+        Registra um job de geração e o envia ao pool
+
+        Args:
+            data (dict): Dados do documento (document_type, title e variáveis do template)
+            user_id (int, optional): Usuário notificado ao concluir
+
+        Returns:
+            DocumentRenderJob: Job registrado
+
+        Raises:
+            ValueError: Se faltar tipo/título ou não houver template para o tipo
+        """
+        template_name = self.template_name(data)
+        # A data de geração é impressa nos documentos: faz parte do conteúdo e da chave do blob
+        context = {"now": datetime.date.today(), **data}
+        blob_key = (self.template_version(data["document_type"]), content_hash_for(context))
+        job = DocumentRenderJob(uuid.uuid4().hex, data["document_type"], data["title"], user_id)
+        db.session.add(job)
+        db.session.commit()
+
+        blob = DocumentBlobStore.find(*blob_key)
+        if blob is not None:
+            self._complete(job.id, data, {"path": blob.storage_path, "render_ms": 0.0}, blob_key, blob=blob)
+            return db.session.get(DocumentRenderJob, job.id)
+
+        output_path = DocumentBlobStore.blob_path(self.documents_folder, *blob_key)
+        args = (self.template_folder, template_name, context, output_path, self._stylesheet(data["document_type"]))
+
+        if not self.workers:
+            try:
+                result = render_pdf(*args)
+            except Exception as e:
+                self._fail(job.id, e)
+            else:
+                self._complete(job.id, data, result, blob_key)
+            return db.session.get(DocumentRenderJob, job.id)
+
+        try:
+            future = self._submit(render_pdf, *args)
+        except Exception as e:
+            self._fail(job.id, e)
+            return db.session.get(DocumentRenderJob, job.id)
+        future.add_done_callback(lambda future: self._on_rendered(job.id, data, blob_key, future))
+        return job
+
+    def render_batch(self, document_type, rows, title=None, context=None, user_id=None):
+        """
+        Gera um documento por linha de contexto, em paralelo no pool
+
+        As versões de todos os títulos são reservadas com uma única consulta, os
+        PDFs já existentes no DocumentBlobStore são reaproveitados e linhas com o
+        mesmo conteúdo são renderizadas uma única vez.
+
+        Args:
+            document_type (str): Tipo de documento (template) de todas as linhas
+            rows (list): Dicts com as variáveis do template de cada linha
+            title (str, optional): Título das linhas sem "title"; aceita campos da
+                linha (ex: "Política de Privacidade - {empresa_nome}")
+            context (dict, optional): Variáveis comuns a todas as linhas
+            user_id (int, optional): Usuário registrado nos documentos
+
+        Returns:
+            generator: Um dict por linha (row, title, status, version, documento_id,
+                path, cached, render_ms e error), na ordem em que ficam prontas
+
+        Raises:
+            ValueError: Se não houver template para o tipo
+        """
+        template_name = self.template_for_type(document_type)
+        template_version = self.template_version(document_type)
+
+        # A data de geração é impressa nos documentos: faz parte do conteúdo e da chave do blob
+        render_date = datetime.date.today()
+        results = []
+        items = []
+        for index, row in enumerate(rows, start=1):
+            data = {"now": render_date, **(context or {}), **row, "document_type": document_type}
+            try:
+                data["title"] = _row_title(title, data)
+            except ValueError as e:
+                results.append(_batch_result(index, data.get("title"), error=str(e)))
+                continue
+            items.append({"row": index, "data": data, "key": (template_version, content_hash_for(data))})
+
+        # Versões reservadas na ordem das linhas (títulos repetidos no lote recebem versões seguidas)
+        versions = DocumentoService.next_versions(document_type, {item["data"]["title"] for item in items})
+        groups = {}
+        for item in items:
+            item["version"] = versions[item["data"]["title"]]
+            versions[item["data"]["title"]] += 1
+            groups.setdefault(item["key"], []).append(item)
+
+        # Apenas id e caminho: o gerador roda durante o envio da resposta, fora da sessão desta consulta
+        blobs = {
+            key: (blob.id, blob.storage_path) for key, blob in DocumentBlobStore.find_many(groups).items()
+        }
+        return self._run_batch(template_name, document_type, groups, blobs, results, user_id)
+
+    def template_name(self, data):
+        """
+        Valida os dados e retorna o template do tipo de documento
+
+        Raises:
+            ValueError: Se faltar tipo/título ou não houver template para o tipo
+        """
+        if not data or not data.get("document_type") or not data.get("title"):
+            raise ValueError("Tipo de documento e título são obrigatórios")
+        return self.template_for_type(data["document_type"])
+
+    def template_for_type(self, document_type):
+        """
+        Retorna o template do tipo de documento
+
+        Raises:
+            ValueError: Se não houver template para o tipo
+        """
+        if not document_type:
+            raise ValueError("Tipo de documento é obrigatório")
+        template_name = f"documentos/{document_type}.html"
+        if os.path.basename(document_type) != document_type or not os.path.exists(
+            os.path.join(self.template_folder, template_name)
+        ):
+            raise ValueError(f"Tipo de documento sem template: {document_type}")
+        return template_name
+
+    def template_version(self, document_type):
+        """Hash do template e da folha de estilo do tipo de documento (recalculado quando o arquivo muda)"""
+        path = os.path.join(self.template_folder, f"documentos/{document_type}.html")
+        stylesheet = self._stylesheet(document_type)
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._template_versions.get(document_type)
+        if cached is None or cached[0] != (mtime, stylesheet):
+            with open(path, "rb") as template_file:
+                digest = hashlib.sha256(template_file.read())
+            digest.update(stylesheet.encode("utf-8"))
+            cached = self._template_versions[document_type] = ((mtime, stylesheet), digest.hexdigest())
+        return cached[1]
+
+    def get_job(self, job_id):
+        return db.session.get(DocumentRenderJob, job_id)
+
+    def expire_stale_jobs(self, timeout=None):
+        """
+        Marca como erro os jobs em "queued" há mais de DOCUMENT_RENDER_JOB_TIMEOUT segundos
+        (perdidos em um reinício do processo ou na queda do pool)
+
+        Returns:
+            int: Quantidade de jobs expirados
+        """
+        timeout = timeout if timeout is not None else self.job_timeout
+        now = datetime.datetime.utcnow()
+        expired = DocumentRenderJob.query.filter(
+            DocumentRenderJob.status == "queued",
+            DocumentRenderJob.created_at < now - datetime.timedelta(seconds=timeout)
+        ).update({
+            "status": "error",
+            "error": "Geração não concluída (job expirado)",
+            "finished_at": now
+        }, synchronize_session=False)
+        db.session.commit()
+        return expired
+
+    def shutdown(self, wait=True):
+        """Encerra o pool de workers (aguardando os jobs em andamento)"""
+        executor = self._executor
+        self._executor = None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=wait)
+
+    # --- Internos ---
+
+    def _submit(self, fn, *args):
+        """Envia ao pool; se o pool estiver quebrado (worker morto), recria e tenta uma vez mais"""
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args)
+        except concurrent.futures.BrokenExecutor:
+            self._discard_executor(executor)
+            return self._get_executor().submit(fn, *args)
+
+    def _discard_executor(self, executor):
+        """Descarta um pool quebrado; o próximo _get_executor() cria outro"""
+        with self._start_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self):
+        # A verificação de PID cobre servidores que fazem fork após o create_app (ex: Gunicorn)
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._start_lock:
+            if self._executor is None or self._pid != os.getpid():
+                # spawn: os workers não herdam threads nem conexões do processo web
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_render_worker,
+                    initargs=(self.template_folder, self.stylesheets)
+                )
+                self._pid = os.getpid()
+        return self._executor
+
+    def _stylesheet(self, document_type):
+        return self.stylesheets.get(document_type, DEFAULT_STYLESHEET)
+
+    def _run_batch(self, template_name, document_type, groups, blobs, results, user_id):
+        """Gerador de render_batch: registra e retorna cada linha assim que seu PDF fica pronto"""
+        yield from results
+        for key, (blob_id, storage_path) in blobs.items():
+            yield from self._complete_batch(groups[key], key, blob_id=blob_id, storage_path=storage_path, user_id=user_id)
+
+        pending = [key for key in groups if key not in blobs]
+        stylesheet = self._stylesheet(document_type)
+        render_args = {
+            key: (self.template_folder, template_name, groups[key][0]["data"],
+                  DocumentBlobStore.blob_path(self.documents_folder, *key), stylesheet)
+            for key in pending
+        }
+
+        if not self.workers:
+            for key in pending:
+                try:
+                    result = render_pdf(*render_args[key])
+                except Exception as e:
+                    yield from self._fail_batch(groups[key], e)
+                else:
+                    yield from self._complete_batch(groups[key], key, result=result, user_id=user_id)
+            return
+
+        futures = {}
+        for key in pending:
+            try:
+                futures[self._submit(render_pdf, *render_args[key])] = key
+            except Exception as e:
+                yield from self._fail_batch(groups[key], e)
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self._check_pool(e)
+                    yield from self._fail_batch(groups[key], e)
+                else:
+                    yield from self._complete_batch(groups[key], key, result=result, user_id=user_id)
+        finally:
+            # Cliente desconectado: descarta o que ainda não começou a renderizar
+            for future in futures:
+                future.cancel()
+
+    def _complete_batch(self, items, key, result=None, blob_id=None, storage_path=None, user_id=None):
+        cached = blob_id is not None
+        try:
+            if not cached:
+                blob = DocumentBlobStore.register(*key, result["path"])
+                blob_id, storage_path = blob.id, blob.storage_path
+        except Exception as e:
+            db.session.rollback()
+            yield from self._fail_batch(items, e)
+            return
+
+        for item in items:
+            data = item["data"]
+            try:
+                documento = DocumentoService.create_generated_document(
+                    data, storage_path, key[1], user_id=user_id, blob_id=blob_id, version=item["version"]
+                )
+            except Exception as e:
+                db.session.rollback()
+                print(f"Erro ao registrar documento do lote (linha {item['row']}): {str(e)}")
+                yield _batch_result(item["row"], data["title"], error=str(e))
+                continue
+            yield _batch_result(
+                item["row"], data["title"], status="done", version=documento.version,
+                documento_id=documento.id, path=documento.storage_path, cached=cached,
+                render_ms=0.0 if cached else result["render_ms"]
+            )
+
+    def _fail_batch(self, items, error):
+        print(f"Erro ao gerar documento do lote (linhas {', '.join(str(item['row']) for item in items)}): {str(error)}")
+        for item in items:
+            yield _batch_result(item["row"], item["data"]["title"], error=str(error))
+
+    def _on_rendered(self, job_id, data, blob_key, future):
+        """Callback do pool (thread do executor): registra o resultado no banco"""
+        with self.app.app_context():
+            try:
+                result = future.result()
+            except Exception as e:
+                self._check_pool(e)
+                self._fail(job_id, e)
+                return
+            try:
+                self._complete(job_id, data, result, blob_key)
+            except Exception as e:
+                db.session.rollback()
+                self._fail(job_id, e)
+
+    def _complete(self, job_id, data, result, blob_key, blob=None):
+        """Registra o blob (se recém-renderizado), a nova versão do Documento e conclui o job"""
+        from .notification_service import NotificationService
+
+        job = db.session.get(DocumentRenderJob, job_id)
+        job.cached = blob is not None
+        if blob is None:
+            blob = DocumentBlobStore.register(*blob_key, result["path"])
+        documento = DocumentoService.create_generated_document(
+            data, result["path"], blob_key[1], user_id=data.get("user_id") or job.user_id, blob_id=blob.id
+        )
+
+        job.status = "done"
+        job.documento_id = documento.id
+        job.render_ms = result["render_ms"]
+        job.finished_at = datetime.datetime.utcnow()
+        db.session.commit()
+
+        if job.user_id:
+            NotificationService.notify_documento_gerado(documento, job.user_id)
+
+    def _check_pool(self, error):
+        if isinstance(error, concurrent.futures.BrokenExecutor) and self._executor is not None:
+            self._discard_executor(self._executor)
+
+    def _fail(self, job_id, error):
+        # O arquivo parcial é removido pelo próprio render_pdf; o blob pode pertencer a outra geração
+        print(f"Erro ao gerar documento (job {job_id}): {str(error)}")
+        job = db.session.get(DocumentRenderJob, job_id)
+        job.status = "error"
+        job.error = str(error)
+        job.finished_at = datetime.datetime.utcnow()
+        db.session.commit()
+
+def _row_title(title, data):
+    """Título da linha: o da própria linha ou o título do lote preenchido com os campos da linha"""
+    if data.get("title"):
+        return str(data["title"])
+    if not title:
+        raise ValueError("Título é obrigatório")
+    try:
+        return str(title).format_map(data)
+    except KeyError as e:
+        raise ValueError(f"Campo {e} do título ausente na linha")
+    except (ValueError, IndexError):
+        raise ValueError(f"Título inválido: {title}")
+
+def _batch_result(row, title, status="error", version=None, documento_id=None, path=None,
+                  cached=False, render_ms=None, error=None):
+    return {
+        "row": row,
+        "title": title,
+        "status": status,
+        "version": version,
+        "documento_id": documento_id,
+        "path": path,
+        "cached": cached,
+        "render_ms": render_ms,
+        "error": error
+    }
+
+# Estado de cada processo worker (preenchido por init_render_worker)
+_worker = {}
+
+def init_render_worker(template_folder, stylesheets):
+    """Inicializa um worker: fontes, templates compilados e folhas de estilo interpretadas"""
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    environment = Environment(
+        loader=FileSystemLoader(template_folder),
+        autoescape=select_autoescape(["html"]),
+        # Templates alterados são recompilados: a versão usada na chave do blob é a do arquivo atual
+        auto_reload=True
+    )
+    _worker.clear()
+    _worker.update({
+        "template_folder": template_folder,
+        "environment": environment,
+        "font_config": FontConfiguration(),
+        "css": {}
+    })
+
+    # Compila os templates e aquece WeasyPrint (fontes e estilos padrão) antes do primeiro job
+    for template_name in environment.list_templates(filter_func=lambda name: name.startswith("documentos/")):
+        environment.get_template(template_name)
+    for stylesheet in set(stylesheets.values()) | {DEFAULT_STYLESHEET}:
+        _get_css(stylesheet)
+    HTML(string="<p>.</p>").write_pdf(font_config=_worker["font_config"], stylesheets=[_get_css(DEFAULT_STYLESHEET)])
+
+def _get_css(stylesheet):
+    from weasyprint import CSS
+
+    css = _worker["css"].get(stylesheet)
+    if css is None:
+        css = _worker["css"][stylesheet] = CSS(string=stylesheet, font_config=_worker["font_config"])
+    return css
+
+def render_pdf(template_folder, template_name, context, output_path, stylesheet=DEFAULT_STYLESHEET):
+    """
+    Renderiza o template com o contexto e grava o PDF em output_path
+
+    Returns:
+        dict: path do arquivo e render_ms
+    """
+    from weasyprint import HTML
+
+    if _worker.get("template_folder") != template_folder:
+        # Execução fora do pool (DOCUMENT_RENDER_WORKERS = 0) ou primeira chamada
+        init_render_worker(template_folder, {})
+
+    start = time.perf_counter()
+    # "now" é usado pelos templates na data de atualização e no rodapé
+    html_content = _worker["environment"].get_template(template_name).render(
+        **{"now": datetime.datetime.now(), **context}
+    )
+    # Nome temporário por processo e thread: gerações simultâneas do mesmo blob não se sobrescrevem
+    temporary_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.partial"
+    try:
+        HTML(string=html_content, base_url=template_folder).write_pdf(
+            temporary_path,
+            stylesheets=[_get_css(stylesheet)],
+            font_config=_worker["font_config"]
+        )
+        os.replace(temporary_path, output_path)
+    except Exception:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return {"path": output_path, "render_ms": (time.perf_counter() - start) * 1000}
+
+# Instância única, inicializada em create_app()
+document_renderer = DocumentRenderService()
@@ -1,6 +1,7 @@
 # app/services/documento_service.py
 from ..models.documento import Documento
 from ..extensions import db
+from ..utils.db_utils import chunked
 import os
 import hashlib # Para gerar hash do conteúdo, se necessário
 # from fpdf import FPDF # Exemplo se for gerar PDF diretamente no service
@@ -60,6 +61,50 @@ class DocumentoService:
         db.session.commit()
         return new_document
 
+    @staticmethod
+    def next_version(title, document_type):
+        """Retorna a próxima versão de um documento (mesmo título e tipo)."""
+        latest = db.session.query(db.func.max(Documento.version)).filter(
+            Documento.title == title,
+            Documento.document_type == document_type
+        ).scalar()
+        return (latest or 0) + 1
+
+    @staticmethod
+    def next_versions(document_type, titles):
+        """Retorna a próxima versão de cada título do tipo, com uma única consulta agrupada."""
+        versions = {title: 1 for title in titles}
+        for chunk in chunked(versions, 500):
+            rows = db.session.query(Documento.title, db.func.max(Documento.version)).filter(
+                Documento.document_type == document_type,
+                Documento.title.in_(chunk)
+            ).group_by(Documento.title)
+            for title, latest in rows:
+                versions[title] = (latest or 0) + 1
+        return versions
+
+    @staticmethod
+    def create_generated_document(data, file_path, content_hash, user_id=None, blob_id=None, version=None):
+        """Registra um documento gerado (PDF em file_path, opcionalmente um DocumentBlob) com a próxima versão
+           (ou com a versão informada, já reservada pelo chamador)."""
+        documento = Documento(
+            title=data.get("title"),
+            document_type=data.get("document_type"),
+            user_id=user_id,
+            content_hash=content_hash,
+            storage_path=file_path,
+            version=version or DocumentoService.next_version(data.get("title"), data.get("document_type")),
+            empresa_nome=data.get("empresa_nome"),
+            tipo_dados=data.get("tipo_dados"),
+            base_legal=data.get("base_legal"),
+            finalidade=data.get("finalidade"),
+            compartilhamento=data.get("compartilhamento")
+        )
+        documento.blob_id = blob_id
+        db.session.add(documento)
+        db.session.commit()
+        return documento
+
     @staticmethod
     def get_all_documents(user_id=None):
         """Retorna metadados de todos os documentos, opcionalmente filtrados por usuário."""
@@ -0,0 +1,89 @@
+# app/services/notification_bus.py
+import collections
+import queue
+import threading
+
+class Subscription:
+    """
+    Assinatura de um cliente do stream de notificações.
+
+    Os eventos ficam em uma fila limitada; se o cliente não consumir a tempo, os
+    eventos excedentes são descartados e a assinatura é marcada como overflowed,
+    para que o stream recupere o que faltou no banco a partir do último ID enviado.
+    """
+
+    def __init__(self, user_id, maxsize=100):
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=maxsize)
+        # IDs já entregues (evita duplicatas entre replay e eventos ao vivo)
+        self._sent_ids = set()
+        self._sent_order = collections.deque()
+        self._sent_limit = max(maxsize * 10, 1000)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Aguarda o próximo evento; levanta queue.Empty após timeout segundos"""
+        return self._queue.get(timeout=timeout)
+
+    def mark_sent(self, event_id):
+        """Registra o envio de um evento; retorna False se ele já tinha sido enviado"""
+        if event_id in self._sent_ids:
+            return False
+        self._sent_ids.add(event_id)
+        self._sent_order.append(event_id)
+        if len(self._sent_order) > self._sent_limit:
+            self._sent_ids.discard(self._sent_order.popleft())
+        return True
+
+class NotificationBus:
+    """
+    Pub/sub em memória, por processo, para o stream de notificações (SSE).
+
+    Cada worker entrega apenas o que foi publicado nele; notificações criadas em
+    outro processo (ex: agendador via CLI) chegam pela ressincronização periódica
+    do stream com o banco.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, maxsize=100):
+        subscription = Subscription(user_id, maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return user_id in self._subscriptions
+
+    def subscribed_users(self, user_ids):
+        """Filtra os usuários que têm ao menos uma conexão aberta"""
+        with self._lock:
+            return {user_id for user_id in user_ids if user_id in self._subscriptions}
+
+    def publish(self, user_id, event):
+        """Entrega o evento (dict com "id") a todas as conexões do usuário"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+        return len(subscriptions)
+
+# Instância única por processo
+notification_bus = NotificationBus()
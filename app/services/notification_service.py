@@ -1,8 +1,27 @@
 # app/services/notification_service.py
 from ..models.notification import Notification, NotificationTypeEnum, NotificationPriorityEnum, NotificationStatusEnum
+from ..models.checklist import Checklist
 from ..models.checklist_item import ChecklistItem, StatusEnum, RiscoEnum
 from ..extensions import db
+from ..utils.cache import TTLCache
+from .notification_bus import notification_bus
+from flask import current_app
 import datetime
+import json
+import queue
+import time
+
+# Faixas de prazo (em dias) usadas nas notificações de vencimento
+DEADLINE_BUCKETS = (1, 3, 7)
+
+# Filtros aceitos nas operações em lote (POST /api/notifications/bulk)
+BULK_FILTER_KEYS = ("ids", "type", "status", "before")
+
+# Contador de não lidas por usuário, ajustado incrementalmente a cada mudança de status
+_unread_cache = TTLCache(ttl=60, maxsize=10000)
+
+def _format_sse(event):
+    return f"id: {event['id']}\nevent: notification\ndata: {json.dumps(event)}\n\n"
 
 class NotificationService:
     @staticmethod
@@ -24,9 +43,167 @@ class NotificationService:
         
         db.session.add(notification)
         db.session.commit()
+        NotificationService._after_create(notification)
         
         return notification
     
+    @staticmethod
+    def insert_notifications(rows):
+        """
+        Grava várias notificações com um único INSERT e atualiza os contadores
+
+        Args:
+            rows (list): Dicts com as colunas de Notification
+        """
+        if not rows:
+            db.session.commit()
+            return 0
+        
+        created_per_user = {}
+        for row in rows:
+            created_per_user[row["user_id"]] = created_per_user.get(row["user_id"], 0) + 1
+        
+        # Só relê as notificações criadas se algum destinatário estiver conectado ao stream
+        subscribed_users = notification_bus.subscribed_users(created_per_user)
+        last_id = None
+        if subscribed_users:
+            last_id = db.session.query(db.func.max(Notification.id)).scalar() or 0
+        
+        db.session.execute(Notification.__table__.insert(), rows)
+        db.session.commit()
+        
+        for user_id, created in created_per_user.items():
+            NotificationService.adjust_unread_count(user_id, created)
+        
+        if subscribed_users:
+            created = Notification.query.filter(
+                Notification.id > last_id,
+                Notification.user_id.in_(subscribed_users)
+            ).order_by(Notification.id)
+            for notification in created:
+                notification_bus.publish(notification.user_id, notification.to_dict())
+        return len(rows)
+    
+    @staticmethod
+    def get_unread_count(user_id):
+        """
+        Retorna a quantidade de notificações não lidas do usuário
+
+        O valor é servido do cache em memória; o COUNT no banco só é feito quando
+        a entrada expira (NOTIFICATION_COUNT_CACHE_TTL) ou ainda não existe.
+        """
+        count = _unread_cache.get(user_id)
+        if count is not None:
+            return count
+        
+        version = _unread_cache.version(user_id)
+        count = Notification.query.filter_by(
+            user_id=user_id,
+            status=NotificationStatusEnum.NAO_LIDA
+        ).count()
+        # Não grava se o contador mudou durante a consulta (o valor lido pode estar defasado)
+        _unread_cache.set_if_version(
+            user_id, count, version, ttl=current_app.config.get("NOTIFICATION_COUNT_CACHE_TTL", 60)
+        )
+        return count
+    
+    @staticmethod
+    def _after_create(notification):
+        """Atualiza o contador e publica a notificação no stream (após o commit)"""
+        NotificationService.adjust_unread_count(notification.user_id, 1)
+        notification_bus.publish(notification.user_id, notification.to_dict())
+    
+    @staticmethod
+    def event_stream(user_id, last_event_id=None):
+        """
+        Gerador do stream SSE de notificações do usuário
+
+        Envia as notificações posteriores a last_event_id (replay), depois os
+        eventos publicados no barramento, com heartbeat a cada
+        NOTIFICATION_STREAM_HEARTBEAT segundos. O stream se ressincroniza com o banco
+        quando o buffer da conexão transborda e a cada NOTIFICATION_STREAM_RESYNC_SECONDS,
+        para entregar notificações criadas em outros processos.
+        """
+        config = current_app.config
+        heartbeat = config.get("NOTIFICATION_STREAM_HEARTBEAT", 15)
+        resync_interval = config.get("NOTIFICATION_STREAM_RESYNC_SECONDS", 60)
+        buffer_size = config.get("NOTIFICATION_STREAM_BUFFER", 100)
+        replay_limit = config.get("NOTIFICATION_STREAM_REPLAY_LIMIT", 100)
+        
+        subscription = notification_bus.subscribe(user_id, buffer_size)
+        try:
+            yield "retry: 3000\n\n" # Intervalo de reconexão do EventSource (ms)
+            
+            # Assinatura feita antes de fixar o cursor: nada criado a partir daqui se perde
+            cursor = last_event_id
+            if cursor is None:
+                cursor = db.session.query(db.func.max(Notification.id)).filter(
+                    Notification.user_id == user_id
+                ).scalar() or 0
+                db.session.close()
+            else:
+                for event in NotificationService._replay_events(subscription, cursor, replay_limit):
+                    cursor = max(cursor, event["id"])
+                    yield _format_sse(event)
+            
+            next_resync = time.monotonic() + resync_interval
+            while True:
+                if subscription.overflowed or (resync_interval and time.monotonic() >= next_resync):
+                    subscription.overflowed = False
+                    for event in NotificationService._replay_events(subscription, cursor, replay_limit):
+                        cursor = max(cursor, event["id"])
+                        yield _format_sse(event)
+                    next_resync = time.monotonic() + resync_interval
+                
+                try:
+                    event = subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                
+                if subscription.mark_sent(event["id"]):
+                    cursor = max(cursor, event["id"])
+                    yield _format_sse(event)
+        finally:
+            notification_bus.unsubscribe(subscription)
+    
+    @staticmethod
+    def _replay_events(subscription, after_id, limit):
+        """Notificações do usuário com ID maior que after_id ainda não enviadas nesta conexão"""
+        while True:
+            notifications = Notification.query.filter(
+                Notification.user_id == subscription.user_id,
+                Notification.id > after_id
+            ).order_by(Notification.id).limit(limit).all()
+            events = [notification.to_dict() for notification in notifications]
+            # Libera a conexão do pool enquanto o stream fica aberto
+            db.session.close()
+            
+            for event in events:
+                if subscription.mark_sent(event["id"]):
+                    yield event
+            if len(events) < limit:
+                return
+            after_id = events[-1]["id"]
+    
+    @staticmethod
+    def adjust_unread_count(user_id, delta):
+        """Ajusta o contador de não lidas em cache (chamar após o commit)"""
+        _unread_cache.incr(user_id, delta)
+    
+    @staticmethod
+    def invalidate_unread_count(user_id):
+        """Descarta o contador em cache; o próximo acesso recontará no banco"""
+        _unread_cache.delete(user_id)
+    
+    @staticmethod
+    def on_status_changed(user_id, old_status, new_status):
+        """Atualiza o contador de não lidas após uma mudança de status já commitada"""
+        was_unread = old_status == NotificationStatusEnum.NAO_LIDA
+        is_unread = new_status == NotificationStatusEnum.NAO_LIDA
+        if was_unread != is_unread:
+            NotificationService.adjust_unread_count(user_id, 1 if is_unread else -1)
+    
     @staticmethod
     def mark_as_read(notification_id, user_id):
         """
@@ -38,8 +215,10 @@ class NotificationService:
         ).first()
         
         if notification:
+            old_status = notification.status
             notification.mark_as_read()
             db.session.commit()
+            NotificationService.on_status_changed(user_id, old_status, notification.status)
             return True
         
         return False
@@ -49,18 +228,134 @@ class NotificationService:
         """
         Marca todas as notificações não lidas do usuário como lidas
         """
-        notifications = Notification.query.filter_by(
-            user_id=user_id,
-            status=NotificationStatusEnum.NAO_LIDA
-        ).all()
+        return NotificationService.bulk_mark_as_read(user_id)
+    
+    @staticmethod
+    def bulk_mark_as_read(user_id, filters=None):
+        """
+        Marca como lidas, com um único UPDATE, as notificações não lidas que atendem aos filtros
+
+        Returns:
+            int: Quantidade de notificações alteradas
+        """
+        query = NotificationService._filtered_query(user_id, filters).filter(
+            Notification.status == NotificationStatusEnum.NAO_LIDA
+        )
+        affected = query.update({
+            Notification.status: NotificationStatusEnum.LIDA.value,
+            Notification.read_at: datetime.datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        NotificationService.adjust_unread_count(user_id, -affected)
+        return affected
+    
+    @staticmethod
+    def bulk_archive(user_id, filters=None):
+        """
+        Arquiva, com um único UPDATE, as notificações que atendem aos filtros
+
+        Returns:
+            int: Quantidade de notificações alteradas
+        """
+        query = NotificationService._filtered_query(user_id, filters).filter(
+            Notification.status != NotificationStatusEnum.ARQUIVADA
+        )
+        affected = query.update({
+            Notification.status: NotificationStatusEnum.ARQUIVADA.value
+        }, synchronize_session=False)
+        db.session.commit()
+        if affected:
+            # Parte das notificações podia estar não lida: o contador é recalculado
+            NotificationService.invalidate_unread_count(user_id)
+        return affected
+    
+    @staticmethod
+    def bulk_delete(user_id, filters=None):
+        """
+        Exclui, com um único DELETE, as notificações que atendem aos filtros
+
+        Sem nenhum filtro, exige {"all": true} para excluir todas as notificações do usuário.
+
+        Returns:
+            int: Quantidade de notificações excluídas
+
+        Raises:
+            ValueError: Se nenhum filtro for informado sem "all": true, ou se algum filtro for inválido
+        """
+        filters = filters or {}
+        if all(filters.get(key) is None for key in BULK_FILTER_KEYS) and filters.get("all") is not True:
+            raise ValueError('Informe ao menos um filtro (ids, type, status, before) ou "all": true para excluir todas')
+        affected = NotificationService._filtered_query(user_id, filters).delete(synchronize_session=False)
+        db.session.commit()
+        if affected:
+            NotificationService.invalidate_unread_count(user_id)
+        return affected
+    
+    @staticmethod
+    def _filtered_query(user_id, filters=None):
+        """
+        Consulta das notificações do usuário restrita pelos filtros de operações em lote
+
+        Filtros aceitos: ids (lista), type, status, before (data ISO, exclusiva). Um
+        filtro informado (não None) é sempre aplicado: valores vazios ou inválidos são
+        rejeitados, nunca ignorados (bulk_delete usa o mesmo critério).
+
+        Raises:
+            ValueError: Se algum filtro for inválido
+        """
+        filters = filters or {}
+        query = Notification.query.filter(Notification.user_id == user_id)
         
-        now = datetime.datetime.utcnow()
-        for notification in notifications:
-            notification.status = NotificationStatusEnum.LIDA
-            notification.read_at = now
+        if filters.get("ids") is not None:
+            ids = filters["ids"]
+            if not isinstance(ids, list) or not all(isinstance(notification_id, int) for notification_id in ids):
+                raise ValueError("ids deve ser uma lista de inteiros")
+            query = query.filter(Notification.id.in_(ids))
+        if filters.get("type") is not None:
+            if filters["type"] not in [notification_type.value for notification_type in NotificationTypeEnum]:
+                raise ValueError(f"type inválido: {filters['type']}")
+            query = query.filter(Notification.notification_type == filters["type"])
+        if filters.get("status") is not None:
+            if filters["status"] not in [status.value for status in NotificationStatusEnum]:
+                raise ValueError(f"status inválido: {filters['status']}")
+            query = query.filter(Notification.status == filters["status"])
+        if filters.get("before") is not None:
+            try:
+                before = datetime.datetime.fromisoformat(filters["before"])
+            except (TypeError, ValueError):
+                raise ValueError("before deve ser uma data ISO")
+            query = query.filter(Notification.created_at < before)
+        return query
+    
+    @staticmethod
+    def purge_archived_notifications(retention_days=None, chunk_size=None):
+        """
+        Remove notificações arquivadas mais antigas que a janela de retenção
+
+        A exclusão é feita em blocos (um DELETE por bloco de IDs, com commit a cada
+        bloco) para não manter transações e locks longos em tabelas grandes.
+
+        Returns:
+            int: Quantidade de notificações removidas
+        """
+        config = current_app.config
+        retention_days = retention_days or config.get("NOTIFICATION_RETENTION_DAYS", 90)
+        chunk_size = chunk_size or config.get("NOTIFICATION_PURGE_CHUNK_SIZE", 1000)
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=retention_days)
         
-        db.session.commit()
-        return len(notifications)
+        purged = 0
+        while True:
+            ids = [notification_id for (notification_id,) in db.session.query(Notification.id).filter(
+                Notification.status == NotificationStatusEnum.ARQUIVADA,
+                Notification.created_at < cutoff
+            ).order_by(Notification.id).limit(chunk_size)]
+            if not ids:
+                break
+            purged += Notification.query.filter(Notification.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            if len(ids) < chunk_size:
+                break
+        return purged
     
     @staticmethod
     def archive_notification(notification_id, user_id):
@@ -73,8 +368,10 @@ class NotificationService:
         ).first()
         
         if notification:
+            old_status = notification.status
             notification.archive()
             db.session.commit()
+            NotificationService.on_status_changed(user_id, old_status, notification.status)
             return True
         
         return False
@@ -84,94 +381,97 @@ class NotificationService:
         """
         Verifica itens próximos do vencimento e gera notificações
         Se user_id for fornecido, verifica apenas para esse usuário
+        
+        Returns:
+            int: Total de notificações criadas
+        """
+        return sum(NotificationService.scan_deadlines(user_id).values())
+    
+    @staticmethod
+    def scan_deadlines(user_id=None):
+        """
+        Varredura de prazos baseada em conjuntos.
+        
+        Uma única consulta seleciona os itens em aberto que vencem em até 7 dias,
+        já com o checklist (JOIN) e excluindo os que receberam notificação nas
+        últimas 24h (NOT EXISTS). As notificações são gravadas com um único INSERT.
+        
+        Returns:
+            dict: Notificações criadas por faixa de prazo ("1", "3" e "7" dias)
         """
-        # Obter todos os itens de checklist pendentes ou em andamento que têm prazo definido
-        query = ChecklistItem.query.filter(
+        today = datetime.datetime.now().date()
+        now = datetime.datetime.utcnow()
+        horizon = datetime.datetime.combine(today + datetime.timedelta(days=DEADLINE_BUCKETS[-1] + 1), datetime.time.min)
+        
+        recently_notified = db.exists().where(
+            Notification.reference_type == "checklist_item",
+            Notification.reference_id == ChecklistItem.id,
+            Notification.notification_type == NotificationTypeEnum.VENCIMENTO_PROXIMO,
+            Notification.created_at > now - datetime.timedelta(days=1)
+        )
+        query = db.session.query(
+            ChecklistItem.id,
+            ChecklistItem.nome,
+            ChecklistItem.risco,
+            ChecklistItem.deadline,
+            Checklist.nome.label("checklist_nome"),
+            Checklist.user_id
+        ).join(Checklist, ChecklistItem.checklist_id == Checklist.id).filter(
             ChecklistItem.status.in_([StatusEnum.PENDENTE, StatusEnum.EM_ANDAMENTO]),
-            ChecklistItem.deadline.isnot(None)
+            ChecklistItem.deadline.isnot(None),
+            ChecklistItem.deadline < horizon,
+            Checklist.user_id.isnot(None),
+            ~recently_notified
         )
         
         # Se user_id for fornecido, filtra por checklists desse usuário
         if user_id:
-            query = query.join(ChecklistItem.checklist).filter_by(user_id=user_id)
-            
-        items_with_deadline = query.all()
+            query = query.filter(Checklist.user_id == user_id)
         
-        today = datetime.datetime.now().date()
-        notifications_created = 0
+        counts = {str(bucket): 0 for bucket in DEADLINE_BUCKETS}
+        rows = []
+        for item in query:
+            days_remaining = (item.deadline.date() - today).days
+            bucket = next(bucket for bucket in DEADLINE_BUCKETS if days_remaining <= bucket)
+            rows.append(NotificationService._deadline_notification_row(item, days_remaining, bucket, now))
+            counts[str(bucket)] += 1
         
-        for item in items_with_deadline:
-            # Verificar se o item tem um prazo e se está próximo do vencimento
-            if not item.deadline:
-                continue
-                
-            deadline_date = item.deadline.date() if isinstance(item.deadline, datetime.datetime) else item.deadline
-            days_remaining = (deadline_date - today).days
-            
-            # Definir prioridade com base no risco do item
-            priority = NotificationPriorityEnum.MEDIA
-            if item.risco == RiscoEnum.ALTO:
-                priority = NotificationPriorityEnum.ALTA
-            elif item.risco == RiscoEnum.BAIXO:
-                priority = NotificationPriorityEnum.BAIXA
-            
-            # Verificar se já existe uma notificação recente para este item
-            existing_notification = Notification.query.filter_by(
-                reference_type="checklist_item",
-                reference_id=item.id,
-                notification_type=NotificationTypeEnum.VENCIMENTO_PROXIMO
-            ).filter(
-                Notification.created_at > datetime.datetime.utcnow() - datetime.timedelta(days=1)
-            ).first()
-            
-            if existing_notification:
-                continue
-            
-            # Gerar notificações com base na proximidade do prazo
-            if days_remaining <= 1:
-                # Prazo vence hoje ou amanhã
-                notification = Notification(
-                    user_id=item.checklist.user_id,
-                    title=f"URGENTE: Item vence em {days_remaining+1} dia(s)",
-                    message=f"O item '{item.nome}' do checklist '{item.checklist.nome}' vence em {days_remaining+1} dia(s).",
-                    notification_type=NotificationTypeEnum.VENCIMENTO_PROXIMO,
-                    priority=NotificationPriorityEnum.ALTA,  # Sempre alta quando falta 1 dia ou menos
-                    reference_type="checklist_item",
-                    reference_id=item.id
-                )
-                db.session.add(notification)
-                notifications_created += 1
-                
-            elif days_remaining <= 3:
-                # Prazo vence em 2-3 dias
-                notification = Notification(
-                    user_id=item.checklist.user_id,
-                    title=f"Item vence em {days_remaining} dias",
-                    message=f"O item '{item.nome}' do checklist '{item.checklist.nome}' vence em {days_remaining} dias.",
-                    notification_type=NotificationTypeEnum.VENCIMENTO_PROXIMO,
-                    priority=priority,
-                    reference_type="checklist_item",
-                    reference_id=item.id
-                )
-                db.session.add(notification)
-                notifications_created += 1
-                
-            elif days_remaining <= 7:
+        NotificationService.insert_notifications(rows)
+        return counts
+    
+    @staticmethod
+    def _deadline_notification_row(item, days_remaining, bucket, created_at):
+        """Monta a linha da notificação de vencimento para a faixa de prazo do item"""
+        if bucket == 1:
+            # Prazo vence hoje ou amanhã: sempre alta prioridade
+            title = f"URGENTE: Item vence em {days_remaining+1} dia(s)"
+            message = f"O item '{item.nome}' do checklist '{item.checklist_nome}' vence em {days_remaining+1} dia(s)."
+            priority = NotificationPriorityEnum.ALTA
+        else:
+            title = f"Item vence em {days_remaining} dias"
+            message = f"O item '{item.nome}' do checklist '{item.checklist_nome}' vence em {days_remaining} dias."
+            if bucket == 3:
+                # Prazo vence em 2-3 dias: prioridade conforme o risco do item
+                priority = NotificationPriorityEnum.MEDIA
+                if item.risco == RiscoEnum.ALTO:
+                    priority = NotificationPriorityEnum.ALTA
+                elif item.risco == RiscoEnum.BAIXO:
+                    priority = NotificationPriorityEnum.BAIXA
+            else:
                 # Prazo vence em 4-7 dias
-                notification = Notification(
-                    user_id=item.checklist.user_id,
-                    title=f"Item vence em {days_remaining} dias",
-                    message=f"O item '{item.nome}' do checklist '{item.checklist.nome}' vence em {days_remaining} dias.",
-                    notification_type=NotificationTypeEnum.VENCIMENTO_PROXIMO,
-                    priority=NotificationPriorityEnum.BAIXA,  # Baixa prioridade para prazos mais distantes
-                    reference_type="checklist_item",
-                    reference_id=item.id
-                )
-                db.session.add(notification)
-                notifications_created += 1
+                priority = NotificationPriorityEnum.BAIXA
         
-        db.session.commit()
-        return notifications_created
+        return {
+            "user_id": item.user_id,
+            "title": title,
+            "message": message,
+            "notification_type": NotificationTypeEnum.VENCIMENTO_PROXIMO.value,
+            "priority": priority.value,
+            "status": NotificationStatusEnum.NAO_LIDA.value,
+            "created_at": created_at,
+            "reference_type": "checklist_item",
+            "reference_id": item.id
+        }
     
     @staticmethod
     def notify_item_updated(item, user_id):
@@ -189,6 +489,7 @@ class NotificationService:
         )
         db.session.add(notification)
         db.session.commit()
+        NotificationService._after_create(notification)
         return notification
     
     @staticmethod
@@ -207,6 +508,7 @@ class NotificationService:
         )
         db.session.add(notification)
         db.session.commit()
+        NotificationService._after_create(notification)
         return notification
     
     @staticmethod
@@ -217,7 +519,7 @@ class NotificationService:
         notification = Notification(
             user_id=user_id,
             title="Documento gerado",
-            message=f"Um novo documento '{documento.nome}' foi gerado.",
+            message=f"Um novo documento '{documento.title}' foi gerado.",
             notification_type=NotificationTypeEnum.DOCUMENTO_GERADO,
             priority=NotificationPriorityEnum.MEDIA,
             reference_type="documento",
@@ -225,4 +527,5 @@ class NotificationService:
         )
         db.session.add(notification)
         db.session.commit()
+        NotificationService._after_create(notification)
         return notification
@@ -0,0 +1,238 @@
+# app/services/read_audit_policy.py
+from .audit_service import AuditService
+from ..models.audit_log import ActionTypeEnum
+import atexit
+import datetime
+import hashlib
+import os
+import threading
+
+class PendingRead:
+    """Leituras repetidas de um mesmo usuário/entidade acumuladas em uma janela"""
+
+    def __init__(self, record, now):
+        self.record = record
+        self.first_at = now
+        self.last_at = now
+        self.count = 1
+
+class ReadAuditPolicy:
+    """
+    Política de auditoria de leituras (@audit_read).
+
+    - Entidades sensíveis (READ_AUDIT_SENSITIVE_ENTITIES) são sempre registradas,
+      uma linha por leitura, como antes.
+    - Demais leituras podem ser amostradas de forma determinística por
+      usuário/entidade (READ_AUDIT_SAMPLE_RATE e READ_AUDIT_SAMPLE_RATES): o mesmo
+      usuário e a mesma entidade ficam sempre dentro ou sempre fora da amostra.
+    - As leituras amostradas são agrupadas por usuário, entidade e descrição em
+      janelas de READ_AUDIT_COALESCE_SECONDS e gravadas como uma única linha
+      ("N vezes entre t1 e t2"), sem commit na requisição.
+
+    As janelas ficam em memória por processo e são gravadas quando expiram
+    (verificado a cada leitura e por uma thread de varredura do próprio
+    processo, para que não fiquem retidas em períodos sem leituras), ao
+    atingir READ_AUDIT_MAX_PENDING ou na finalização do processo.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._next_sweep = None
+        self._sweeper = None
+        self._sweeper_pid = None
+        self._stop_event = threading.Event()
+        self.immediate_count = 0
+        self.sampled_out_count = 0
+        self.coalesced_count = 0
+        self.written_count = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configura a política a partir das configurações da aplicação"""
+        self.app = app
+        self.coalesce_seconds = app.config.get("READ_AUDIT_COALESCE_SECONDS", 300)
+        self.sample_rate = app.config.get("READ_AUDIT_SAMPLE_RATE", 1.0)
+        self.sample_rates = dict(app.config.get("READ_AUDIT_SAMPLE_RATES") or {})
+        self.sensitive_entities = set(app.config.get("READ_AUDIT_SENSITIVE_ENTITIES") or ())
+        self.max_pending = app.config.get("READ_AUDIT_MAX_PENDING", 10000)
+        app.extensions["read_audit_policy"] = self
+        # Grava as janelas abertas quando o processo terminar
+        atexit.register(self.stop)
+
+    def record(self, entity_type, description, entity_id=None, user_id=None,
+               ip_address=None, user_agent=None, additional_data=None):
+        """
+        Registra uma leitura conforme a política
+
+        Returns:
+            str: "immediate", "sampled_out" ou "coalesced"
+        """
+        entity_type = getattr(entity_type, "value", entity_type)
+
+        if self.app is None or entity_type in self.sensitive_entities:
+            AuditService.log_action(
+                ActionTypeEnum.READ,
+                entity_type,
+                description,
+                entity_id=entity_id,
+                user_id=user_id,
+                additional_data=additional_data
+            )
+            self._increment("immediate_count")
+            return "immediate"
+
+        sample_rate = self.sample_rates.get(entity_type, self.sample_rate)
+        if not _in_sample(sample_rate, user_id, entity_type, entity_id):
+            self._increment("sampled_out_count")
+            return "sampled_out"
+
+        now = datetime.datetime.utcnow()
+        record = {
+            "action_type": ActionTypeEnum.READ.value,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "description": description,
+            "user_id": user_id,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "additional_data": additional_data,
+            "sample_rate": sample_rate
+        }
+
+        if not self.coalesce_seconds:
+            self._write([_finalize(PendingRead(record, now))])
+            return "coalesced"
+
+        key = (user_id, entity_type, entity_id, description)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = PendingRead(record, now)
+            else:
+                pending.count += 1
+                pending.last_at = now
+            self.coalesced_count += 1
+            should_flush = len(self._pending) >= self.max_pending
+            should_sweep = self._next_sweep is None or now >= self._next_sweep
+
+        self._ensure_sweeper()
+        if should_flush:
+            self.flush()
+        elif should_sweep:
+            self.flush(expired_only=True, now=now)
+        return "coalesced"
+
+    def flush(self, expired_only=False, now=None):
+        """
+        Grava as janelas de leitura pendentes
+
+        Args:
+            expired_only (bool): Grava apenas as janelas que já expiraram
+            now (datetime, optional): Instante de referência (UTC)
+
+        Returns:
+            int: Quantidade de linhas gravadas
+        """
+        now = now or datetime.datetime.utcnow()
+        window = datetime.timedelta(seconds=self.coalesce_seconds or 0)
+        with self._lock:
+            if expired_only:
+                keys = [key for key, pending in self._pending.items() if now - pending.first_at >= window]
+            else:
+                keys = list(self._pending)
+            ready = [self._pending.pop(key) for key in keys]
+            # Próxima verificação em até um segundo
+            self._next_sweep = now + min(window, datetime.timedelta(seconds=1))
+
+        if not ready:
+            return 0
+        return self._write([_finalize(pending) for pending in ready])
+
+    def stop(self):
+        """Interrompe a thread de varredura e grava todas as janelas pendentes"""
+        self._stop_event.set()
+        self.flush()
+
+    def stats(self):
+        """Retorna contadores da política de leitura"""
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending_windows": pending,
+            "immediate": self.immediate_count,
+            "sampled_out": self.sampled_out_count,
+            "coalesced": self.coalesced_count,
+            "written": self.written_count
+        }
+
+    # --- Internos ---
+
+    def _ensure_sweeper(self):
+        # A verificação de PID cobre servidores que fazem fork após o create_app (ex: Gunicorn)
+        if self._sweeper is not None and self._sweeper.is_alive() and self._sweeper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive() and self._sweeper_pid == os.getpid():
+                return
+            self._stop_event.clear()
+            self._sweeper_pid = os.getpid()
+            self._sweeper = threading.Thread(target=self._sweep, name="read-audit-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep(self):
+        """Grava as janelas expiradas mesmo sem novas leituras"""
+        interval = max(1, min(self.coalesce_seconds, 60))
+        while not self._stop_event.wait(interval):
+            self.flush(expired_only=True)
+
+    def _write(self, records):
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    AuditService.log_records(records)
+            else:
+                AuditService.log_records(records)
+            self._increment("written_count", len(records))
+            return len(records)
+        except Exception as e:
+            print(f"Erro ao gravar leituras agrupadas de auditoria ({len(records)} registros): {str(e)}")
+            return 0
+
+    def _increment(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+def _in_sample(sample_rate, user_id, entity_type, entity_id):
+    """Amostragem determinística: o hash de usuário/entidade decide se a leitura entra"""
+    if sample_rate >= 1:
+        return True
+    if sample_rate <= 0:
+        return False
+    digest = hashlib.blake2b(f"{user_id}:{entity_type}:{entity_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 < sample_rate
+
+def _finalize(pending):
+    """Monta o registro de AuditLog de uma janela de leituras"""
+    record = dict(pending.record)
+    sample_rate = record.pop("sample_rate")
+    record["timestamp"] = pending.last_at
+    if pending.count > 1:
+        record["description"] = (
+            f"{record['description']} ({pending.count} vezes entre "
+            f"{pending.first_at.strftime('%d/%m/%Y %H:%M:%S')} e {pending.last_at.strftime('%d/%m/%Y %H:%M:%S')})"
+        )
+    if pending.count > 1 or sample_rate < 1:
+        record["additional_data"] = {
+            "params": record["additional_data"],
+            "count": pending.count,
+            "first_at": pending.first_at.isoformat(),
+            "last_at": pending.last_at.isoformat(),
+            "sample_rate": sample_rate
+        }
+    return record
+
+# Instância única por processo
+read_audit_policy = ReadAuditPolicy()
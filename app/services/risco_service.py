@@ -6,9 +6,13 @@ from ..models.plano_tratamento import PlanoTratamento, StatusPlanoTratamentoEnum
 from ..models.user import User
 from ..services.audit_service import AuditService
 from ..models.audit_log import ActionTypeEnum, EntityTypeEnum
-from flask import g # Para obter o usuário logado para auditoria
+from ..utils.cache import TTLCache
+from flask import g, current_app # g: usuário logado para auditoria
 import datetime
 
+# Mapas de calor pré-agregados, invalidados quando riscos ou avaliações mudam
+_heatmap_cache = TTLCache(ttl=300)
+
 class RiscoService:
 
     @staticmethod
@@ -78,6 +82,7 @@ class RiscoService:
                 pass # Ignora status inválido
         
         db.session.commit()
+        RiscoService.invalidate_heatmap_cache()
         
         AuditService.log_action(
             ActionTypeEnum.UPDATE,
@@ -100,6 +105,7 @@ class RiscoService:
         
         db.session.delete(risco)
         db.session.commit()
+        RiscoService.invalidate_heatmap_cache()
         
         AuditService.log_action(
             ActionTypeEnum.DELETE,
@@ -141,11 +147,15 @@ class RiscoService:
         
         db.session.add(avaliacao)
         
+        # A nova avaliação passa a ser a mais recente do risco
+        risco.ultima_avaliacao_registro = avaliacao
+        
         # Atualiza status do risco para AVALIADO se ainda não estiver
         if risco.status == StatusRiscoEnum.IDENTIFICADO or risco.status == StatusRiscoEnum.ANALISADO:
              risco.status = StatusRiscoEnum.AVALIADO
              
         db.session.commit()
+        RiscoService.invalidate_heatmap_cache()
         
         AuditService.log_action(
             ActionTypeEnum.CREATE,
@@ -269,21 +279,32 @@ class RiscoService:
         riscos_por_status = db.session.query(Risco.status, db.func.count(Risco.id)).group_by(Risco.status).all()
         
         # Dados para Matriz de Risco (usando a última avaliação de cada risco)
-        matriz_data = []
-        riscos_ativos = Risco.query.filter(Risco.status != StatusRiscoEnum.FECHADO).all()
-        for risco in riscos_ativos:
-            avaliacao = risco.ultima_avaliacao
-            if avaliacao:
-                matriz_data.append({
-                    "id": risco.id,
-                    "nome": risco.nome,
-                    "probabilidade": avaliacao.probabilidade,
-                    "impacto": avaliacao.impacto,
-                    "nivel_inerente": avaliacao.nivel_risco_inerente,
-                    "probabilidade_residual": avaliacao.probabilidade_residual,
-                    "impacto_residual": avaliacao.impacto_residual,
-                    "nivel_residual": avaliacao.nivel_risco_residual
-                })
+        # Uma única consulta, pelo ponteiro ultima_avaliacao_id
+        riscos_avaliados = db.session.query(
+            Risco.id,
+            Risco.nome,
+            AvaliacaoRisco.probabilidade,
+            AvaliacaoRisco.impacto,
+            AvaliacaoRisco.nivel_risco_inerente,
+            AvaliacaoRisco.probabilidade_residual,
+            AvaliacaoRisco.impacto_residual,
+            AvaliacaoRisco.nivel_risco_residual
+        ).join(
+            AvaliacaoRisco, Risco.ultima_avaliacao_id == AvaliacaoRisco.id
+        ).filter(
+            Risco.status != StatusRiscoEnum.FECHADO
+        ).order_by(Risco.id).all()
+        
+        matriz_data = [{
+            "id": row.id,
+            "nome": row.nome,
+            "probabilidade": row.probabilidade,
+            "impacto": row.impacto,
+            "nivel_inerente": row.nivel_risco_inerente,
+            "probabilidade_residual": row.probabilidade_residual,
+            "impacto_residual": row.impacto_residual,
+            "nivel_residual": row.nivel_risco_residual
+        } for row in riscos_avaliados]
                 
         return {
             "total_riscos": total_riscos,
@@ -291,3 +312,85 @@ class RiscoService:
             "matriz_data": matriz_data
         }
 
+    @staticmethod
+    def get_heatmap_data(escala=5, top_k=5):
+        """
+        Retorna os mapas de calor inerente e residual pré-agregados por célula
+        (probabilidade x impacto), com a contagem de riscos e os IDs dos top_k
+        riscos de maior nível em cada célula. Usa a última avaliação de cada
+        risco não fechado; valores fora da escala são ignorados.
+        """
+        cache_key = (escala, top_k)
+        cached = _heatmap_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        # Lida antes da consulta: uma invalidação durante o cálculo descarta o resultado
+        version = _heatmap_cache.version(cache_key)
+
+        # Sem avaliação residual, o residual é igual ao inerente (ver AvaliacaoRisco.calcular_niveis_risco)
+        heatmap = {
+            "escala": escala,
+            "top_k": top_k,
+            "inerente": RiscoService._build_heatmap(
+                AvaliacaoRisco.probabilidade,
+                AvaliacaoRisco.impacto,
+                AvaliacaoRisco.nivel_risco_inerente,
+                escala, top_k
+            ),
+            "residual": RiscoService._build_heatmap(
+                db.func.coalesce(AvaliacaoRisco.probabilidade_residual, AvaliacaoRisco.probabilidade),
+                db.func.coalesce(AvaliacaoRisco.impacto_residual, AvaliacaoRisco.impacto),
+                AvaliacaoRisco.nivel_risco_residual,
+                escala, top_k
+            )
+        }
+
+        _heatmap_cache.set_if_version(
+            cache_key, heatmap, version, ttl=current_app.config.get("RISK_HEATMAP_CACHE_TTL", 300)
+        )
+        return heatmap
+
+    @staticmethod
+    def _build_heatmap(probabilidade, impacto, nivel, escala, top_k):
+        """Agrega um mapa de calor em uma única consulta com funções de janela"""
+        celula = (probabilidade, impacto)
+        ranked = db.session.query(
+            Risco.id.label("risco_id"),
+            probabilidade.label("probabilidade"),
+            impacto.label("impacto"),
+            db.func.count(Risco.id).over(partition_by=celula).label("total"),
+            db.func.row_number().over(partition_by=celula, order_by=(nivel.desc(), Risco.id)).label("posicao")
+        ).join(
+            AvaliacaoRisco, Risco.ultima_avaliacao_id == AvaliacaoRisco.id
+        ).filter(
+            Risco.status != StatusRiscoEnum.FECHADO,
+            probabilidade.between(1, escala),
+            impacto.between(1, escala)
+        ).subquery()
+
+        rows = db.session.query(
+            ranked.c.probabilidade, ranked.c.impacto, ranked.c.total, ranked.c.risco_id
+        ).filter(
+            ranked.c.posicao <= top_k
+        ).order_by(
+            ranked.c.probabilidade, ranked.c.impacto, ranked.c.posicao
+        ).all()
+
+        cells = {}
+        for row in rows:
+            cell = cells.setdefault((row.probabilidade, row.impacto), {
+                "probabilidade": row.probabilidade,
+                "impacto": row.impacto,
+                "count": row.total,
+                "risco_ids": []
+            })
+            cell["risco_ids"].append(row.risco_id)
+
+        return {
+            "total": sum(cell["count"] for cell in cells.values()),
+            "cells": list(cells.values())
+        }
+
+    @staticmethod
+    def invalidate_heatmap_cache():
+        _heatmap_cache.clear()
@@ -0,0 +1,371 @@
+# app/services/scheduler.py
+from ..extensions import db
+from ..models.scheduled_job import ScheduledJob
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+import atexit
+import click
+import datetime
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+# Linha de scheduled_jobs usada como lease do líder (bancos sem advisory lock)
+LEADER_LEASE_NAME = "__leader__"
+
+class Job:
+    """Job registrado no agendador: func(last_run) é chamada a cada interval segundos"""
+
+    def __init__(self, name, func, interval):
+        self.name = name
+        self.func = func
+        self.interval = interval
+
+class JobScheduler:
+    """
+    Agendador de jobs periódicos com eleição de líder.
+
+    Apenas uma instância executa os jobs por vez: no PostgreSQL o líder mantém um
+    advisory lock de sessão (pg_try_advisory_lock) em uma conexão dedicada; nos
+    demais bancos é usado um lease com expiração em scheduled_jobs. O estado de
+    cada job (watermark da última execução bem-sucedida e métricas de duração)
+    fica persistido em scheduled_jobs.
+
+    Pode rodar dentro do processo web (SCHEDULER_AUTOSTART) ou via CLI
+    (flask scheduler run).
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.jobs = {}
+        self.enabled = False
+        self._token = uuid.uuid4().hex[:8]
+        self._leader_connection = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._run_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configura o agendador, registra os jobs padrão e o comando de CLI"""
+        self.app = app
+        self.enabled = app.config.get("SCHEDULER_ENABLED", False)
+        self.tick_interval = app.config.get("SCHEDULER_TICK_SECONDS", 30)
+        self.lock_key = app.config.get("SCHEDULER_LOCK_KEY", 724001)
+        self.lease_seconds = app.config.get("SCHEDULER_LEASE_SECONDS", 300)
+        app.extensions["scheduler"] = self
+        app.cli.add_command(scheduler_cli)
+
+        register_default_jobs(self, app)
+
+        if self.enabled and app.config.get("SCHEDULER_AUTOSTART", False):
+            self.start()
+
+    @property
+    def owner_id(self):
+        # Inclui o PID para distinguir processos filhos após fork (ex: Gunicorn)
+        return f"{socket.gethostname()}:{os.getpid()}:{self._token}"
+
+    def add_job(self, name, func, interval):
+        """Registra um job; func recebe last_run (datetime da última execução bem-sucedida ou None)"""
+        self.jobs[name] = Job(name, func, interval)
+
+    def start(self):
+        """Inicia o laço do agendador em uma thread em segundo plano"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="job-scheduler", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=10):
+        """Interrompe o laço e libera a liderança"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        if self.app is not None:
+            with self.app.app_context():
+                self._release_leadership()
+
+    def run_forever(self):
+        """Executa tick() a cada SCHEDULER_TICK_SECONDS até stop()"""
+        while not self._stop_event.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Erro no agendador de jobs: {str(e)}")
+            self._stop_event.wait(self.tick_interval)
+
+    def tick(self):
+        """
+        Executa os jobs vencidos se esta instância for o líder
+
+        Returns:
+            list: Nomes dos jobs executados
+        """
+        executed = []
+        with self.app.app_context():
+            for job in list(self.jobs.values()):
+                # A liderança é renovada antes de cada job para não expirar o lease durante o tick
+                if not self._acquire_leadership():
+                    break
+                if self._is_due(job):
+                    self.run_job(job.name)
+                    executed.append(job.name)
+        return executed
+
+    def run_job(self, name):
+        """
+        Executa um job imediatamente e persiste watermark e métricas
+
+        Returns:
+            dict: Status, duração e resultado da execução
+        """
+        job = self.jobs[name]
+        with self._run_lock:
+            state = db.session.get(ScheduledJob, name)
+            if state is None:
+                state = ScheduledJob(name)
+                db.session.add(state)
+            started_at = datetime.datetime.utcnow()
+            last_run = state.last_success_at
+            state.last_started_at = started_at
+            db.session.commit()
+
+            start = time.perf_counter()
+            result = None
+            error = None
+            try:
+                result = job.func(last_run)
+            except Exception as e:
+                db.session.rollback()
+                error = str(e)
+                print(f"Erro ao executar o job {name}: {error}")
+            duration_ms = (time.perf_counter() - start) * 1000
+
+            state = db.session.get(ScheduledJob, name)
+            state.last_finished_at = datetime.datetime.utcnow()
+            state.last_duration_ms = duration_ms
+            state.max_duration_ms = max(state.max_duration_ms or 0, duration_ms)
+            state.total_duration_ms = (state.total_duration_ms or 0) + duration_ms
+            state.run_count = (state.run_count or 0) + 1
+            if error is None:
+                state.last_status = "success"
+                state.last_error = None
+                state.last_success_at = started_at
+                state.last_result = json.dumps(result, default=str)
+            else:
+                state.last_status = "error"
+                state.last_error = error
+                state.failure_count = (state.failure_count or 0) + 1
+            db.session.commit()
+
+        return {"job": name, "status": state.last_status, "duration_ms": duration_ms, "result": result, "error": error}
+
+    def metrics(self):
+        """Retorna o estado persistido e as métricas de duração de cada job"""
+        states = {
+            state.name: state for state in ScheduledJob.query.filter(ScheduledJob.name != LEADER_LEASE_NAME)
+        }
+        jobs = []
+        for name, job in self.jobs.items():
+            data = states[name].to_dict() if name in states else ScheduledJob(name).to_dict()
+            data["interval_seconds"] = job.interval
+            jobs.append(data)
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "owner_id": self.owner_id,
+            "jobs": jobs
+        }
+
+    # --- Internos ---
+
+    def _is_due(self, job):
+        state = db.session.get(ScheduledJob, job.name)
+        if state is None or state.last_started_at is None:
+            return True
+        return datetime.datetime.utcnow() - state.last_started_at >= datetime.timedelta(seconds=job.interval)
+
+    def _acquire_leadership(self):
+        if db.engine.dialect.name == "postgresql":
+            return self._acquire_advisory_lock()
+        return self._acquire_lease()
+
+    def _acquire_advisory_lock(self):
+        if self._leader_connection is not None:
+            try:
+                self._leader_connection.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                # Conexão perdida: o lock de sessão foi liberado pelo servidor
+                self._close_leader_connection()
+
+        connection = db.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+        except Exception as e:
+            print(f"Erro ao obter advisory lock do agendador: {str(e)}")
+            acquired = False
+        if acquired:
+            self._leader_connection = connection
+            return True
+        connection.close()
+        return False
+
+    def _acquire_lease(self):
+        now = datetime.datetime.utcnow()
+        expires_at = now + datetime.timedelta(seconds=self.lease_seconds)
+        updated = ScheduledJob.query.filter(
+            ScheduledJob.name == LEADER_LEASE_NAME,
+            db.or_(
+                ScheduledJob.lease_owner == self.owner_id,
+                ScheduledJob.lease_owner.is_(None),
+                ScheduledJob.lease_expires_at < now
+            )
+        ).update({"lease_owner": self.owner_id, "lease_expires_at": expires_at}, synchronize_session=False)
+        db.session.commit()
+        if updated:
+            return True
+
+        if db.session.get(ScheduledJob, LEADER_LEASE_NAME) is not None:
+            return False
+
+        lease = ScheduledJob(LEADER_LEASE_NAME)
+        lease.lease_owner = self.owner_id
+        lease.lease_expires_at = expires_at
+        db.session.add(lease)
+        try:
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Outra instância criou o lease ao mesmo tempo
+            db.session.rollback()
+            return False
+
+    def _release_leadership(self):
+        if self._leader_connection is not None:
+            try:
+                self._leader_connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key}
+                )
+            except Exception:
+                pass
+            self._close_leader_connection()
+            return
+
+        try:
+            ScheduledJob.query.filter_by(
+                name=LEADER_LEASE_NAME, lease_owner=self.owner_id
+            ).update({"lease_owner": None, "lease_expires_at": None}, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Erro ao liberar o lease do agendador: {str(e)}")
+
+    def _close_leader_connection(self):
+        try:
+            self._leader_connection.close()
+        except Exception:
+            pass
+        self._leader_connection = None
+
+def register_default_jobs(scheduler, app):
+    """Registra as varreduras de prazos, a retenção de notificações e a manutenção da auditoria e dos documentos"""
+    from .notification_service import NotificationService
+    from .treinamento_service import TreinamentoService
+    from .audit_rollup_service import AuditRollupService
+    from .audit_archive_service import AuditArchiveService
+    from .audit_chain import AuditChain
+    from .document_blob_store import DocumentBlobStore
+    from .document_render_service import document_renderer
+
+    scheduler.add_job(
+        "checklist_deadlines",
+        lambda last_run: NotificationService.scan_deadlines(),
+        app.config.get("SCHEDULER_CHECKLIST_DEADLINES_INTERVAL", 3600)
+    )
+    scheduler.add_job(
+        "training_deadlines",
+        lambda last_run: TreinamentoService.scan_training_deadlines(),
+        app.config.get("SCHEDULER_TRAINING_DEADLINES_INTERVAL", 3600)
+    )
+    scheduler.add_job(
+        "notification_retention",
+        lambda last_run: {"purged": NotificationService.purge_archived_notifications()},
+        app.config.get("SCHEDULER_NOTIFICATION_RETENTION_INTERVAL", 86400)
+    )
+    scheduler.add_job(
+        "audit_rollup",
+        lambda last_run: AuditRollupService.compact(),
+        app.config.get("SCHEDULER_AUDIT_ROLLUP_INTERVAL", 900)
+    )
+    scheduler.add_job(
+        "audit_partitions",
+        lambda last_run: {"created": AuditArchiveService.ensure_partitions()},
+        app.config.get("SCHEDULER_AUDIT_PARTITIONS_INTERVAL", 86400)
+    )
+    scheduler.add_job(
+        "audit_checkpoint",
+        lambda last_run: _checkpoint_summary(AuditChain.create_checkpoint()),
+        app.config.get("SCHEDULER_AUDIT_CHECKPOINT_INTERVAL", 3600)
+    )
+    scheduler.add_job(
+        "document_render_expiry",
+        lambda last_run: {"expired": document_renderer.expire_stale_jobs()},
+        app.config.get("SCHEDULER_DOCUMENT_RENDER_EXPIRY_INTERVAL", 300)
+    )
+    scheduler.add_job(
+        "document_blob_eviction",
+        lambda last_run: DocumentBlobStore.evict(),
+        app.config.get("SCHEDULER_DOCUMENT_BLOB_EVICTION_INTERVAL", 86400)
+    )
+
+def _checkpoint_summary(result):
+    """Resumo do checkpoint para o last_result do job; cadeia quebrada vira erro do job"""
+    if not result["valid"]:
+        raise RuntimeError(f"Cadeia de auditoria quebrada: {result['error_count']} divergências, primeira no log #{result['errors'][0]['id']}")
+    return {"checked": result["checked"], "checkpoint": result["checkpoint"]}
+
+# Comandos de CLI: flask scheduler run | run-job <nome> | status
+scheduler_cli = AppGroup("scheduler", help="Agendador de jobs em segundo plano")
+
+@scheduler_cli.command("run")
+def run_scheduler_command():
+    """Executa o agendador em primeiro plano (um processo dedicado)"""
+    scheduler = current_app.extensions["scheduler"]
+    click.echo(f"Agendador iniciado ({scheduler.owner_id}) com jobs: {', '.join(scheduler.jobs)}")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+
+@scheduler_cli.command("run-job")
+@click.argument("name")
+def run_job_command(name):
+    """Executa um job imediatamente, sem eleição de líder"""
+    scheduler = current_app.extensions["scheduler"]
+    if name not in scheduler.jobs:
+        raise click.BadParameter(f"Job desconhecido: {name}")
+    click.echo(json.dumps(scheduler.run_job(name), default=str, indent=2))
+
+@scheduler_cli.command("status")
+def scheduler_status_command():
+    """Mostra watermarks e métricas de duração dos jobs"""
+    click.echo(json.dumps(current_app.extensions["scheduler"].metrics(), default=str, indent=2))
+
+# Instância única, inicializada em create_app()
+scheduler = JobScheduler()
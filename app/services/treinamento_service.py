@@ -3,34 +3,45 @@ from ..extensions import db
 from ..models.treinamento import Treinamento
 from ..models.status_usuario_treinamento import StatusUsuarioTreinamento, StatusTreinamentoEnum
 from ..models.user import User
+from ..models.notification import Notification, NotificationTypeEnum, NotificationPriorityEnum, NotificationStatusEnum
 from ..services.notification_service import NotificationService # Para lembretes (opcional)
 from ..services.audit_service import AuditService # Para logs
 from ..models.audit_log import ActionTypeEnum, EntityTypeEnum
-from flask import g
+from ..utils.db_utils import chunked, upsert_statement
+from flask import g, current_app
+from sqlalchemy.orm import joinedload
 import datetime
 
+# Dias antes do prazo em que o lembrete de treinamento é enviado
+TRAINING_REMINDER_DAYS = (1, 3, 7)
+
 class TreinamentoService:
     @staticmethod
     def get_all_treinamentos(user_id, filters=None):
         """Retorna todos os treinamentos ativos, com status do usuário"""
-        query = Treinamento.query.filter_by(ativo=True)
+        # LEFT OUTER JOIN com o status do usuário e criador carregado no mesmo SELECT
+        query = db.session.query(
+            Treinamento, StatusUsuarioTreinamento
+        ).outerjoin(
+            StatusUsuarioTreinamento,
+            db.and_(
+                StatusUsuarioTreinamento.treinamento_id == Treinamento.id,
+                StatusUsuarioTreinamento.usuario_id == user_id
+            )
+        ).options(
+            joinedload(Treinamento.criado_por)
+        ).filter(Treinamento.ativo.is_(True))
         
         if filters:
             if filters.get("categoria"):
                 query = query.filter(Treinamento.categoria == filters["categoria"])
         
-        treinamentos = query.order_by(Treinamento.data_criacao.desc()).all()
+        resultados = query.order_by(Treinamento.data_criacao.desc()).all()
         
-        # Adiciona o status do usuário logado a cada treinamento
-        treinamentos_com_status = []
-        for treinamento in treinamentos:
-            status_usuario = StatusUsuarioTreinamento.query.filter_by(
-                usuario_id=user_id,
-                treinamento_id=treinamento.id
-            ).first()
-            treinamentos_com_status.append(treinamento.to_dict(include_status=True, user_status=status_usuario))
-            
-        return treinamentos_com_status
+        return [
+            treinamento.to_dict(include_status=True, user_status=status_usuario)
+            for treinamento, status_usuario in resultados
+        ]
 
     @staticmethod
     def get_treinamento_by_id(treinamento_id, user_id):
@@ -179,9 +190,35 @@ class TreinamentoService:
         status_list = StatusUsuarioTreinamento.query.filter_by(treinamento_id=treinamento_id).all()
         return [status.to_dict() for status in status_list]
 
+    @staticmethod
+    def normalize_user_ids(user_ids):
+        """Converte os IDs para int (aceita "1") e remove repetidos, mantendo a ordem
+        
+        Raises:
+            ValueError: Se algum elemento não for um ID inteiro
+        """
+        normalized = []
+        for user_id in user_ids:
+            if isinstance(user_id, bool) or not isinstance(user_id, (int, str)):
+                raise ValueError(f"ID de usuário inválido: {user_id!r}")
+            try:
+                normalized.append(int(user_id))
+            except ValueError:
+                raise ValueError(f"ID de usuário inválido: {user_id!r}")
+        return list(dict.fromkeys(normalized))
+
     @staticmethod
     def assign_treinamento(treinamento_id, user_ids, admin_user_id, prazo_conclusao=None):
-        """Atribui um treinamento a uma lista de usuários (admin)"""
+        """Atribui um treinamento a uma lista de usuários (admin)
+        
+        Processa os IDs em blocos de BULK_ASSIGN_CHUNK_SIZE: valida os usuários com
+        um único IN, busca as atribuições existentes com outra consulta e grava
+        tudo com INSERT ... ON CONFLICT (usuario_id, treinamento_id).
+        
+        Raises:
+            ValueError: Se algum elemento de user_ids não for um ID inteiro
+        """
+        user_ids = TreinamentoService.normalize_user_ids(user_ids)
         treinamento = Treinamento.query.get_or_404(treinamento_id)
         assigned_count = 0
         already_assigned = []
@@ -193,33 +230,26 @@ class TreinamentoService:
             except ValueError:
                 prazo_conclusao = None # Ignora prazo inválido
 
-        for user_id in user_ids:
-            user = User.query.get(user_id)
-            if not user:
-                users_not_found.append(user_id)
-                continue
+        chunk_size = current_app.config.get("BULK_ASSIGN_CHUNK_SIZE", 1000)
+        for chunk in chunked(user_ids, chunk_size):
+            valid_ids = {
+                user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(chunk))
+            }
+            existing_ids = {
+                user_id for (user_id,) in db.session.query(StatusUsuarioTreinamento.usuario_id).filter(
+                    StatusUsuarioTreinamento.treinamento_id == treinamento_id,
+                    StatusUsuarioTreinamento.usuario_id.in_(valid_ids)
+                )
+            } if valid_ids else set()
             
-            # Verifica se já existe uma atribuição
-            existing_status = StatusUsuarioTreinamento.query.filter_by(
-                usuario_id=user_id,
-                treinamento_id=treinamento_id
-            ).first()
+            for user_id in chunk:
+                if user_id not in valid_ids:
+                    users_not_found.append(user_id)
+                elif user_id in existing_ids:
+                    already_assigned.append(user_id)
             
-            if existing_status:
-                # Atualiza o prazo se necessário
-                if prazo_conclusao and existing_status.prazo_conclusao != prazo_conclusao:
-                    existing_status.prazo_conclusao = prazo_conclusao
-                    db.session.commit()
-                already_assigned.append(user_id)
-            else:
-                # Cria nova atribuição
-                new_status = StatusUsuarioTreinamento(
-                    usuario_id=user_id,
-                    treinamento_id=treinamento_id,
-                    prazo_conclusao=prazo_conclusao
-                )
-                db.session.add(new_status)
-                assigned_count += 1
+            TreinamentoService._upsert_assignments(treinamento_id, valid_ids, existing_ids, prazo_conclusao)
+            assigned_count += len(valid_ids - existing_ids)
         
         db.session.commit()
         
@@ -239,31 +269,214 @@ class TreinamentoService:
             "users_not_found": users_not_found
         }
     
+    @staticmethod
+    def assign_treinamento_by_selector(treinamento_id, selector, admin_user_id, prazo_conclusao=None):
+        """Atribui um treinamento aos usuários que atendem a um seletor (admin)
+        
+        O seletor é resolvido no banco com INSERT ... SELECT, sem carregar IDs na aplicação.
+        Chaves aceitas: "company_name" (str), "is_admin" (bool) e "all" (true para todos).
+        
+        Raises:
+            ValueError: Se o seletor for vazio ou tiver chaves/valores inválidos
+        """
+        Treinamento.query.get_or_404(treinamento_id)
+        conditions = TreinamentoService._selector_conditions(selector)
+        
+        if prazo_conclusao:
+            try:
+                prazo_conclusao = datetime.datetime.fromisoformat(prazo_conclusao)
+            except ValueError:
+                prazo_conclusao = None # Ignora prazo inválido
+        
+        matched_count = db.session.query(db.func.count(User.id)).filter(*conditions).scalar()
+        
+        already_assigned = db.exists().where(
+            StatusUsuarioTreinamento.usuario_id == User.id,
+            StatusUsuarioTreinamento.treinamento_id == treinamento_id
+        )
+        source = db.select(
+            User.id,
+            db.literal(treinamento_id, db.Integer),
+            db.literal(StatusTreinamentoEnum.NAO_INICIADO.value, db.String),
+            db.literal(prazo_conclusao, db.DateTime),
+            db.literal(datetime.datetime.utcnow(), db.DateTime)
+        ).where(*conditions, ~already_assigned)
+        
+        # ON CONFLICT DO NOTHING protege contra atribuições concorrentes quando suportado
+        statement = upsert_statement(
+            StatusUsuarioTreinamento.__table__, index_elements=["usuario_id", "treinamento_id"]
+        )
+        if statement is None:
+            statement = StatusUsuarioTreinamento.__table__.insert()
+        statement = statement.from_select(
+            ["usuario_id", "treinamento_id", "status", "prazo_conclusao", "data_atribuicao"], source
+        )
+        assigned_count = db.session.execute(statement).rowcount
+        
+        updated_count = 0
+        if prazo_conclusao:
+            selected_users = db.select(User.id).where(*conditions)
+            updated_count = StatusUsuarioTreinamento.query.filter(
+                StatusUsuarioTreinamento.treinamento_id == treinamento_id,
+                StatusUsuarioTreinamento.usuario_id.in_(selected_users),
+                db.or_(
+                    StatusUsuarioTreinamento.prazo_conclusao.is_(None),
+                    StatusUsuarioTreinamento.prazo_conclusao != prazo_conclusao
+                )
+            ).update({"prazo_conclusao": prazo_conclusao}, synchronize_session=False)
+        
+        db.session.commit()
+        
+        AuditService.log_action(
+            ActionTypeEnum.UPDATE,
+            EntityTypeEnum.TREINAMENTO,
+            f"Admin {g.user.username} atribuiu o treinamento #{treinamento_id} a {assigned_count} usuários por seletor",
+            entity_id=treinamento_id,
+            user_id=admin_user_id,
+            additional_data={"selector": selector, "prazo": prazo_conclusao.isoformat() if prazo_conclusao else None}
+        )
+        
+        return {
+            "matched_count": matched_count,
+            "assigned_count": assigned_count,
+            "already_assigned_count": max(matched_count - assigned_count, 0),
+            "prazo_updated_count": updated_count
+        }
+    
+    @staticmethod
+    def _selector_conditions(selector):
+        """Converte um seletor de usuários em condições SQL sobre User"""
+        if not isinstance(selector, dict) or not selector:
+            raise ValueError("Seletor de usuários inválido")
+        
+        unknown_keys = set(selector) - {"company_name", "is_admin", "all"}
+        if unknown_keys:
+            raise ValueError(f"Chaves de seletor não suportadas: {', '.join(sorted(unknown_keys))}")
+        
+        conditions = []
+        if "company_name" in selector:
+            company_name = selector["company_name"]
+            if not isinstance(company_name, str) or not company_name.strip():
+                raise ValueError("company_name deve ser um texto não vazio")
+            conditions.append(User.company_name == company_name.strip())
+        if "is_admin" in selector:
+            if not isinstance(selector["is_admin"], bool):
+                raise ValueError("is_admin deve ser booleano")
+            conditions.append(User.is_admin.is_(True) if selector["is_admin"] else db.or_(User.is_admin.is_(False), User.is_admin.is_(None)))
+        
+        if not conditions and selector.get("all") is not True:
+            raise ValueError("Informe ao menos um critério ou \"all\": true")
+        if not conditions:
+            conditions.append(db.true())
+        return conditions
+    
+    @staticmethod
+    def _upsert_assignments(treinamento_id, valid_ids, existing_ids, prazo_conclusao=None):
+        """Cria as atribuições que faltam e atualiza o prazo das existentes (se informado)"""
+        if not valid_ids:
+            return
+        
+        now = datetime.datetime.utcnow()
+        update_columns = ["prazo_conclusao"] if prazo_conclusao else None
+        statement = upsert_statement(
+            StatusUsuarioTreinamento.__table__,
+            index_elements=["usuario_id", "treinamento_id"],
+            update_columns=update_columns
+        )
+        
+        if statement is not None:
+            # Com prazo, todas as linhas vão para o upsert; sem prazo, só as novas
+            target_ids = valid_ids if prazo_conclusao else valid_ids - existing_ids
+            rows = [{
+                "usuario_id": user_id,
+                "treinamento_id": treinamento_id,
+                "status": StatusTreinamentoEnum.NAO_INICIADO.value,
+                "prazo_conclusao": prazo_conclusao,
+                "data_atribuicao": now
+            } for user_id in target_ids]
+            if rows:
+                db.session.execute(statement, rows)
+            return
+        
+        # Dialetos sem ON CONFLICT: INSERT em lote das novas e UPDATE único das existentes
+        new_ids = valid_ids - existing_ids
+        if new_ids:
+            db.session.execute(StatusUsuarioTreinamento.__table__.insert(), [{
+                "usuario_id": user_id,
+                "treinamento_id": treinamento_id,
+                "status": StatusTreinamentoEnum.NAO_INICIADO.value,
+                "prazo_conclusao": prazo_conclusao,
+                "data_atribuicao": now
+            } for user_id in new_ids])
+        if prazo_conclusao and existing_ids:
+            StatusUsuarioTreinamento.query.filter(
+                StatusUsuarioTreinamento.treinamento_id == treinamento_id,
+                StatusUsuarioTreinamento.usuario_id.in_(existing_ids)
+            ).update({"prazo_conclusao": prazo_conclusao}, synchronize_session=False)
+    
     # --- Métodos Opcionais ---
     
     @staticmethod
     def check_training_deadlines():
         """Verifica prazos de treinamento e envia notificações (executar periodicamente)"""
+        return sum(TreinamentoService.scan_training_deadlines().values())
+    
+    @staticmethod
+    def scan_training_deadlines():
+        """
+        Varredura de prazos de treinamento baseada em conjuntos.
+        
+        Seleciona as atribuições não concluídas que vencem em exatamente 1, 3 ou 7 dias,
+        exclui as que já receberam lembrete nas últimas 24h (NOT EXISTS) e grava
+        todas as notificações com um único INSERT.
+        
+        Returns:
+            dict: Notificações criadas por dias restantes ("1", "3" e "7")
+        """
         today = datetime.date.today()
-        upcoming_deadlines = StatusUsuarioTreinamento.query.filter(
-            StatusUsuarioTreinamento.prazo_conclusao.isnot(None),
+        now = datetime.datetime.utcnow()
+        start = datetime.datetime.combine(today, datetime.time.min)
+        horizon = start + datetime.timedelta(days=max(TRAINING_REMINDER_DAYS) + 1)
+        
+        recently_notified = db.exists().where(
+            Notification.user_id == StatusUsuarioTreinamento.usuario_id,
+            Notification.reference_type == "treinamento",
+            Notification.reference_id == StatusUsuarioTreinamento.treinamento_id,
+            Notification.notification_type == NotificationTypeEnum.VENCIMENTO_PROXIMO,
+            Notification.created_at > now - datetime.timedelta(days=1)
+        )
+        upcoming_deadlines = db.session.query(
+            StatusUsuarioTreinamento.usuario_id,
+            StatusUsuarioTreinamento.treinamento_id,
+            StatusUsuarioTreinamento.prazo_conclusao,
+            Treinamento.titulo
+        ).join(Treinamento, StatusUsuarioTreinamento.treinamento_id == Treinamento.id).filter(
+            StatusUsuarioTreinamento.prazo_conclusao >= start,
+            StatusUsuarioTreinamento.prazo_conclusao < horizon,
             StatusUsuarioTreinamento.status != StatusTreinamentoEnum.CONCLUIDO,
-            StatusUsuarioTreinamento.prazo_conclusao >= today
-        ).all()
+            ~recently_notified
+        )
         
-        notifications_sent = 0
-        for status_entry in upcoming_deadlines:
-            days_remaining = (status_entry.prazo_conclusao.date() - today).days
-            
-            # Lógica para enviar notificação (ex: 7 dias, 3 dias, 1 dia antes)
-            if days_remaining in [1, 3, 7]:
-                # Verificar se já enviou notificação recente para este prazo
-                # ... (lógica similar ao NotificationService.check_deadlines)
-                
-                # Enviar notificação
-                # NotificationService.create_notification(...)
-                notifications_sent += 1
-                
-        return notifications_sent
+        counts = {str(days): 0 for days in TRAINING_REMINDER_DAYS}
+        rows = []
+        for entry in upcoming_deadlines:
+            days_remaining = (entry.prazo_conclusao.date() - today).days
+            if days_remaining not in TRAINING_REMINDER_DAYS:
+                continue
+            rows.append({
+                "user_id": entry.usuario_id,
+                "title": f"Treinamento vence em {days_remaining} dia(s)",
+                "message": f"O prazo para concluir o treinamento '{entry.titulo}' termina em {days_remaining} dia(s).",
+                "notification_type": NotificationTypeEnum.VENCIMENTO_PROXIMO.value,
+                "priority": (NotificationPriorityEnum.ALTA if days_remaining == 1 else NotificationPriorityEnum.MEDIA).value,
+                "status": NotificationStatusEnum.NAO_LIDA.value,
+                "created_at": now,
+                "reference_type": "treinamento",
+                "reference_id": entry.treinamento_id
+            })
+            counts[str(days_remaining)] += 1
+        
+        NotificationService.insert_notifications(rows)
+        return counts
 
     # Adicionar métodos para upload/gerenciamento de material se necessário
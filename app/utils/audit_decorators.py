@@ -2,8 +2,8 @@
 from functools import wraps
 from flask import g, request
 from ..services.audit_service import AuditService
+from ..services.read_audit_policy import read_audit_policy
 from ..models.audit_log import ActionTypeEnum, EntityTypeEnum
-import json
 
 def audit_log(action_type, entity_type, description_template):
     """
@@ -49,6 +49,19 @@ def audit_log(action_type, entity_type, description_template):
                 ip_address = request.remote_addr if request else None
                 user_agent = request.user_agent.string if request and request.user_agent else None
                 
+                # Leituras seguem a política de amostragem e agrupamento
+                if action_type == ActionTypeEnum.READ:
+                    read_audit_policy.record(
+                        entity_type,
+                        description,
+                        entity_id=entity_id,
+                        user_id=user_id,
+                        ip_address=ip_address,
+                        user_agent=user_agent,
+                        additional_data=kwargs or None
+                    )
+                    return result
+                
                 # Registrar a ação
                 AuditService.log_action(
                     action_type=action_type,
@@ -56,7 +69,7 @@ def audit_log(action_type, entity_type, description_template):
                     entity_id=entity_id,
                     description=description,
                     user_id=user_id,
-                    additional_data=json.dumps(kwargs) if kwargs else None
+                    additional_data=kwargs or None
                 )
             except Exception as e:
                 # Não deve interromper a execução normal se o logging falhar
@@ -73,7 +86,7 @@ def audit_create(entity_type, description_template):
     return audit_log(ActionTypeEnum.CREATE, entity_type, description_template)
 
 def audit_read(entity_type, description_template):
-    """Decorador para registrar ações de leitura"""
+    """Decorador para registrar ações de leitura (amostradas e agrupadas conforme ReadAuditPolicy)"""
     return audit_log(ActionTypeEnum.READ, entity_type, description_template)
 
 def audit_update(entity_type, description_template):
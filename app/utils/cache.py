@@ -0,0 +1,101 @@
+# app/utils/cache.py
+import threading
+import time
+
+class TTLCache:
+    """
+    Cache simples em memória, por processo, com expiração (TTL) por entrada.
+
+    Usado para resultados agregados caros que podem ser invalidados
+    explicitamente quando os dados de origem mudam. Como cada worker tem o
+    seu próprio cache, o TTL limita o tempo em que um worker pode servir um
+    valor desatualizado após uma alteração feita em outro processo.
+
+    Cada chave tem uma versão, incrementada a cada alteração (set, incr,
+    delete, e clear para todas as chaves, inclusive as que não estão em
+    cache). Quem calcula um valor no banco lê a versão antes da consulta e
+    grava com set_if_version(), descartando o resultado se a chave mudou
+    nesse meio tempo.
+    """
+
+    def __init__(self, ttl=60, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._versions = {}
+        self._generation = 0 # Incrementada por clear(): invalida leituras em andamento de qualquer chave
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def version(self, key):
+        """Versão atual da chave (valor opaco, comparado por set_if_version)"""
+        with self._lock:
+            return (self._generation, self._versions.get(key, 0))
+
+    def set_if_version(self, key, value, version, ttl=None):
+        """Grava o valor apenas se a chave não mudou desde a leitura de version"""
+        with self._lock:
+            if (self._generation, self._versions.get(key, 0)) != version:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def incr(self, key, delta=1):
+        """
+        Ajusta um valor numérico em cache, sem alterar a expiração
+
+        Returns:
+            O novo valor, ou None se a chave não estiver em cache
+        """
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self._data.pop(key, None)
+                return None
+            value = max(entry[0] + delta, 0)
+            self._data[key] = (value, entry[1])
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def _store(self, key, value, ttl):
+        if len(self._data) >= self.maxsize and key not in self._data:
+            self._evict()
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+
+    def _evict(self):
+        # Remove entradas expiradas; se ainda estiver cheio, a que expira primeiro
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in self._data.items() if expires_at < now]:
+            del self._data[key]
+        if len(self._data) >= self.maxsize:
+            del self._data[min(self._data, key=lambda key: self._data[key][1])]
+        # Versões de chaves fora do cache só importam enquanto houver consultas em andamento
+        if len(self._versions) > 2 * self.maxsize:
+            self._versions = {key: self._versions[key] for key in self._data}
+            # Versões descartadas voltariam a 0: invalida as leituras em andamento
+            self._generation += 1
@@ -0,0 +1,51 @@
+# app/utils/db_utils.py
+from ..extensions import db
+
+def chunked(values, size):
+    """Divide uma sequência em listas de no máximo `size` elementos"""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def dialect_name():
+    """Nome do dialeto do banco em uso (ex: "postgresql", "sqlite")"""
+    return db.session.get_bind().dialect.name
+
+def upsert_statement(table, index_elements, update_columns=None):
+    """
+    Cria um INSERT ... ON CONFLICT para PostgreSQL e SQLite.
+
+    Args:
+        table: Tabela (ex: Modelo.__table__)
+        index_elements (list): Colunas da restrição única usada no conflito
+        update_columns (list, optional): Colunas atualizadas com o valor novo em
+            caso de conflito; sem colunas, o conflito é ignorado (DO NOTHING)
+
+    Returns:
+        Insert ou None se o dialeto não suportar ON CONFLICT
+    """
+    name = dialect_name()
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+
+    statement = insert(table)
+    if update_columns:
+        return statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: statement.excluded[column] for column in update_columns}
+        )
+    return statement.on_conflict_do_nothing(index_elements=index_elements)
+
+def hour_bucket(column):
+    """Expressão SQL que trunca um DateTime para o início da hora"""
+    name = dialect_name()
+    if name == "postgresql":
+        return db.func.date_trunc("hour", column)
+    if name == "sqlite":
+        # Mesmo formato de texto que o SQLAlchemy usa para DateTime no SQLite
+        return db.func.strftime("%Y-%m-%d %H:00:00.000000", column)
+    return db.func.date_format(column, "%Y-%m-%d %H:00:00")
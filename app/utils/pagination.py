@@ -0,0 +1,90 @@
+# app/utils/pagination.py
+from ..extensions import db
+import base64
+import datetime
+import json
+
+def encode_cursor(sort_value, row_id):
+    """Gera um cursor opaco (base64 de JSON) a partir da chave de ordenação e do ID"""
+    if isinstance(sort_value, datetime.datetime):
+        sort_value = {"dt": sort_value.isoformat()}
+    payload = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor gerado por encode_cursor
+
+    As colunas de ordenação paginadas são datas: apenas a forma {"dt": iso}
+    é aceita como chave de ordenação, e o ID deve ser inteiro.
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(sort_value, dict) or set(sort_value) != {"dt"} or not isinstance(sort_value["dt"], str):
+            raise ValueError
+        sort_value = datetime.datetime.fromisoformat(sort_value["dt"])
+        if isinstance(row_id, bool) or not isinstance(row_id, int):
+            raise ValueError
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise ValueError("Cursor de paginação inválido")
+    return sort_value, row_id
+
+def keyset_paginate(query, sort_column, id_column, cursor=None, limit=20, total_limit=None, options=()):
+    """
+    Paginação por cursor (keyset) em ordem decrescente de (sort_column, id_column)
+
+    Em vez de OFFSET, cada página continua a partir da chave do último registro da
+    anterior, com custo constante independente da profundidade. O total é
+    opcional e limitado: com total_limit, conta no máximo total_limit registros
+    e informa se o valor é aproximado.
+
+    Args:
+        query: Consulta já filtrada (sem order_by)
+        sort_column: Coluna de ordenação (ex: created_at, timestamp)
+        id_column: Coluna de desempate, única
+        cursor (str, optional): Cursor retornado na página anterior
+        limit (int): Registros por página
+        total_limit (int, optional): Limite da contagem do total (None = não conta)
+        options (tuple, optional): Opções de carregamento aplicadas só à página (ex: joinedload)
+
+    Returns:
+        dict: items, next_cursor, has_more e, se solicitado, total e total_is_estimate
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    page_query = query.options(*options)
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        page_query = page_query.filter(db.tuple_(sort_column, id_column) < (sort_value, row_id))
+
+    rows = page_query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    items = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    result = {"items": items, "next_cursor": next_cursor, "has_more": has_more}
+    if total_limit:
+        result["total"], result["total_is_estimate"] = bounded_count(query, total_limit)
+    return result
+
+def bounded_count(query, limit):
+    """
+    Conta os registros da consulta até um limite
+
+    Returns:
+        tuple: (total, aproximado) — aproximado é True quando há mais que limit registros
+    """
+    subquery = query.with_entities(db.literal(1)).order_by(None).limit(limit + 1).subquery()
+    count = db.session.query(db.func.count()).select_from(subquery).scalar()
+    if count > limit:
+        return limit, True
+    return count, False
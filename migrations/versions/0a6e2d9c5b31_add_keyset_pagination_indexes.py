@@ -0,0 +1,29 @@
+"""Add keyset pagination indexes on notifications and audit_logs.
+
+Revision ID: 0a6e2d9c5b31
+Revises: f5c3a9e07b14
+Create Date: 2026-10-18 14:11:47.630215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6e2d9c5b31'
+down_revision = 'f5c3a9e07b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_notifications_user_created_at_id', 'notifications',
+        ['user_id', 'created_at', 'id'], unique=False
+    )
+    op.create_index('ix_audit_logs_timestamp_id', 'audit_logs', ['timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_audit_logs_timestamp_id', table_name='audit_logs')
+    op.drop_index('ix_notifications_user_created_at_id', table_name='notifications')
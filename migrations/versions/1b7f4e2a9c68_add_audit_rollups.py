@@ -0,0 +1,40 @@
+"""Add audit_rollups and audit_rollup_state tables.
+
+Revision ID: 1b7f4e2a9c68
+Revises: 0a6e2d9c5b31
+Create Date: 2026-10-18 14:52:09.118364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b7f4e2a9c68'
+down_revision = '0a6e2d9c5b31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('audit_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('action_type', sa.String(length=50), nullable=False),
+    sa.Column('entity_type', sa.String(length=50), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('bucket_start', 'action_type', 'entity_type', 'user_id', name='uq_audit_rollup_bucket')
+    )
+    op.create_table('audit_rollup_state',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('rolled_up_until', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('audit_rollup_state')
+    op.drop_table('audit_rollups')
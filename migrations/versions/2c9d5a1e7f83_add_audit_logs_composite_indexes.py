@@ -0,0 +1,31 @@
+"""Add composite indexes on audit_logs for entity, user and action lookups.
+
+Revision ID: 2c9d5a1e7f83
+Revises: 1b7f4e2a9c68
+Create Date: 2026-10-18 15:20:33.402817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c9d5a1e7f83'
+down_revision = '1b7f4e2a9c68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_audit_logs_entity_timestamp', 'audit_logs',
+        ['entity_type', 'entity_id', 'timestamp'], unique=False
+    )
+    op.create_index('ix_audit_logs_user_timestamp', 'audit_logs', ['user_id', 'timestamp'], unique=False)
+    op.create_index('ix_audit_logs_action_timestamp', 'audit_logs', ['action_type', 'timestamp'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_audit_logs_action_timestamp', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_user_timestamp', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_entity_timestamp', table_name='audit_logs')
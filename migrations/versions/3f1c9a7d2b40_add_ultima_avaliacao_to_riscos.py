@@ -0,0 +1,41 @@
+"""Add ultima_avaliacao_id pointer to riscos.
+
+Revision ID: 3f1c9a7d2b40
+Revises: 6eba7a92fc89
+Create Date: 2026-10-18 09:12:41.517203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b40'
+down_revision = '6eba7a92fc89'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('riscos') as batch_op:
+        batch_op.add_column(sa.Column('ultima_avaliacao_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_riscos_ultima_avaliacao_id', 'avaliacoes_risco',
+            ['ultima_avaliacao_id'], ['id'], ondelete='SET NULL'
+        )
+
+    # Preenche o ponteiro com a avaliação mais recente de cada risco
+    op.execute("""
+        UPDATE riscos SET ultima_avaliacao_id = (
+            SELECT a.id FROM avaliacoes_risco a
+            WHERE a.risco_id = riscos.id
+            ORDER BY a.data_avaliacao DESC, a.id DESC
+            LIMIT 1
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('riscos') as batch_op:
+        batch_op.drop_constraint('fk_riscos_ultima_avaliacao_id', type_='foreignkey')
+        batch_op.drop_column('ultima_avaliacao_id')
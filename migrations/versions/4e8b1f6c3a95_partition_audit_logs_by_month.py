@@ -0,0 +1,116 @@
+"""Partition audit_logs by month on PostgreSQL (opt-in with AUDIT_PARTITIONING=true).
+
+Revision ID: 4e8b1f6c3a95
+Revises: 2c9d5a1e7f83
+Create Date: 2026-10-18 15:34:47.590126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import datetime
+import os
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8b1f6c3a95'
+down_revision = '2c9d5a1e7f83'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+INDEXES = (
+    ('ix_audit_logs_timestamp_id', 'timestamp, id'),
+    ('ix_audit_logs_entity_timestamp', 'entity_type, entity_id, timestamp'),
+    ('ix_audit_logs_user_timestamp', 'user_id, timestamp'),
+    ('ix_audit_logs_action_timestamp', 'action_type, timestamp'),
+)
+
+COLUMNS = 'id, user_id, action_type, entity_type, entity_id, description, ip_address, user_agent, timestamp, additional_data'
+
+
+def _enabled():
+    bind = op.get_bind()
+    return bind.dialect.name == 'postgresql' and os.environ.get('AUDIT_PARTITIONING', '').lower() in ('1', 'true', 'yes')
+
+
+def _is_partitioned():
+    return op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'audit_logs'::regclass)"
+    )).scalar()
+
+
+def _next_month(month):
+    return datetime.datetime(month.year + (month.month // 12), month.month % 12 + 1, 1)
+
+
+def upgrade():
+    # Só no PostgreSQL e quando habilitado: a cópia reescreve a tabela inteira
+    if not _enabled() or _is_partitioned():
+        return
+
+    bind = op.get_bind()
+    for name, _ in INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_legacy')
+    op.execute('ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey')
+    # A chave de partição não pode ser nula
+    op.execute('UPDATE audit_logs_legacy SET timestamp = now() WHERE timestamp IS NULL')
+
+    op.execute(
+        'CREATE TABLE audit_logs (LIKE audit_logs_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)'
+    )
+    op.execute('ALTER TABLE audit_logs ALTER COLUMN timestamp SET NOT NULL')
+    op.execute('ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id')
+    # A chave primária de uma tabela particionada precisa incluir a chave de partição
+    op.execute('ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_pkey PRIMARY KEY (id, timestamp)')
+    op.execute(
+        'ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_user_id_fkey '
+        'FOREIGN KEY (user_id) REFERENCES users (id)'
+    )
+    for name, columns in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON audit_logs ({columns})')
+
+    oldest = bind.execute(sa.text('SELECT min(timestamp) FROM audit_logs_legacy')).scalar()
+    now = datetime.datetime.utcnow()
+    month = datetime.datetime((oldest or now).year, (oldest or now).month, 1)
+    last = datetime.datetime(now.year, now.month, 1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE audit_logs_y{month.year:04d}m{month.month:02d} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+        month = _next_month(month)
+    # Registros fora das partições mensais (ex: datas futuras além do horizonte)
+    op.execute('CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT')
+
+    op.execute(f'INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_legacy')
+    op.execute('DROP TABLE audit_logs_legacy')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql' or not _is_partitioned():
+        return
+
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_partitioned')
+    for name, _ in INDEXES:
+        op.execute(f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_partitioned')
+    op.execute('ALTER TABLE audit_logs_partitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_partitioned_pkey')
+    op.execute(
+        'ALTER TABLE audit_logs_partitioned RENAME CONSTRAINT audit_logs_user_id_fkey TO audit_logs_partitioned_user_id_fkey'
+    )
+
+    op.execute('CREATE TABLE audit_logs (LIKE audit_logs_partitioned INCLUDING DEFAULTS)')
+    op.execute('ALTER TABLE audit_logs ALTER COLUMN timestamp DROP NOT NULL')
+    op.execute('ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id')
+    op.execute('ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_pkey PRIMARY KEY (id)')
+    op.execute(
+        'ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_user_id_fkey '
+        'FOREIGN KEY (user_id) REFERENCES users (id)'
+    )
+    op.execute(f'INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_partitioned')
+    op.execute('DROP TABLE audit_logs_partitioned CASCADE')
+    for name, columns in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON audit_logs ({columns})')
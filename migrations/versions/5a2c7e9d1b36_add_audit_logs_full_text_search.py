@@ -0,0 +1,54 @@
+"""Add full-text search on audit_logs.description (GIN on PostgreSQL, FTS5 on SQLite).
+
+Revision ID: 5a2c7e9d1b36
+Revises: 4e8b1f6c3a95
+Create Date: 2026-10-18 16:02:18.774305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a2c7e9d1b36'
+down_revision = '4e8b1f6c3a95'
+branch_labels = None
+depends_on = None
+
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS audit_logs_fts USING fts5("
+    "description, content='audit_logs', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS audit_logs_fts_insert AFTER INSERT ON audit_logs BEGIN "
+    "INSERT INTO audit_logs_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS audit_logs_fts_delete AFTER DELETE ON audit_logs BEGIN "
+    "INSERT INTO audit_logs_fts(audit_logs_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS audit_logs_fts_update AFTER UPDATE OF description ON audit_logs BEGIN "
+    "INSERT INTO audit_logs_fts(audit_logs_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO audit_logs_fts(rowid, description) VALUES (new.id, new.description); END",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.create_index(
+            'ix_audit_logs_description_fts', 'audit_logs',
+            [sa.text("to_tsvector('portuguese'::regconfig, description)")],
+            unique=False, postgresql_using='gin'
+        )
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+        # Indexa os registros existentes
+        op.execute("INSERT INTO audit_logs_fts(audit_logs_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_audit_logs_description_fts', table_name='audit_logs')
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS audit_logs_fts_update')
+        op.execute('DROP TRIGGER IF EXISTS audit_logs_fts_delete')
+        op.execute('DROP TRIGGER IF EXISTS audit_logs_fts_insert')
+        op.execute('DROP TABLE IF EXISTS audit_logs_fts')
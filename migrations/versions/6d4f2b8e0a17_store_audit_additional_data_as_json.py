@@ -0,0 +1,82 @@
+"""Store audit_logs.additional_data as native JSON (JSONB on PostgreSQL).
+
+Revision ID: 6d4f2b8e0a17
+Revises: 5a2c7e9d1b36
+Create Date: 2026-10-18 16:41:05.239871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = '6d4f2b8e0a17'
+down_revision = '5a2c7e9d1b36'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _normalize(value):
+    # Decodifica JSON (inclusive codificado mais de uma vez); texto que não é JSON é mantido como string
+    while isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            break
+    return value
+
+
+def _normalize_in_batches(bind, source_column, target_column, cast):
+    """Lê additional_data em blocos de IDs e grava o valor normalizado na coluna de destino"""
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            f'SELECT id, {source_column} FROM audit_logs '
+            f'WHERE id > :last_id AND {source_column} IS NOT NULL ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            sa.text(f'UPDATE audit_logs SET {target_column} = {cast} WHERE id = :id'),
+            [{'id': row[0], 'value': json.dumps(_normalize(row[1]))} for row in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # Nova coluna JSONB preenchida em blocos: valores inválidos ou duplamente codificados
+        # impediriam um ALTER COLUMN ... TYPE jsonb USING additional_data::jsonb
+        op.add_column('audit_logs', sa.Column('additional_data_json', postgresql.JSONB(), nullable=True))
+        _normalize_in_batches(bind, 'additional_data', 'additional_data_json', 'CAST(:value AS jsonb)')
+        op.drop_column('audit_logs', 'additional_data')
+        op.alter_column('audit_logs', 'additional_data_json', new_column_name='additional_data')
+        op.create_index(
+            'ix_audit_logs_additional_data', 'audit_logs', ['additional_data'],
+            unique=False, postgresql_using='gin', postgresql_ops={'additional_data': 'jsonb_path_ops'}
+        )
+    else:
+        # SQLite armazena JSON como texto: basta regravar os valores normalizados
+        _normalize_in_batches(bind, 'additional_data', 'additional_data', ':value')
+        if bind.dialect.name == 'sqlite':
+            op.create_index(
+                'ix_audit_logs_data_treinamento_id', 'audit_logs',
+                [sa.text("json_extract(additional_data, '$.treinamento_id')")], unique=False
+            )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_audit_logs_additional_data', table_name='audit_logs')
+        op.alter_column(
+            'audit_logs', 'additional_data', type_=sa.Text(),
+            postgresql_using='additional_data::text'
+        )
+    elif bind.dialect.name == 'sqlite':
+        op.drop_index('ix_audit_logs_data_treinamento_id', table_name='audit_logs')
@@ -0,0 +1,95 @@
+"""Add hash chain columns to audit_logs and the audit_checkpoints table.
+
+Revision ID: 7b3e9a5c2d48
+Revises: 6d4f2b8e0a17
+Create Date: 2026-10-18 17:22:51.604917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import hashlib
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e9a5c2d48'
+down_revision = '6d4f2b8e0a17'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+GENESIS_HASH = '0' * 64
+# Deve permanecer idêntico a CHAIN_FIELDS/compute_row_hash em app/services/audit_chain.py
+CHAIN_FIELDS = (
+    'user_id', 'action_type', 'entity_type', 'entity_id', 'description',
+    'ip_address', 'user_agent', 'timestamp', 'additional_data'
+)
+
+
+def _row_hash(record, previous_hash):
+    content = {field: record[field] for field in CHAIN_FIELDS}
+    content['timestamp'] = content['timestamp'].isoformat() if content['timestamp'] else None
+    content['previous_hash'] = previous_hash
+    payload = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    op.add_column('audit_logs', sa.Column('previous_hash', sa.String(length=64), nullable=True))
+    op.add_column('audit_logs', sa.Column('row_hash', sa.String(length=64), nullable=True))
+    op.create_table('audit_checkpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('last_log_id', sa.Integer(), nullable=False),
+    sa.Column('row_hash', sa.String(length=64), nullable=False),
+    sa.Column('log_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('reason', sa.String(length=20), nullable=False, server_default='periodic'),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('last_log_id')
+    )
+
+    # Encadeia os logs existentes em ordem de id, em blocos
+    bind = op.get_bind()
+    json_type = postgresql.JSONB() if bind.dialect.name == 'postgresql' else sa.JSON()
+    audit_logs = sa.table(
+        'audit_logs',
+        sa.column('id', sa.Integer()),
+        sa.column('user_id', sa.Integer()),
+        sa.column('action_type', sa.String()),
+        sa.column('entity_type', sa.String()),
+        sa.column('entity_id', sa.Integer()),
+        sa.column('description', sa.Text()),
+        sa.column('ip_address', sa.String()),
+        sa.column('user_agent', sa.String()),
+        sa.column('timestamp', sa.DateTime()),
+        sa.column('additional_data', json_type),
+        sa.column('previous_hash', sa.String()),
+        sa.column('row_hash', sa.String()),
+    )
+    update = audit_logs.update().where(audit_logs.c.id == sa.bindparam('log_id')).values(
+        previous_hash=sa.bindparam('new_previous_hash'),
+        row_hash=sa.bindparam('new_row_hash')
+    )
+
+    previous_hash = GENESIS_HASH
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(audit_logs).where(audit_logs.c.id > last_id).order_by(audit_logs.c.id).limit(BATCH_SIZE)
+        ).mappings().fetchall()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            row_hash = _row_hash(row, previous_hash)
+            params.append({'log_id': row['id'], 'new_previous_hash': previous_hash, 'new_row_hash': row_hash})
+            previous_hash = row_hash
+        bind.execute(update, params)
+        last_id = rows[-1]['id']
+
+
+def downgrade():
+    op.drop_table('audit_checkpoints')
+    op.drop_column('audit_logs', 'row_hash')
+    op.drop_column('audit_logs', 'previous_hash')
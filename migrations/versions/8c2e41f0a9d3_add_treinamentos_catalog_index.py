@@ -0,0 +1,27 @@
+"""Add catalogue index on treinamentos (ativo, categoria, data_criacao).
+
+Revision ID: 8c2e41f0a9d3
+Revises: 3f1c9a7d2b40
+Create Date: 2026-10-18 10:03:27.884105
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2e41f0a9d3'
+down_revision = '3f1c9a7d2b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_treinamentos_ativo_categoria', 'treinamentos',
+        ['ativo', 'categoria', 'data_criacao'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_treinamentos_ativo_categoria', table_name='treinamentos')
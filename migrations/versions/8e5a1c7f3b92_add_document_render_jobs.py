@@ -0,0 +1,38 @@
+"""Add document_render_jobs table for the PDF render worker pool.
+
+Revision ID: 8e5a1c7f3b92
+Revises: 7b3e9a5c2d48
+Create Date: 2026-10-18 18:03:37.915046
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e5a1c7f3b92'
+down_revision = '7b3e9a5c2d48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_render_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('document_type', sa.String(length=50), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('documento_id', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('render_ms', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['documento_id'], ['documentos.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('document_render_jobs')
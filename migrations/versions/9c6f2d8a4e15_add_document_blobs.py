@@ -0,0 +1,53 @@
+"""Add document_blobs content-addressed store for rendered PDFs.
+
+Revision ID: 9c6f2d8a4e15
+Revises: 8e5a1c7f3b92
+Create Date: 2026-10-18 19:12:08.402715
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c6f2d8a4e15'
+down_revision = '8e5a1c7f3b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template_version', sa.String(length=64), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('storage_path', sa.String(length=512), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('template_version', 'content_hash', name='uq_document_blobs_key')
+    )
+    op.create_index('ix_document_blobs_last_used_at', 'document_blobs', ['last_used_at'], unique=False)
+
+    with op.batch_alter_table('documentos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_documentos_blob_id'), ['blob_id'], unique=False)
+        batch_op.create_foreign_key('fk_documentos_blob_id_document_blobs', 'document_blobs', ['blob_id'], ['id'])
+
+    with op.batch_alter_table('document_render_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cached', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('document_render_jobs', schema=None) as batch_op:
+        batch_op.drop_column('cached')
+
+    with op.batch_alter_table('documentos', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_documentos_blob_id_document_blobs', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_documentos_blob_id'))
+        batch_op.drop_column('blob_id')
+
+    op.drop_index('ix_document_blobs_last_used_at', table_name='document_blobs')
+    op.drop_table('document_blobs')
@@ -0,0 +1,63 @@
+"""Never reuse audit_logs ids on SQLite (AUTOINCREMENT).
+
+Revision ID: a1d7e3f9c264
+Revises: 9c6f2d8a4e15
+Create Date: 2026-10-18 20:41:53.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d7e3f9c264'
+down_revision = '9c6f2d8a4e15'
+branch_labels = None
+depends_on = None
+
+# Recriados após a reconstrução da tabela (triggers e índices de expressão não são copiados)
+SQLITE_FTS_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS audit_logs_fts_insert AFTER INSERT ON audit_logs BEGIN "
+    "INSERT INTO audit_logs_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS audit_logs_fts_delete AFTER DELETE ON audit_logs BEGIN "
+    "INSERT INTO audit_logs_fts(audit_logs_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS audit_logs_fts_update AFTER UPDATE OF description ON audit_logs BEGIN "
+    "INSERT INTO audit_logs_fts(audit_logs_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO audit_logs_fts(rowid, description) VALUES (new.id, new.description); END",
+)
+
+
+def _rebuild(autoincrement):
+    with op.batch_alter_table('audit_logs', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': autoincrement}) as batch_op:
+        pass
+    for statement in SQLITE_FTS_TRIGGERS:
+        op.execute(statement)
+    op.execute("INSERT INTO audit_logs_fts(audit_logs_fts) VALUES ('rebuild')")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_audit_logs_data_treinamento_id "
+        "ON audit_logs (json_extract(additional_data, '$.treinamento_id'))"
+    )
+
+
+def upgrade():
+    # PostgreSQL usa sequência (ids nunca são reutilizados); no SQLite, sem AUTOINCREMENT,
+    # os ids voltam a partir de max(id) + 1 depois que o arquivamento remove os logs mais recentes
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    _rebuild(True)
+
+    # A sequência começa depois do último log já arquivado (checkpoint), mesmo com a tabela vazia
+    last_id = bind.execute(sa.text(
+        "SELECT max(last_id) FROM (SELECT max(id) AS last_id FROM audit_logs "
+        "UNION ALL SELECT max(last_log_id) FROM audit_checkpoints)"
+    )).scalar() or 0
+    bind.execute(sa.text("DELETE FROM sqlite_sequence WHERE name = 'audit_logs'"))
+    bind.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('audit_logs', :seq)"), {"seq": last_id})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _rebuild(False)
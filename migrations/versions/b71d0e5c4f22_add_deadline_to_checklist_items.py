@@ -0,0 +1,35 @@
+"""Add deadline to checklist_items and deadline-scan indexes.
+
+Revision ID: b71d0e5c4f22
+Revises: 8c2e41f0a9d3
+Create Date: 2026-10-18 11:12:40.316274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71d0e5c4f22'
+down_revision = '8c2e41f0a9d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('checklist_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deadline', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_checklist_items_status_deadline', ['status', 'deadline'], unique=False)
+
+    op.create_index(
+        'ix_notifications_reference', 'notifications',
+        ['reference_type', 'reference_id', 'notification_type', 'created_at'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_notifications_reference', table_name='notifications')
+
+    with op.batch_alter_table('checklist_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_checklist_items_status_deadline')
+        batch_op.drop_column('deadline')
@@ -0,0 +1,40 @@
+"""Add scheduled_jobs table for the background job scheduler.
+
+Revision ID: d4a8f3b61c07
+Revises: b71d0e5c4f22
+Create Date: 2026-10-18 12:26:05.541903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8f3b61c07'
+down_revision = 'b71d0e5c4f22'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scheduled_jobs',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('last_started_at', sa.DateTime(), nullable=True),
+    sa.Column('last_finished_at', sa.DateTime(), nullable=True),
+    sa.Column('last_success_at', sa.DateTime(), nullable=True),
+    sa.Column('last_status', sa.String(length=20), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('last_result', sa.Text(), nullable=True),
+    sa.Column('last_duration_ms', sa.Float(), nullable=True),
+    sa.Column('max_duration_ms', sa.Float(), nullable=True),
+    sa.Column('total_duration_ms', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('run_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('failure_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('lease_owner', sa.String(length=100), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('scheduled_jobs')
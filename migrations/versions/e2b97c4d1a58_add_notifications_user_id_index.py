@@ -0,0 +1,24 @@
+"""Add (user_id, id) index on notifications for the SSE replay.
+
+Revision ID: e2b97c4d1a58
+Revises: d4a8f3b61c07
+Create Date: 2026-10-18 13:02:51.207716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b97c4d1a58'
+down_revision = 'd4a8f3b61c07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_notifications_user_id_id', 'notifications', ['user_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_notifications_user_id_id', table_name='notifications')
@@ -0,0 +1,24 @@
+"""Add (status, created_at) index on notifications for the retention purge.
+
+Revision ID: f5c3a9e07b14
+Revises: e2b97c4d1a58
+Create Date: 2026-10-18 13:40:18.992130
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c3a9e07b14'
+down_revision = 'e2b97c4d1a58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_notifications_status_created_at', 'notifications', ['status', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_notifications_status_created_at', table_name='notifications')